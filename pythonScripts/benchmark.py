@@ -0,0 +1,532 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+# Benchmarks the import, export and download paths end to end on synthetic data and writes the results as JSON.
+# Point it at a throwaway Postgres: every table below is dropped and recreated.
+#
+#   python benchmark.py --pg-dbname kotlinapp_bench --channels 500 --output results.json
+#   python benchmark.py --pg-dbname kotlinapp_bench --output new.json --compare results.json
+
+logger = logging.getLogger("benchmark")
+
+PRODUCTION_DBNAME = "kotlinconfg"
+
+# Mirrors the backend's Exposed tables (backend/.../Schema.kt); the backend normally creates these
+POSTGRES_SCHEMA = """
+    DROP TABLE IF EXISTS episode_category_map, channel_category_map, podcast_episodes, podcast_channels,
+        podcast_channel_categories, podcast_episode_categories, session_categories, session_speakers,
+        conference_sessions, conference_speakers, conference_rooms, conference_categories CASCADE;
+    CREATE TABLE podcast_channels (id serial PRIMARY KEY, title varchar(500) NOT NULL, link varchar(500) NOT NULL,
+        description text NOT NULL, copyright varchar(500), language varchar(50) NOT NULL, author varchar(255) NOT NULL,
+        owner_email varchar(255) NOT NULL, owner_name varchar(255) NOT NULL, image_url varchar(500) NOT NULL,
+        last_build_date timestamp NOT NULL, created_at timestamp NOT NULL DEFAULT now(), updated_at timestamp NOT NULL DEFAULT now());
+    CREATE TABLE podcast_episodes (id serial PRIMARY KEY, channel_id int NOT NULL REFERENCES podcast_channels(id),
+        guid varchar(500) NOT NULL UNIQUE, title varchar(500) NOT NULL, description text NOT NULL, link varchar(500) NOT NULL,
+        pub_date timestamp NOT NULL, duration int NOT NULL, explicit boolean NOT NULL, image_url varchar(500),
+        media_url varchar(500) NOT NULL, media_type varchar(100) NOT NULL, media_length bigint NOT NULL,
+        created_at timestamp NOT NULL DEFAULT now(), updated_at timestamp NOT NULL DEFAULT now());
+    CREATE TABLE podcast_channel_categories (id serial PRIMARY KEY, name varchar(255) NOT NULL UNIQUE,
+        created_at timestamp NOT NULL DEFAULT now(), updated_at timestamp NOT NULL DEFAULT now());
+    CREATE TABLE podcast_episode_categories (id serial PRIMARY KEY, name varchar(255) NOT NULL UNIQUE,
+        created_at timestamp NOT NULL DEFAULT now(), updated_at timestamp NOT NULL DEFAULT now());
+    CREATE TABLE channel_category_map (channel_id int NOT NULL REFERENCES podcast_channels(id),
+        category_id int NOT NULL REFERENCES podcast_channel_categories(id),
+        created_at timestamp NOT NULL DEFAULT now(), updated_at timestamp NOT NULL DEFAULT now(), PRIMARY KEY (channel_id, category_id));
+    CREATE TABLE episode_category_map (episode_id int NOT NULL REFERENCES podcast_episodes(id),
+        category_id int NOT NULL REFERENCES podcast_episode_categories(id),
+        created_at timestamp NOT NULL DEFAULT now(), updated_at timestamp NOT NULL DEFAULT now(), PRIMARY KEY (episode_id, category_id));
+    CREATE TABLE conference_rooms (id serial PRIMARY KEY, name varchar(255) NOT NULL, sort int,
+        created_at timestamp NOT NULL DEFAULT now(), updated_at timestamp NOT NULL DEFAULT now());
+    CREATE TABLE conference_categories (id serial PRIMARY KEY, title varchar(255) NOT NULL, sort int, type varchar(50),
+        created_at timestamp NOT NULL DEFAULT now(), updated_at timestamp NOT NULL DEFAULT now());
+    CREATE TABLE conference_speakers (id varchar(50) PRIMARY KEY, first_name varchar(255) NOT NULL, last_name varchar(255) NOT NULL,
+        bio varchar(5000), tag_line varchar(500), profile_picture varchar(500), is_top_speaker boolean NOT NULL,
+        created_at timestamp NOT NULL DEFAULT now(), updated_at timestamp NOT NULL DEFAULT now());
+    CREATE TABLE conference_sessions (id varchar(50) PRIMARY KEY, title varchar(500) NOT NULL, description text,
+        starts_at timestamp NOT NULL, ends_at timestamp NOT NULL, room_id int REFERENCES conference_rooms(id),
+        is_service_session boolean NOT NULL DEFAULT false, is_plenum_session boolean NOT NULL DEFAULT false,
+        status varchar(50) NOT NULL DEFAULT 'draft', created_at timestamp NOT NULL DEFAULT now(), updated_at timestamp NOT NULL DEFAULT now());
+    CREATE TABLE session_speakers (session_id varchar(50) REFERENCES conference_sessions(id), speaker_id varchar(50) REFERENCES conference_speakers(id),
+        created_at timestamp NOT NULL DEFAULT now(), updated_at timestamp NOT NULL DEFAULT now(), PRIMARY KEY (session_id, speaker_id));
+    CREATE TABLE session_categories (session_id varchar(50) REFERENCES conference_sessions(id), category_item_id int REFERENCES conference_categories(id),
+        created_at timestamp NOT NULL DEFAULT now(), updated_at timestamp NOT NULL DEFAULT now(), PRIMARY KEY (session_id, category_item_id));
+"""
+
+# Columns whose values point at another table's rows; everything else is generated from the Postgres type
+REFERENCES = {
+    ("PodcastEpisodes", "channelId"): "PodcastChannels",
+    ("ChannelCategoryMap", "channelId"): "PodcastChannels",
+    ("ChannelCategoryMap", "categoryId"): "PodcastChannelCategories",
+    ("EpisodeCategoryMap", "episodeId"): "PodcastEpisodes",
+    ("EpisodeCategoryMap", "categoryId"): "PodcastEpisodeCategories",
+    ("SessionTable", "roomId"): "ConferenceRoomsTable",
+    ("SessionSpeakersTable", "sessionId"): "SessionTable",
+    ("SessionSpeakersTable", "speakerId"): "ConferenceSpeakersTable",
+    ("SessionCategoriesTable", "sessionId"): "SessionTable",
+    ("SessionCategoriesTable", "categoryId"): "ConferenceCategoriesTable",
+}
+UNIQUE_TEXT_COLUMNS = {"guid", "name"}
+LONG_TEXT_COLUMNS = {"description", "bio"}  # Long enough to exercise FTS and the compressors realistically
+WORDS = (
+    "kotlin compose coroutine flow multiplatform android ios server ktor gradle compiler plugin lambda inline "
+    "sealed data class object channel episode podcast conference keynote session speaker room track library "
+    "testing performance memory build release update community design pattern architecture state effect"
+).split()
+SHORT_TEXT_LENGTH = 50  # The narrowest varchar columns (language, type, status)
+GENERATE_BATCH_ROWS = 10000
+EPOCH_2020_MS = 1577836800000
+YEAR_MS = 365 * 24 * 3600 * 1000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark import, export and downloads against a throwaway Postgres")
+    parser.add_argument("--pg-host", default=os.environ.get("PG_HOST", "localhost"))
+    parser.add_argument("--pg-port", default=os.environ.get("PG_PORT", "5432"))
+    parser.add_argument("--pg-dbname", required=True, help="Throwaway database; its kotlinapp tables are dropped")
+    parser.add_argument("--pg-user", default=os.environ.get("PG_USER", "postgres"))
+    parser.add_argument("--pg-password", default=os.environ.get("PG_PASSWORD", "postgres"))
+    parser.add_argument("--workdir", help="Scratch directory for SQLite sources and the artifact store (default: a new temp dir)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--channels", type=int, default=200)
+    parser.add_argument("--episodes-per-channel", type=int, default=250)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--categories-per-row", type=int, default=2)
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--speakers", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--speakers-per-session", type=int, default=2)
+    parser.add_argument("--incremental-fraction", type=float, default=0.01, help="Share of episodes touched before the incremental export")
+    parser.add_argument("--downloads", type=int, default=200, help="Total /download_latest_file requests; 0 skips the load test")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--accept-encoding", default="identity", help="Sent with every download, e.g. identity, gzip or zstd")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare", help="Earlier results file; exits non-zero when a rate regresses by more than --max-regression")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+    if args.pg_dbname == PRODUCTION_DBNAME:
+        parser.error(f"refusing to drop tables in {PRODUCTION_DBNAME}; use a throwaway database")
+    return args
+
+
+def configure_environment(args, storage_dir):
+    # main reads its configuration at import time, so this must run before it is imported
+    os.environ.update({
+        "PG_HOST": args.pg_host,
+        "PG_PORT": str(args.pg_port),
+        "PG_DBNAME": args.pg_dbname,
+        "PG_USER": args.pg_user,
+        "PG_PASSWORD": args.pg_password,
+        "STORAGE_DIR": storage_dir,
+        "CHANGE_NOTIFICATIONS": "false",
+        "LEADER_ELECTION": "false",
+        "ARTIFACT_MIN_RETENTION_MINUTES": "0",
+    })
+
+
+def current_rss_bytes():
+    # Resident set right now (Linux); None where /proc is not available
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RssSampler:
+    # Samples the resident set on a background thread for the length of one stage, so each stage reports its
+    # own peak rather than the process lifetime high-water mark. Without /proc it falls back to ru_maxrss,
+    # which is only meaningful for the first stage
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.start_bytes = None
+        self.peak_bytes = None
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, current_rss_bytes() or 0)
+
+    def __enter__(self):
+        self.start_bytes = self.peak_bytes = current_rss_bytes()
+        if self.start_bytes is not None:
+            self.thread = threading.Thread(target=self.sample, name="rss-sampler", daemon=True)
+            self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.start_bytes is not None:
+            self.stopped.set()
+            self.thread.join()
+            self.peak_bytes = max(self.peak_bytes, current_rss_bytes() or 0)
+        return False
+
+    def result(self):
+        if self.start_bytes is None:
+            # ru_maxrss is KiB on Linux and bytes on macOS
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return {"peak_rss_mb": round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1), "rss_source": "ru_maxrss"}
+        return {
+            "start_rss_mb": round(self.start_bytes / (1024 * 1024), 1),
+            "peak_rss_mb": round(self.peak_bytes / (1024 * 1024), 1),
+            "rss_growth_mb": round((self.peak_bytes - self.start_bytes) / (1024 * 1024), 1),
+            "rss_source": "sampled",
+        }
+
+
+def row_counts(args):
+    episodes = args.channels * args.episodes_per_channel
+    return {
+        "PodcastChannelCategories": args.categories,
+        "PodcastEpisodeCategories": args.categories,
+        "PodcastChannels": args.channels,
+        "PodcastEpisodes": episodes,
+        "ChannelCategoryMap": args.channels * args.categories_per_row,
+        "EpisodeCategoryMap": episodes * args.categories_per_row,
+        "ConferenceRoomsTable": args.rooms,
+        "ConferenceCategoriesTable": args.categories,
+        "ConferenceSpeakersTable": args.speakers,
+        "SessionTable": args.sessions,
+        "SessionSpeakersTable": args.sessions * args.speakers_per_session,
+        "SessionCategoriesTable": args.sessions * args.categories_per_row,
+    }
+
+
+def text_key(table, row_id):
+    return f"{table[:3].lower()}-{row_id}"
+
+
+def synthetic_value(rng, table, column, pg_type, row_id):
+    if column == "id":
+        return row_id if pg_type in ("integer", "bigint") else text_key(table, row_id)
+    if column in UNIQUE_TEXT_COLUMNS:
+        return f"{column}-{row_id}-{rng.choice(WORDS)}"
+    if pg_type.startswith("timestamp"):
+        return EPOCH_2020_MS + rng.randrange(YEAR_MS * 5)
+    if pg_type == "boolean":
+        return rng.randrange(2)
+    if pg_type in ("integer", "bigint", "smallint"):
+        return rng.randrange(1, 10 ** 6)
+    if column in LONG_TEXT_COLUMNS:
+        return " ".join(rng.choices(WORDS, k=rng.randint(40, 120)))
+    return " ".join(rng.choices(WORDS, k=rng.randint(2, 5)))[:SHORT_TEXT_LENGTH]
+
+
+def generate_table(rng, conn, table_info, column_mapping, pg_types, counts):
+    sqlite_table = table_info["sqlite_table"]
+    mapping = column_mapping[sqlite_table]
+    columns = [column for column, pg_column in mapping.items() if pg_column is not None]
+    referenced = [column for column in columns if (sqlite_table, column) in REFERENCES]
+    total = counts[sqlite_table]
+    insert = f"INSERT OR IGNORE INTO {sqlite_table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+    if table_info["id_column"] is None:
+        # Map tables: each row of the first referenced table links to consecutive rows of the second,
+        # so every pair is unique without bookkeeping
+        left, right = (REFERENCES[(sqlite_table, column)] for column in referenced)
+        per_row = max(1, total // counts[left])
+        rows = (
+            (left_id, (left_id * 7 + offset) % counts[right] + 1)
+            for left_id in range(1, counts[left] + 1)
+            for offset in range(min(per_row, counts[right]))
+        )
+        key_types = [pg_types[mapping[column]] for column in referenced]
+        rows = (
+            tuple(value if key_type in ("integer", "bigint") else text_key(REFERENCES[(sqlite_table, column)], value)
+                  for value, key_type, column in zip(row, key_types, referenced))
+            for row in rows
+        )
+    else:
+        def make_row(row_id):
+            values = []
+            for column in columns:
+                target = REFERENCES.get((sqlite_table, column))
+                if target is not None:
+                    values.append(rng.randrange(counts[target]) + 1)
+                else:
+                    values.append(synthetic_value(rng, sqlite_table, column, pg_types[mapping[column]], row_id))
+            return values
+        rows = (make_row(row_id) for row_id in range(1, total + 1))
+    written = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= GENERATE_BATCH_ROWS:
+            conn.executemany(insert, batch)
+            written += len(batch)
+            batch = []
+    conn.executemany(insert, batch)
+    written += len(batch)
+    conn.commit()
+    return written
+
+
+def generate_sources(server, args, source_dir, pg_types):
+    # Builds the seed SQLite files the import reads, from the app schemas and the import column mappings
+    rng = random.Random(args.seed)
+    counts = row_counts(args)
+    started = time.monotonic()
+    result = {"tables": {}}
+    for filename, tables, schemas, column_mapping in (
+        ("podcasts.db", server.PODCAST_TABLES, server.SQLITE_SCHEMAS, server.PODCAST_COLUMN_MAPPING),
+        ("sessions.db", server.SESSION_TABLES, server.SESSION_SQLITE_SCHEMAS, server.SESSION_COLUMN_MAPPING),
+    ):
+        path = os.path.join(source_dir, filename)
+        if os.path.exists(path):
+            os.remove(path)
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        for table_info in tables:
+            conn.execute(schemas[table_info["sqlite_table"]])
+            rows = generate_table(rng, conn, table_info, column_mapping, pg_types[table_info["pg_table"]], counts)
+            result["tables"][table_info["sqlite_table"]] = rows
+        conn.close()
+        result[f"{filename}_bytes"] = os.path.getsize(path)
+    result["seconds"] = round(time.monotonic() - started, 3)
+    return result
+
+
+def reset_postgres(server):
+    with server.pg_pool.connection() as pg_conn:
+        cursor = pg_conn.cursor()
+        cursor.execute(POSTGRES_SCHEMA)
+        cursor.execute(f"DROP TABLE IF EXISTS {server.IMPORT_CHECKPOINT_TABLE}, {server.DELETE_LOG_TABLE}")
+        pg_conn.commit()
+        cursor.close()
+        return {
+            pg_table: dict(server.schema_cache.get_columns(pg_conn, "public", pg_table))
+            for pg_table in [t["pg_table"] for t in server.PODCAST_TABLES + server.SESSION_TABLES]
+        }
+
+
+def summarize_trace(record):
+    stages = {}
+    for span in record["spans"]:
+        key = f"{span.get('dataset', '')}.{span['name']}"
+        stages[key] = round(stages.get(key, 0.0) + span["seconds"], 6)
+    return stages
+
+
+def timed_run(traces, name, run):
+    # Only a trace of this pipeline that began during this run counts; a skipped or failed run must not
+    # be reported with the numbers of an earlier one
+    seen = len(traces)
+    started_at = time.time()
+    started = time.monotonic()
+    with RssSampler() as rss:
+        run()
+    seconds = time.monotonic() - started
+    records = [record for record in traces[seen:] if record["trace"] == name and record["started_at"] >= started_at]
+    if not records:
+        raise RuntimeError(f"The {name} run finished without a trace; it was most likely skipped")
+    record = records[-1]
+    result = record["attributes"].get("result")
+    if result != "success":
+        raise RuntimeError(f"The {name} run ended with result {result!r}: {record['attributes'].get('error', '')}")
+    rows = record["attributes"].get("rows", 0)
+    return dict({
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds, 1) if seconds > 0 else None,
+        "stages": summarize_trace(record),
+    }, **rss.result())
+
+
+def touch_episodes(server, fraction):
+    with server.pg_pool.connection() as pg_conn:
+        cursor = pg_conn.cursor()
+        cursor.execute(
+            "UPDATE podcast_episodes SET title = title || ' (updated)', updated_at = now() WHERE id %% %s = 0",
+            (max(1, round(1 / fraction)),),
+        )
+        touched = cursor.rowcount
+        pg_conn.commit()
+        cursor.close()
+    return touched
+
+
+def artifact_sizes(server):
+    sizes = {}
+    for name, dataset in server.EXPORT_DATASETS.items():
+        filepath = server.get_served_artifact_path(dataset)
+        if filepath is None:
+            continue
+        sizes[name] = {"identity": os.path.getsize(filepath)}
+        for encoding, suffix in server.ENCODING_SUFFIXES.items():
+            if os.path.exists(filepath + suffix):
+                sizes[name][encoding] = os.path.getsize(filepath + suffix)
+    return sizes
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 4)
+
+
+def run_download_load(server, args):
+    import uvicorn
+
+    # Lifespan off: the bootstrap thread would otherwise start importing and exporting under the load test
+    port = free_port()
+    uvicorn_server = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=uvicorn_server.run, daemon=True)
+    thread.start()
+    while not uvicorn_server.started:
+        time.sleep(0.05)
+    url = f"http://127.0.0.1:{port}/download_latest_file"
+    local = threading.local()
+
+    def download(_):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.monotonic()
+        received = 0
+        with session.get(url, headers={"Accept-Encoding": args.accept_encoding}, stream=True, timeout=120) as response:
+            for chunk in response.raw.stream(1024 * 1024, decode_content=False):
+                received += len(chunk)
+        return response.status_code, received, time.monotonic() - started
+
+    started = time.monotonic()
+    try:
+        with RssSampler() as rss, ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(download, range(args.downloads)))
+    finally:
+        uvicorn_server.should_exit = True
+        thread.join(timeout=10)
+    seconds = time.monotonic() - started
+    ok = [r for r in results if r[0] == 200]
+    latencies = [r[2] for r in ok]
+    received = sum(r[1] for r in ok)
+    statuses = {}
+    for status, _, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return dict({
+        "requests": len(results),
+        "concurrency": args.concurrency,
+        "accept_encoding": args.accept_encoding,
+        "statuses": statuses,
+        "seconds": round(seconds, 3),
+        "requests_per_second": round(len(results) / seconds, 1),
+        "megabytes_per_second": round(received / seconds / (1024 * 1024), 2),
+        "latency_p50": percentile(latencies, 0.5),
+        "latency_p95": percentile(latencies, 0.95),
+        "latency_p99": percentile(latencies, 0.99),
+        "admission": server.download_admission.get_stats() if server.download_admission else None,
+    }, **rss.result())
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Higher is better for all of these
+COMPARED_RATES = [
+    ("import", "rows_per_second"),
+    ("export_full", "rows_per_second"),
+    ("export_incremental", "rows_per_second"),
+    ("downloads", "megabytes_per_second"),
+    ("downloads", "requests_per_second"),
+]
+
+
+def compare_results(results, baseline, max_regression):
+    regressions = []
+    for section, key in COMPARED_RATES:
+        before = (baseline.get(section) or {}).get(key)
+        after = (results.get(section) or {}).get(key)
+        if not before or after is None:
+            continue
+        change = after / before - 1
+        logger.info(f"{section}.{key}: {before} -> {after} ({change:+.1%})")
+        if change < -max_regression:
+            regressions.append(f"{section}.{key}")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    workdir = args.workdir or tempfile.mkdtemp(prefix="kotlinapp-bench-")
+    source_dir = os.path.join(workdir, "sources")
+    storage_dir = os.path.join(workdir, "storage")
+    os.makedirs(source_dir, exist_ok=True)
+    configure_environment(args, storage_dir)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import main as server
+
+    traces = []
+    server.metrics.add_span_hook(traces.append)
+    results = {
+        "revision": git_revision(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "parameters": {key: value for key, value in vars(args).items() if not key.startswith("pg_")},
+    }
+    try:
+        logger.info(f"Resetting Postgres tables in {args.pg_dbname}")
+        pg_types = reset_postgres(server)
+        logger.info("Generating synthetic SQLite sources")
+        results["generate"] = generate_sources(server, args, source_dir, pg_types)
+        logger.info("Benchmarking import")
+        results["import"] = timed_run(traces, "import", lambda: server.perform_import(
+            os.path.join(source_dir, "podcasts.db"), os.path.join(source_dir, "sessions.db")))
+        # Same order as the bootstrap: indexes and the delete log go in once the tables are populated
+        with server.pg_pool.connection() as pg_conn:
+            server.install_export_support(pg_conn)
+        server.leader_active.set()
+        logger.info("Benchmarking full export")
+        results["export_full"] = timed_run(traces, "export", lambda: server.run_export_job(force_full=True))
+        touched = touch_episodes(server, args.incremental_fraction)
+        logger.info(f"Benchmarking incremental export after touching {touched} episodes")
+        results["export_incremental"] = timed_run(traces, "export", server.run_export_job)
+        results["export_incremental"]["touched_rows"] = touched
+        results["artifacts"] = artifact_sizes(server)
+        if args.downloads > 0:
+            logger.info(f"Benchmarking {args.downloads} downloads at concurrency {args.concurrency}")
+            results["downloads"] = run_download_load(server, args)
+    finally:
+        server.shutdown_requested.set()
+        server.pg_pool.close()
+    results["finished_at"] = datetime.now(timezone.utc).isoformat()
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    logger.info(f"Wrote {args.output} (workdir {workdir})")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_results(results, json.load(f), args.max_regression)
+        if regressions:
+            logger.error(f"Regressed by more than {args.max_regression:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+
+logger = logging.getLogger("combined-script")
+
+SCHEMA_FINGERPRINT_QUERY = """
+    SELECT md5(coalesce(string_agg(table_name || '.' || column_name || ':' || data_type, ',' ORDER BY table_name, ordinal_position), ''))
+    FROM information_schema.columns WHERE table_schema = %s
+"""
+
+
+class PostgresPool:
+    # Bounded, thread-safe pool: callers wait for a free connection instead of failing, and
+    # nothing connects until the first checkout
+
+    def __init__(self, max_connections, statement_timeout_ms, health_check_seconds, slow_checkout_seconds=1.0, **connect_kwargs):
+        self.max_connections = max(2, max_connections)  # The export coordinator plus at least one worker
+        self.health_check_seconds = health_check_seconds
+        self.slow_checkout_seconds = slow_checkout_seconds
+        self.connect_kwargs = dict(connect_kwargs, options=f"-c statement_timeout={statement_timeout_ms}")
+        self.slots = threading.BoundedSemaphore(self.max_connections)
+        self.lock = threading.Lock()
+        self.idle = []  # (connection, monotonic time it was returned)
+        self.stats = {
+            "connections_opened": 0,
+            "connections_discarded": 0,
+            "checkouts": 0,
+            "in_use": 0,
+            "checkout_wait_seconds_total": 0.0,
+            "checkout_wait_seconds_max": 0.0,
+            "health_check_failures": 0,
+        }
+
+    @contextmanager
+    def connection(self):
+        started = time.monotonic()
+        self.slots.acquire()
+        try:
+            conn = self.checkout()
+        except Exception:
+            self.slots.release()
+            raise
+        waited = time.monotonic() - started
+        with self.lock:
+            self.stats["checkouts"] += 1
+            self.stats["in_use"] += 1
+            self.stats["checkout_wait_seconds_total"] += waited
+            self.stats["checkout_wait_seconds_max"] = max(self.stats["checkout_wait_seconds_max"], waited)
+        if waited >= self.slow_checkout_seconds:
+            logger.warning(f"Waited {waited:.2f}s for a Postgres connection ({self.max_connections} max)")
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.checkin(conn, broken)
+            with self.lock:
+                self.stats["in_use"] -= 1
+            self.slots.release()
+
+    def checkout(self):
+        # Idle connections may have been dropped by the server; a fresh one is used as-is
+        while True:
+            with self.lock:
+                conn, returned_at = self.idle.pop() if self.idle else (None, None)
+            if conn is None:
+                conn = psycopg2.connect(**self.connect_kwargs)
+                with self.lock:
+                    self.stats["connections_opened"] += 1
+                return conn
+            if self.is_healthy(conn, returned_at):
+                return conn
+            self.discard(conn)
+
+    def is_healthy(self, conn, returned_at):
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_seconds:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error as e:
+            logger.warning(f"Discarding unhealthy Postgres connection: {e}")
+            with self.lock:
+                self.stats["health_check_failures"] += 1
+            return False
+
+    def checkin(self, conn, broken):
+        if not broken and not conn.closed:
+            try:
+                # Undo per-use session changes (isolation level, read-only, SET commands)
+                conn.reset()
+            except psycopg2.Error:
+                broken = True
+        if broken or conn.closed:
+            self.discard(conn)
+            return
+        with self.lock:
+            self.idle.append((conn, time.monotonic()))
+
+    def discard(self, conn):
+        with self.lock:
+            self.stats["connections_discarded"] += 1
+        if not conn.closed:
+            conn.close()
+
+    def dedicated_connection(self):
+        # Unpooled connection for long-lived sessions such as LISTEN, which would pin a pool slot forever
+        return psycopg2.connect(**self.connect_kwargs)
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["idle"] = len(self.idle)
+        stats["max_connections"] = self.max_connections
+        stats["open"] = stats["connections_opened"] - stats["connections_discarded"]
+        return stats
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn, _ in idle:
+            conn.close()
+
+
+class AdvisoryLock:
+    # Session-level advisory lock held on a dedicated connection. Postgres releases it as soon as that
+    # session ends, so a crashed holder fails over without any lease timeout to tune
+
+    def __init__(self, pool, key):
+        self.pool = pool
+        self.key = key
+        self.lock = threading.Lock()
+        self.conn = None
+
+    def try_acquire(self):
+        with self.lock:
+            if self.conn is not None:
+                return self.ping()
+            conn = self.pool.dedicated_connection()
+            conn.autocommit = True
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", (self.key,))
+                acquired = cursor.fetchone()[0]
+                cursor.close()
+            except psycopg2.Error:
+                conn.close()
+                raise
+            if not acquired:
+                conn.close()
+                return False
+            self.conn = conn
+            return True
+
+    def is_held(self):
+        with self.lock:
+            return self.conn is not None and self.ping()
+
+    def ping(self):
+        # The lock lives exactly as long as the session, so a working session means it is still held
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            return True
+        except psycopg2.Error as e:
+            logger.warning(f"Advisory lock {self.key} lost with its connection: {e}")
+            self.conn.close()
+            self.conn = None
+            return False
+
+    def release(self):
+        with self.lock:
+            conn, self.conn = self.conn, None
+        if conn is None or conn.closed:
+            return
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (self.key,))
+            cursor.close()
+        except psycopg2.Error:
+            pass
+        conn.close()
+
+
+class SchemaCache:
+    # Caches information_schema lookups per schema; dropped only when the schema fingerprint changes
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.fingerprints = {}
+        self.schemas = {}  # schema -> {table: [(column_name, data_type), ...]}
+
+    def refresh(self, conn, schema):
+        cursor = conn.cursor()
+        cursor.execute(SCHEMA_FINGERPRINT_QUERY, (schema,))
+        fingerprint = cursor.fetchone()[0]
+        cursor.close()
+        with self.lock:
+            if self.fingerprints.get(schema) == fingerprint:
+                return fingerprint
+            if schema in self.fingerprints:
+                logger.info(f"Schema {schema} changed, dropping cached table metadata")
+            self.fingerprints[schema] = fingerprint
+            self.schemas.pop(schema, None)
+        return fingerprint
+
+    def get_schema(self, conn, schema):
+        with self.lock:
+            tables = self.schemas.get(schema)
+        if tables is not None:
+            return tables
+        cursor = conn.cursor()
+        cursor.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = %s AND table_type = 'BASE TABLE' ORDER BY table_name", (schema,))
+        tables = {row[0]: [] for row in cursor.fetchall()}
+        cursor.execute("SELECT table_name, column_name, data_type FROM information_schema.columns WHERE table_schema = %s ORDER BY table_name, ordinal_position", (schema,))
+        for table, column, data_type in cursor.fetchall():
+            if table in tables:
+                tables[table].append((column, data_type))
+        cursor.close()
+        with self.lock:
+            self.schemas[schema] = tables
+        return tables
+
+    def get_tables(self, conn, schema):
+        return list(self.get_schema(conn, schema))
+
+    def get_columns(self, conn, schema, table):
+        return self.get_schema(conn, schema).get(table, [])
@@ -0,0 +1,299 @@
+import asyncio
+import os
+import random
+import secrets
+import time
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+
+CHUNK_SIZE = 1024 * 1024  # 1MB reads on the fallback path
+THROTTLED_CHUNK_SIZE = 64 * 1024  # Smaller sends keep bandwidth-capped streams smooth
+MAX_RANGES = 16  # More parts than this is almost always a scan, not a resume
+
+ByteRange = Tuple[int, int]  # Inclusive start and end offsets
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range_header(header: Optional[str], file_size: int) -> Optional[List[ByteRange]]:
+    # Returns None when the whole file should be sent, otherwise the ranges to send
+    if not header:
+        return None
+    unit, _, range_set = header.partition("=")
+    if unit.strip().lower() != "bytes":
+        return None  # Unknown range units are ignored
+    ranges = []
+    for spec in range_set.split(","):
+        spec = spec.strip()
+        if not spec:
+            continue
+        first, dash, last = spec.partition("-")
+        if not dash:
+            raise RangeNotSatisfiable(f"Malformed range {spec!r}")
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else None
+                if start < 0 or (end is not None and end < start):
+                    raise RangeNotSatisfiable(f"Malformed range {spec!r}")
+                if end is None:
+                    end = file_size - 1
+            else:
+                suffix = int(last)
+                if suffix <= 0:
+                    continue
+                start = max(file_size - suffix, 0)
+                end = file_size - 1
+        except ValueError:
+            raise RangeNotSatisfiable(f"Malformed range {spec!r}")
+        if start >= file_size:
+            continue
+        ranges.append((start, min(end, file_size - 1)))
+    if not ranges:
+        raise RangeNotSatisfiable("No satisfiable range")
+    ranges = coalesce_ranges(ranges)
+    if len(ranges) > MAX_RANGES:
+        raise RangeNotSatisfiable(f"Too many ranges ({len(ranges)})")
+    return ranges
+
+
+def coalesce_ranges(ranges: List[ByteRange]) -> List[ByteRange]:
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def range_not_satisfiable_response(file_size: int, headers: Optional[dict] = None) -> Response:
+    headers = dict(headers or {})
+    headers["Content-Range"] = f"bytes */{file_size}"
+    return Response(status_code=416, headers=headers)
+
+
+class TokenBucket:
+    # Byte-rate limiter for the event loop; callers take what they send and sleep off any debt,
+    # so concurrent streams sharing a bucket split its rate between them
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def consume(self, amount: int) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= amount
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+class DownloadRejected(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Download queue full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class DownloadAdmission:
+    # Caps concurrent body streams. Requests beyond the cap wait in a short FIFO queue; when that is
+    # full, or the wait runs out, they are rejected with a jittered Retry-After so a publish-time
+    # stampede comes back spread out instead of all at once
+
+    def __init__(self, max_streams: int, max_queued: int, queue_timeout: float, retry_after: float,
+                 stream_bytes_per_second: float = 0, total_bytes_per_second: float = 0):
+        self.max_streams = max(1, max_streams)
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.stream_bytes_per_second = stream_bytes_per_second
+        self.total_bucket = TokenBucket(total_bytes_per_second) if total_bytes_per_second > 0 else None
+        self.active = 0
+        self.waiters = deque()
+        self.stats = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0, "active_max": 0}
+
+    def reject(self) -> DownloadRejected:
+        self.stats["rejected"] += 1
+        return DownloadRejected(max(1, round(self.retry_after * (0.5 + random.random()))))
+
+    async def acquire(self) -> None:
+        if self.active < self.max_streams and not self.waiters:
+            self.admit()
+            return
+        if len(self.waiters) >= self.max_queued:
+            raise self.reject()
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done():
+                # The slot was handed over just as the wait ended
+                if isinstance(e, asyncio.TimeoutError):
+                    return
+                self.release()
+                raise
+            self.waiters.remove(waiter)
+            waiter.cancel()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.stats["timed_out"] += 1
+            raise self.reject()
+
+    def admit(self) -> None:
+        self.active += 1
+        self.stats["admitted"] += 1
+        self.stats["active_max"] = max(self.stats["active_max"], self.active)
+
+    def release(self) -> None:
+        # Slots pass straight to the longest waiter, so queued requests are served in arrival order
+        self.active -= 1
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.admit()
+                waiter.set_result(None)
+                return
+
+    def stream_buckets(self) -> List[TokenBucket]:
+        buckets = [TokenBucket(self.stream_bytes_per_second)] if self.stream_bytes_per_second > 0 else []
+        if self.total_bucket is not None:
+            buckets.append(self.total_bucket)
+        return buckets
+
+    def get_stats(self) -> dict:
+        return dict(self.stats, active=self.active, waiting=len(self.waiters), max_streams=self.max_streams)
+
+
+class FileRangeResponse(Response):
+    # Streams a file (or byte ranges of it) without going through Python buffers where the ASGI
+    # server offers it: pathsend (granian) covers whole files only, and zerocopysend is used if a
+    # server ever advertises it. Both return before the bytes leave, so they are only used without
+    # admission control; admitted downloads must hold their slot until the last chunk is sent, and
+    # take the positional-read path like ranges and everything under uvicorn.
+
+    def __init__(
+        self,
+        path: str,
+        file_size: int,
+        ranges: Optional[List[ByteRange]] = None,
+        headers: Optional[dict] = None,
+        media_type: str = "application/octet-stream",
+        send_body: bool = True,
+        admission: Optional[DownloadAdmission] = None,
+        on_finish: Optional[Callable[[str, int], None]] = None,
+    ):
+        self.path = path
+        self.file_size = file_size
+        self.send_body = send_body
+        self.admission = admission
+        self.on_finish = on_finish  # Called with the response kind and body bytes sent
+        self.bytes_sent = 0
+        self.parts = []  # (prefix bytes, start, end) triples
+        self.epilogue = b""
+        headers = dict(headers or {})
+        headers["Accept-Ranges"] = "bytes"
+        self.kind = "full" if ranges is None else "range" if len(ranges) == 1 else "multipart"
+        if ranges is None:
+            status_code = 200
+            self.parts.append((b"", 0, file_size - 1))
+            content_type = media_type
+        elif len(ranges) == 1:
+            status_code = 206
+            start, end = ranges[0]
+            headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+            self.parts.append((b"", start, end))
+            content_type = media_type
+        else:
+            status_code = 206
+            boundary = secrets.token_hex(16)
+            for index, (start, end) in enumerate(ranges):
+                separator = b"" if index == 0 else b"\r\n"
+                prefix = separator + (
+                    f"--{boundary}\r\n"
+                    f"Content-Type: {media_type}\r\n"
+                    f"Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n"
+                ).encode("latin-1")
+                self.parts.append((prefix, start, end))
+            self.epilogue = f"\r\n--{boundary}--\r\n".encode("latin-1")
+            content_type = f"multipart/byteranges; boundary={boundary}"
+        content_length = sum(len(prefix) + end - start + 1 for prefix, start, end in self.parts) + len(self.epilogue)
+        headers["Content-Length"] = str(content_length)
+        super().__init__(status_code=status_code, headers=headers, media_type=content_type)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if not self.send_body or scope.get("method") == "HEAD":
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            self.finish("head")
+            return
+        if self.admission is None:
+            try:
+                await self.send_body_parts(send, scope, [])
+            finally:
+                self.finish(self.kind)
+            return
+        # Admission happens before the status line, so a rejected request still gets a clean 503
+        try:
+            await self.admission.acquire()
+        except DownloadRejected as e:
+            response = JSONResponse({"detail": "Too many downloads in progress"}, status_code=503, headers={"Retry-After": str(e.retry_after)})
+            await response(scope, receive, send)
+            return
+        try:
+            await self.send_body_parts(send, scope, self.admission.stream_buckets())
+        finally:
+            self.admission.release()
+            self.finish(self.kind)
+
+    def finish(self, kind: str) -> None:
+        if self.on_finish is not None:
+            self.on_finish(kind, self.bytes_sent)
+
+    async def send_body_parts(self, send, scope, buckets: List[TokenBucket]) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        extensions = (scope.get("extensions") or {}) if self.admission is None else {}
+        if "http.response.pathsend" in extensions and len(self.parts) == 1 and self.parts[0][1:] == (0, self.file_size - 1):
+            await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+            self.bytes_sent = self.file_size
+            return
+        with open(self.path, "rb") as f:
+            for prefix, start, end in self.parts:
+                if prefix:
+                    await send({"type": "http.response.body", "body": prefix, "more_body": True})
+                    self.bytes_sent += len(prefix)
+                if "http.response.zerocopysend" in extensions:
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": f,
+                        "offset": start,
+                        "count": end - start + 1,
+                        "more_body": True,
+                    })
+                    self.bytes_sent += end - start + 1
+                else:
+                    await self.send_file_range(send, f.fileno(), start, end, buckets)
+        await send({"type": "http.response.body", "body": self.epilogue, "more_body": False})
+        self.bytes_sent += len(self.epilogue)
+
+    async def send_file_range(self, send, fd: int, start: int, end: int, buckets: List[TokenBucket]) -> None:
+        chunk_size = THROTTLED_CHUNK_SIZE if buckets else CHUNK_SIZE
+        position = start
+        while position <= end:
+            chunk = await run_in_threadpool(os.pread, fd, min(chunk_size, end - position + 1), position)
+            if not chunk:
+                break
+            position += len(chunk)
+            for bucket in buckets:
+                await bucket.consume(len(chunk))
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            self.bytes_sent += len(chunk)
@@ -1,18 +1,38 @@
+import gzip
+import hashlib
+import hmac
+import json
 import logging
 import os
-from typing import Optional
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import StreamingResponse, Response
+import queue
+import re
+import select
+import shutil
+import threading
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-import aiofiles
-import psycopg2
 import sqlite3
 from apscheduler.schedulers.background import BackgroundScheduler
 import time
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate, parsedate_to_datetime
 import requests
-from psycopg2.extras import execute_values, RealDictCursor
+from database import AdvisoryLock, PostgresPool, SchemaCache
+from metrics import MetricsRegistry
+from profiling import RunProfiler
+from snapshot import LruCache, SnapshotReader
+from file_serving import DownloadAdmission, FileRangeResponse, RangeNotSatisfiable, parse_range_header, range_not_satisfiable_response
+
+try:
+    import zstandard
+except ImportError:  # zstd variants are optional
+    zstandard = None
 
 # Configure logging
 logging.basicConfig(
@@ -23,7 +43,6 @@ logger = logging.getLogger("combined-script")
 
 # Configuration
 STORAGE_DIR = os.environ.get("STORAGE_DIR", "./storage")
-BACKUP_DIR = os.environ.get("BACKUP_DIR", "./backup")
 PODCAST_DB_FILE = "kotlinapp_data.db"
 SESSION_DB_FILE = "kotlinapp_sessions.db"
 CHUNK_SIZE = 1024 * 1024  # 1MB chunks for streaming
@@ -34,10 +53,95 @@ PG_USER = os.environ.get("PG_USER", "postgres")
 PG_PASSWORD = os.environ.get("PG_PASSWORD", "postgres")
 BACKEND_URL = os.environ.get("BACKEND_URL", "http://0.0.0.0:8080")
 POLL_INTERVAL = 30  # Seconds between backend health checks
+BOOTSTRAP_BACKOFF_INITIAL = float(os.environ.get("BOOTSTRAP_BACKOFF_INITIAL", "1"))  # First retry delay, doubled per attempt
+BOOTSTRAP_BACKOFF_MAX = float(os.environ.get("BOOTSTRAP_BACKOFF_MAX", str(POLL_INTERVAL)))
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", "5000"))  # SQLite rows fetched per round trip during import
+IMPORT_WORKERS = int(os.environ.get("IMPORT_WORKERS", "4"))  # Postgres connections used by the import scheduler
+IMPORT_CHUNK_ROWS = int(os.environ.get("IMPORT_CHUNK_ROWS", "50000"))  # Rows committed (and checkpointed) per import transaction
+IMPORT_CHECKPOINT_TABLE = "kotlinapp_import_checkpoints"
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "5000"))  # Postgres rows fetched per server-side cursor round trip
+EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS", "4"))  # Tables read concurrently under one snapshot; 1 disables
+SQLITE_FAST_BUILD = os.environ.get("SQLITE_FAST_BUILD", "true").lower() == "true"  # No journal or fsync while building scratch files
+SQLITE_BUILD_IN_MEMORY = os.environ.get("SQLITE_BUILD_IN_MEMORY", "false").lower() == "true"  # Full builds held in RAM until written out
+SQLITE_PAGE_SIZE = int(os.environ.get("SQLITE_PAGE_SIZE", "4096"))  # Matches the mobile SQLite default
+SQLITE_BUILD_CACHE_MB = int(os.environ.get("SQLITE_BUILD_CACHE_MB", "256"))
+EXPORT_STATE_FILE = os.path.join(STORAGE_DIR, "export_state.json")
+SESSION_EXPORT_STATE_FILE = os.path.join(STORAGE_DIR, "export_state_sessions.json")
+INCREMENTAL_EXPORT = os.environ.get("INCREMENTAL_EXPORT", "true").lower() == "true"
+EXPORT_INTERVAL_MINUTES = int(os.environ.get("EXPORT_INTERVAL_MINUTES", "10"))
+FULL_EXPORT_INTERVAL_HOURS = int(os.environ.get("FULL_EXPORT_INTERVAL_HOURS", "24"))  # Periodic full reconcile
+HWM_OVERLAP_SECONDS = int(os.environ.get("HWM_OVERLAP_SECONDS", "60"))  # Re-read window for late commits
+UPDATED_AT_COLUMN = "updated_at"
+UPDATED_AT_TRIGGER_NAME = "kotlinapp_touch_updated_at"  # The backend only sets updated_at on insert; this bumps it on every update
+DELETE_LOG_TABLE = "kotlinapp_export_deletes"  # Keys of deleted rows, written by triggers and read by incremental exports
+DELETE_LOG_TRIGGER_NAME = "kotlinapp_log_delete"
+DELETE_LOG_RETENTION_HOURS = int(os.environ.get("DELETE_LOG_RETENTION_HOURS", "48"))  # Exports with older marks sweep every key instead
+HISTORY_DIR = os.path.join(STORAGE_DIR, "history")  # Content-addressed store; published files are never modified
+PATCH_DIR = os.path.join(STORAGE_DIR, "patches")
+PUBLISH_MANIFEST_FILE = os.path.join(STORAGE_DIR, "publish_manifest.json")
+SESSION_PUBLISH_MANIFEST_FILE = os.path.join(STORAGE_DIR, "publish_manifest_sessions.json")
+ARTIFACT_HISTORY_SIZE = int(os.environ.get("ARTIFACT_HISTORY_SIZE", "7"))  # Published versions kept for patching
+ARTIFACT_MIN_RETENTION_MINUTES = int(os.environ.get("ARTIFACT_MIN_RETENTION_MINUTES", "60"))  # Grace period for in-flight and CDN fetches
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Variants are rebuilt on every publish, so the defaults favour speed; GZIP_LEVEL=9 and ZSTD_LEVEL=19 shrink them further
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+ZSTD_LEVEL = int(os.environ.get("ZSTD_LEVEL", "6"))
+# Pre-compressed siblings of the served artifact, in server preference order
+ENCODING_SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+ARTIFACT_METADATA_SUFFIX = ".json"  # Version/hash sidecar kept next to each artifact
+BUILD_SEARCH_INDEXES = os.environ.get("BUILD_SEARCH_INDEXES", "true").lower() == "true"  # Secondary and FTS5 indexes baked into artifacts
+SHARD_DIR = os.path.join(STORAGE_DIR, "shards")
+PROFILE_DIR = os.path.join(STORAGE_DIR, "profiles")
+PROFILE_FILE_PATTERN = re.compile(r"^(export|import)-\d{8}T\d{6}Z\.(txt|pstats)$")
+SHARD_MANIFEST_FILE = os.path.join(STORAGE_DIR, "shard_manifest.json")
+SHARD_CORE_TABLES = ["PodcastChannels", "PodcastChannelCategories", "PodcastEpisodeCategories", "ChannelCategoryMap"]
+SHARD_FILE_PATTERN = re.compile(r"^(core|channel-\d+)-[0-9a-f]{16}\.db$")
+
+PG_POOL_MAX_CONNECTIONS = int(os.environ.get("PG_POOL_MAX_CONNECTIONS", "10"))  # Shared by import, export and request-time queries
+PG_POOL_HEALTH_CHECK_SECONDS = float(os.environ.get("PG_POOL_HEALTH_CHECK_SECONDS", "30"))  # Idle time before a checkout is pinged
+PG_STATEMENT_TIMEOUT_MS = int(os.environ.get("PG_STATEMENT_TIMEOUT_MS", "60000"))
+IMPORT_STATEMENT_TIMEOUT_MS = int(os.environ.get("IMPORT_STATEMENT_TIMEOUT_MS", "0"))  # Bulk COPY statements; 0 disables
+
+CHANGE_NOTIFICATIONS = os.environ.get("CHANGE_NOTIFICATIONS", "true").lower() == "true"  # LISTEN/NOTIFY-driven exports
+CHANGE_CHANNEL = "kotlinapp_data_changed"
+CHANGE_TRIGGER_NAME = "kotlinapp_notify_change"
+EXPORT_DEBOUNCE_SECONDS = float(os.environ.get("EXPORT_DEBOUNCE_SECONDS", "30"))  # Quiet period before exporting a burst of changes
+EXPORT_MAX_STALENESS_SECONDS = float(os.environ.get("EXPORT_MAX_STALENESS_SECONDS", "300"))  # Upper bound while changes keep arriving
+# Schedules change constantly during the conference, so sessions publish on a much tighter cycle
+SESSION_EXPORT_DEBOUNCE_SECONDS = float(os.environ.get("SESSION_EXPORT_DEBOUNCE_SECONDS", "5"))
+SESSION_EXPORT_MAX_STALENESS_SECONDS = float(os.environ.get("SESSION_EXPORT_MAX_STALENESS_SECONDS", "60"))
+SNAPSHOT_READ_CONNECTIONS = int(os.environ.get("SNAPSHOT_READ_CONNECTIONS", "8"))  # Idle read-only connections kept per artifact
+SNAPSHOT_CACHE_ENTRIES = int(os.environ.get("SNAPSHOT_CACHE_ENTRIES", "2048"))  # Rendered query API responses
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+API_CACHE_CONTROL = "public, max-age=60"  # Short: the same URL answers from the next artifact after a publish
+LEADER_ELECTION = os.environ.get("LEADER_ELECTION", "true").lower() == "true"  # Only the lock holder imports and exports
+LEADER_CHECK_SECONDS = float(os.environ.get("LEADER_CHECK_SECONDS", "10"))  # Follower retry and leader self-check interval
+LEADER_LOCK_KEY = 0x6B6F746C696E01  # Advisory lock ids, unique to this service
+EXPORT_LOCK_KEY = LEADER_LOCK_KEY + 1
+WEB_WORKERS = int(os.environ.get("WEB_WORKERS", "1"))
+# granian (default) or uvicorn. Only granian offers http.response.pathsend, and it is only used for whole
+# files when admission is off, since the send returns before the bytes leave; everything else, ranges
+# included, is read in 1MB chunks on the threadpool
+HTTP_SERVER = os.environ.get("HTTP_SERVER", "granian").lower()
+DOWNLOAD_MAX_STREAMS = int(os.environ.get("DOWNLOAD_MAX_STREAMS", "64"))  # Concurrent file bodies per worker; 0 turns admission off
+DOWNLOAD_MAX_QUEUED = int(os.environ.get("DOWNLOAD_MAX_QUEUED", "128"))  # Waiting downloads before rejecting with 503
+DOWNLOAD_QUEUE_TIMEOUT_SECONDS = float(os.environ.get("DOWNLOAD_QUEUE_TIMEOUT_SECONDS", "10"))
+DOWNLOAD_RETRY_AFTER_SECONDS = float(os.environ.get("DOWNLOAD_RETRY_AFTER_SECONDS", "30"))  # Mean Retry-After, jittered +/-50%
+DOWNLOAD_STREAM_BYTES_PER_SECOND = int(os.environ.get("DOWNLOAD_STREAM_BYTES_PER_SECOND", "0"))  # Per-download cap; 0 disables
+DOWNLOAD_TOTAL_BYTES_PER_SECOND = int(os.environ.get("DOWNLOAD_TOTAL_BYTES_PER_SECOND", "0"))  # Per-worker cap; 0 disables
+PIPELINE_TRACE_LOG = os.environ.get("PIPELINE_TRACE_LOG", "false").lower() == "true"  # Log each import/export timing breakdown as JSON
+ADMIN_SECRET = os.environ.get("ADMIN_SECRET", "")  # X-Admin-Secret for /admin endpoints; unset disables them
+PROFILE_IMPORT = os.environ.get("PROFILE_IMPORT", "false").lower() == "true"  # Profile the bootstrap import
+PROFILE_TRACEBACK_FRAMES = int(os.environ.get("PROFILE_TRACEBACK_FRAMES", "25"))  # tracemalloc frames kept per allocation
+PROFILE_HISTORY_SIZE = int(os.environ.get("PROFILE_HISTORY_SIZE", "10"))  # Profiled runs whose reports are kept
 
 # Create directories
 os.makedirs(STORAGE_DIR, exist_ok=True)
-os.makedirs(BACKUP_DIR, exist_ok=True)
+os.makedirs(HISTORY_DIR, exist_ok=True)
+os.makedirs(PATCH_DIR, exist_ok=True)
+os.makedirs(SHARD_DIR, exist_ok=True)
+os.makedirs(PROFILE_DIR, exist_ok=True)
 
 # Initialize FastAPI app
 app = FastAPI(title="KotlinApp Combined Server", version="1.0.0")
@@ -49,6 +153,108 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Shared Postgres access
+pg_pool = PostgresPool(
+    PG_POOL_MAX_CONNECTIONS, PG_STATEMENT_TIMEOUT_MS, PG_POOL_HEALTH_CHECK_SECONDS,
+    host=PG_HOST, port=PG_PORT, dbname=PG_DBNAME, user=PG_USER, password=PG_PASSWORD,
+)
+schema_cache = SchemaCache()
+
+# Read-only access to the published podcast snapshot
+snapshot_reader = SnapshotReader(SNAPSHOT_READ_CONNECTIONS)
+query_cache = LruCache(SNAPSHOT_CACHE_ENTRIES)
+
+# Admission control for file downloads, so a publish-time stampede cannot starve health checks and exports
+download_admission = DownloadAdmission(
+    DOWNLOAD_MAX_STREAMS, DOWNLOAD_MAX_QUEUED, DOWNLOAD_QUEUE_TIMEOUT_SECONDS, DOWNLOAD_RETRY_AFTER_SECONDS,
+    stream_bytes_per_second=DOWNLOAD_STREAM_BYTES_PER_SECOND, total_bytes_per_second=DOWNLOAD_TOTAL_BYTES_PER_SECOND,
+) if DOWNLOAD_MAX_STREAMS > 0 else None
+
+# Metrics served on /metrics; each import and export also produces a trace for the span hooks
+metrics = MetricsRegistry()
+pipeline_runs = metrics.counter("kotlinapp_pipeline_runs_total", "Import and export runs by outcome", ("pipeline", "result"))
+pipeline_duration = metrics.histogram("kotlinapp_pipeline_duration_seconds", "Wall time of whole import and export runs", ("pipeline",))
+pipeline_stage_seconds = metrics.histogram("kotlinapp_pipeline_stage_seconds", "Time spent in each pipeline stage", ("pipeline", "dataset", "stage"))
+pipeline_rows = metrics.counter("kotlinapp_pipeline_rows_total", "Rows moved per table", ("pipeline", "table"))
+pipeline_table_rate = metrics.gauge("kotlinapp_pipeline_table_rows_per_second", "Row rate per table in the latest run", ("pipeline", "table"))
+artifact_size = metrics.gauge("kotlinapp_artifact_size_bytes", "Size of the current artifact per encoding", ("dataset", "encoding"))
+artifact_version = metrics.gauge("kotlinapp_artifact_version", "Version of the current artifact", ("dataset",))
+download_responses = metrics.counter("kotlinapp_download_responses_total", "File download responses by kind", ("kind",))
+download_bytes = metrics.counter("kotlinapp_download_bytes_total", "Body bytes sent by file downloads", ("kind",))
+metrics.stats_collector("kotlinapp_postgres_pool", "Postgres connection pool statistics", pg_pool.get_stats,
+                        counters=("connections_opened", "connections_discarded", "checkouts", "checkout_wait_seconds_total", "health_check_failures"))
+metrics.stats_collector("kotlinapp_snapshot_reader", "Read-only snapshot connection statistics", snapshot_reader.get_stats,
+                        counters=("connections_opened", "queries"))
+metrics.stats_collector("kotlinapp_query_cache", "Query API response cache statistics", query_cache.get_stats,
+                        counters=("hits", "misses"))
+if download_admission is not None:
+    metrics.stats_collector("kotlinapp_downloads", "Download admission statistics", download_admission.get_stats,
+                            counters=("admitted", "queued", "rejected", "timed_out"))
+
+def log_trace(record):
+    logger.info(f"Pipeline trace: {json.dumps(record, sort_keys=True)}")
+
+if PIPELINE_TRACE_LOG:
+    metrics.add_span_hook(log_trace)
+
+def record_stage(trace, dataset, stage, seconds, table=None):
+    pipeline_stage_seconds.observe(seconds, pipeline=trace.name, dataset=dataset, stage=stage)
+    trace.add_span(stage, seconds, dataset=dataset, table=table)
+
+@contextmanager
+def pipeline_stage(trace, dataset, stage):
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        record_stage(trace, dataset, stage, time.monotonic() - started)
+
+def record_table_rate(trace, table, rows, seconds):
+    pipeline_rows.inc(rows, pipeline=trace.name, table=table)
+    if seconds > 0:
+        pipeline_table_rate.set(round(rows / seconds, 1), pipeline=trace.name, table=table)
+
+def record_download(kind, sent):
+    download_responses.inc(kind=kind)
+    download_bytes.inc(sent, kind=kind)
+
+# On-demand profiling: an armed target ("export" or "import") profiles its next run only
+pending_profiles = {"import": {"allocations": True}} if PROFILE_IMPORT else {}
+profile_lock = threading.Lock()
+
+def arm_profile(target, allocations):
+    with profile_lock:
+        pending_profiles[target] = {"allocations": allocations, "armed_at": datetime.now(timezone.utc).isoformat()}
+
+def profile_run(target, run):
+    with profile_lock:
+        options = pending_profiles.pop(target, None)
+    if options is None:
+        return run()
+    logger.info(f"Profiling this {target} run (allocations: {options['allocations']})")
+    profiler = RunProfiler(["export", "import"], allocations=options["allocations"], traceback_frames=PROFILE_TRACEBACK_FRAMES)
+    try:
+        with profiler:
+            return run()
+    finally:
+        try:
+            files = profiler.write_reports(PROFILE_DIR, target)
+            logger.info(f"Wrote {target} profile reports {', '.join(files)}")
+            prune_profile_reports()
+        except Exception as e:
+            logger.error(f"Could not write {target} profile reports: {e}")
+
+def list_profile_reports():
+    files = sorted((f for f in os.listdir(PROFILE_DIR) if PROFILE_FILE_PATTERN.match(f)), reverse=True)
+    return [{"file": f, "size": os.path.getsize(os.path.join(PROFILE_DIR, f))} for f in files]
+
+def prune_profile_reports():
+    stems = sorted({os.path.splitext(report["file"])[0] for report in list_profile_reports()}, reverse=True)
+    for stem in stems[PROFILE_HISTORY_SIZE:]:
+        for suffix in (".txt", ".pstats"):
+            if os.path.exists(os.path.join(PROFILE_DIR, stem + suffix)):
+                os.remove(os.path.join(PROFILE_DIR, stem + suffix))
+
 # Models
 class VersionInfo(BaseModel):
     version: str
@@ -58,6 +264,36 @@ class VersionInfo(BaseModel):
     hash: Optional[str] = None
     description: Optional[str] = None
 
+class PatchInfo(BaseModel):
+    from_version: int
+    to_version: int
+    url: str
+    size: int
+    hash: str
+
+class PatchPlan(BaseModel):
+    current_version: Optional[int] = None
+    latest_version: int
+    latest_hash: str
+    full_download: bool
+    url: Optional[str] = None
+    size: int
+    patches: List[PatchInfo] = []
+
+class ShardInfo(BaseModel):
+    channel_id: Optional[int] = None
+    episodes: int = 0
+    url: str
+    size: int
+    hash: str
+
+class ShardManifest(BaseModel):
+    version: int
+    generated_at: str
+    total_size: int
+    core: ShardInfo
+    channels: List[ShardInfo]
+
 # Table mappings and column mappings (unchanged)
 PODCAST_TABLES = [
     {"sqlite_table": "PodcastChannelCategories", "pg_table": "podcast_channel_categories", "id_column": "id", "has_dependencies": False},
@@ -181,6 +417,15 @@ EXCLUDED_COLUMNS = {
     "episode_category_map": ["created_at", "updated_at"]
 }
 
+EXPORT_KEY_COLUMNS = {
+    "podcast_channels": ["id"],
+    "podcast_episodes": ["id"],
+    "podcast_channel_categories": ["id"],
+    "podcast_episode_categories": ["id"],
+    "channel_category_map": ["channel_id", "category_id"],
+    "episode_category_map": ["episode_id", "category_id"]
+}
+
 COLUMN_MAPPING = {
     "podcast_channels": {"id": "id", "title": "title", "link": "link", "description": "description", "copyright": "copyright", "language": "language", "author": "author", "owner_email": "ownerEmail", "owner_name": "ownerName", "image_url": "imageUrl", "last_build_date": "lastBuildDate"},
     "podcast_episodes": {"id": "id", "channel_id": "channelId", "guid": "guid", "title": "title", "description": "description", "link": "link", "pub_date": "pubDate", "duration": "duration", "explicit": "explicit", "image_url": "imageUrl", "media_url": "mediaUrl", "media_type": "mediaType", "media_length": "mediaLength"},
@@ -190,6 +435,175 @@ COLUMN_MAPPING = {
     "episode_category_map": {"episode_id": "episodeId", "category_id": "categoryId"}
 }
 
+# SQLite schemas and mappings for the session export, matching SessionDatabase.sq
+SESSION_SQLITE_SCHEMAS = {
+    "ConferenceRoomsTable": """
+        CREATE TABLE IF NOT EXISTS ConferenceRoomsTable (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            sort INTEGER,
+            isPending INTEGER NOT NULL DEFAULT 0,
+            lastSyncedTimestamp INTEGER DEFAULT NULL
+        )
+    """,
+    "ConferenceCategoriesTable": """
+        CREATE TABLE IF NOT EXISTS ConferenceCategoriesTable (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            sort INTEGER,
+            type TEXT,
+            isPending INTEGER NOT NULL DEFAULT 1,
+            lastSyncedTimestamp INTEGER DEFAULT NULL
+        )
+    """,
+    "ConferenceSpeakersTable": """
+        CREATE TABLE IF NOT EXISTS ConferenceSpeakersTable (
+            id TEXT NOT NULL PRIMARY KEY,
+            firstName TEXT NOT NULL,
+            lastName TEXT NOT NULL,
+            bio TEXT,
+            tagLine TEXT,
+            profilePicture TEXT,
+            isTopSpeaker INTEGER DEFAULT 0,
+            isPending INTEGER NOT NULL DEFAULT 1,
+            lastSyncedTimestamp INTEGER DEFAULT NULL
+        )
+    """,
+    "SessionTable": """
+        CREATE TABLE IF NOT EXISTS SessionTable (
+            id TEXT NOT NULL PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            roomId INTEGER REFERENCES ConferenceRoomsTable(id),
+            startsAt INTEGER NOT NULL,
+            endsAt INTEGER NOT NULL,
+            isServiceSession INTEGER NOT NULL DEFAULT 0,
+            isPlenumSession INTEGER NOT NULL DEFAULT 0,
+            status TEXT DEFAULT 'draft',
+            isPending INTEGER NOT NULL DEFAULT 1,
+            lastSyncedTimestamp INTEGER DEFAULT NULL
+        )
+    """,
+    "SessionSpeakersTable": """
+        CREATE TABLE IF NOT EXISTS SessionSpeakersTable (
+            sessionId TEXT NOT NULL,
+            speakerId TEXT NOT NULL,
+            isPending INTEGER NOT NULL DEFAULT 1,
+            lastSyncedTimestamp INTEGER DEFAULT NULL,
+            PRIMARY KEY (sessionId, speakerId),
+            FOREIGN KEY (sessionId) REFERENCES SessionTable(id),
+            FOREIGN KEY (speakerId) REFERENCES ConferenceSpeakersTable(id)
+        )
+    """,
+    "SessionCategoriesTable": """
+        CREATE TABLE IF NOT EXISTS SessionCategoriesTable (
+            sessionId TEXT NOT NULL,
+            categoryId INTEGER NOT NULL,
+            isPending INTEGER NOT NULL DEFAULT 1,
+            lastSyncedTimestamp INTEGER DEFAULT NULL,
+            PRIMARY KEY (sessionId, categoryId),
+            FOREIGN KEY (sessionId) REFERENCES SessionTable(id),
+            FOREIGN KEY (categoryId) REFERENCES ConferenceCategoriesTable(id)
+        )
+    """
+}
+
+# Secondary indexes from the app's createSearchIndexes; same names, so the on-device IF NOT EXISTS is a no-op
+SEARCH_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_podcast_channel_title ON PodcastChannels(title)",
+    "CREATE INDEX IF NOT EXISTS idx_podcast_channel_desc ON PodcastChannels(description)",
+    "CREATE INDEX IF NOT EXISTS idx_podcast_channel_author ON PodcastChannels(author)",
+    "CREATE INDEX IF NOT EXISTS idx_episode_pubdate ON PodcastEpisodes(pubDate DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_episode_title ON PodcastEpisodes(title)",
+    "CREATE INDEX IF NOT EXISTS idx_episode_channel ON PodcastEpisodes(channelId)",
+    "CREATE INDEX IF NOT EXISTS idx_episode_categories_name ON PodcastEpisodeCategories(name)",
+    "CREATE INDEX IF NOT EXISTS idx_channel_categories_name ON PodcastChannelCategories(name)",
+    "CREATE INDEX IF NOT EXISTS idx_episodecategorymap_combined ON EpisodeCategoryMap(episodeId, categoryId)",
+    "CREATE INDEX IF NOT EXISTS idx_episodecategorymap_episodeid ON EpisodeCategoryMap(episodeId)",
+    "CREATE INDEX IF NOT EXISTS idx_episodecategorymap_categoryid ON EpisodeCategoryMap(categoryId)",
+    "CREATE INDEX IF NOT EXISTS idx_channelcategorymap_combined ON ChannelCategoryMap(channelId, categoryId)",
+    "CREATE INDEX IF NOT EXISTS idx_channel_category ON ChannelCategoryMap(channelId)",
+    # Not in the app schema: keyset pages of one channel's episodes without a sort
+    "CREATE INDEX IF NOT EXISTS idx_episode_channel_pubdate ON PodcastEpisodes(channelId, pubDate DESC, id DESC)"
+]
+
+SESSION_SEARCH_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_session_title ON SessionTable(title)",
+    "CREATE INDEX IF NOT EXISTS idx_session_desc ON SessionTable(description)"
+]
+
+# External-content FTS5 tables: the text lives only in the content table, keyed by its INTEGER PRIMARY KEY
+FTS_TABLES = {
+    "PodcastChannelsFts": {"content": "PodcastChannels", "columns": ["title", "description", "author"]},
+    "PodcastEpisodesFts": {"content": "PodcastEpisodes", "columns": ["title", "description"]}
+}
+
+SESSION_TABLE_MAPPING = {t["pg_table"]: t["sqlite_table"] for t in SESSION_TABLES}
+
+SESSION_EXCLUDED_COLUMNS = {pg_table: ["created_at", "updated_at"] for pg_table in SESSION_TABLE_MAPPING}
+
+SESSION_EXPORT_KEY_COLUMNS = {
+    "conference_rooms": ["id"],
+    "conference_categories": ["id"],
+    "conference_speakers": ["id"],
+    "conference_sessions": ["id"],
+    "session_speakers": ["session_id", "speaker_id"],
+    "session_categories": ["session_id", "category_item_id"]
+}
+
+# The import mapping read backwards: Postgres column -> SQLite column
+SESSION_EXPORT_COLUMN_MAPPING = {
+    pg_table: {pg_col: sqlite_col for sqlite_col, pg_col in SESSION_COLUMN_MAPPING[sqlite_table].items() if pg_col is not None}
+    for pg_table, sqlite_table in SESSION_TABLE_MAPPING.items()
+}
+
+# Rows shipped by the server are already synced; isPending marks rows still to be uploaded from the device
+SESSION_CONSTANT_COLUMNS = {sqlite_table: {"isPending": 0} for sqlite_table in SESSION_SQLITE_SCHEMAS}
+
+# Nullable in Postgres but NOT NULL in the app's SessionDatabase.sq, whose generated code throws on NULL
+SESSION_COLUMN_DEFAULTS = {"conference_sessions": {"description": ""}}
+
+EXPORT_DATASETS = {
+    "podcasts": {
+        "name": "podcasts",
+        "db_file": PODCAST_DB_FILE,
+        "schemas": SQLITE_SCHEMAS,
+        "table_mapping": TABLE_MAPPING,
+        "column_mapping": COLUMN_MAPPING,
+        "excluded_columns": EXCLUDED_COLUMNS,
+        "key_columns": EXPORT_KEY_COLUMNS,
+        "constant_columns": {},
+        "column_defaults": {},
+        "state_file": EXPORT_STATE_FILE,
+        "manifest_file": PUBLISH_MANIFEST_FILE,
+        "url_prefix": "",
+        "indexes": SEARCH_INDEXES,
+        "fts_tables": FTS_TABLES,
+        "shards": True,
+        "debounce_seconds": EXPORT_DEBOUNCE_SECONDS,
+        "max_staleness_seconds": EXPORT_MAX_STALENESS_SECONDS,
+    },
+    "sessions": {
+        "name": "sessions",
+        "db_file": SESSION_DB_FILE,
+        "schemas": SESSION_SQLITE_SCHEMAS,
+        "table_mapping": SESSION_TABLE_MAPPING,
+        "column_mapping": SESSION_EXPORT_COLUMN_MAPPING,
+        "excluded_columns": SESSION_EXCLUDED_COLUMNS,
+        "key_columns": SESSION_EXPORT_KEY_COLUMNS,
+        "constant_columns": SESSION_CONSTANT_COLUMNS,
+        "column_defaults": SESSION_COLUMN_DEFAULTS,
+        "state_file": SESSION_EXPORT_STATE_FILE,
+        "manifest_file": SESSION_PUBLISH_MANIFEST_FILE,
+        "url_prefix": "/sessions",
+        "indexes": SESSION_SEARCH_INDEXES,
+        "fts_tables": {},  # SessionTable has a TEXT key, and VACUUM may renumber implicit rowids
+        "shards": False,
+        "debounce_seconds": SESSION_EXPORT_DEBOUNCE_SECONDS,
+        "max_staleness_seconds": SESSION_EXPORT_MAX_STALENESS_SECONDS,
+    },
+}
+
 # Helper functions for import
 def check_backend_availability(backend_url):
     urls_to_try = [backend_url, "http://backend:8080", "http://localhost:8080"]
@@ -207,126 +621,328 @@ def check_backend_availability(backend_url):
 def check_file_exists(filepath):
     return os.path.exists(filepath)
 
-def get_sqlite_data(sqlite_path, table_name):
-    conn = sqlite3.connect(sqlite_path)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    columns = [row[1] for row in cursor.fetchall()]
-    cursor.execute(f"SELECT * FROM {table_name}")
-    rows = cursor.fetchall()
-    result = [{columns[i]: row[i] for i in range(len(columns))} for row in rows]
-    conn.close()
-    return result
-
-def check_sqlite_table_exists(sqlite_path, table_name):
-    conn = sqlite3.connect(sqlite_path)
-    cursor = conn.cursor()
-    cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}'")
+def check_sqlite_table_exists(sqlite_conn, table_name, db_name="main"):
+    cursor = sqlite_conn.cursor()
+    cursor.execute(f"SELECT name FROM {db_name}.sqlite_master WHERE type='table' AND name=?", (table_name,))
     exists = cursor.fetchone() is not None
-    conn.close()
+    cursor.close()
     return exists
 
-def get_postgres_column_types(pg_conn, table_name):
+def get_postgres_column_types(pg_conn, table_name, schema="public"):
+    return dict(schema_cache.get_columns(pg_conn, schema, table_name))
+
+COPY_NULL = "\\N"
+# Types whose text form never contains COPY delimiters, so values are written without escaping
+COPY_PLAIN_TYPES = ("smallint", "integer", "bigint", "numeric", "real", "double precision")
+
+def encode_copy_numbers(values):
+    return [COPY_NULL if value is None else str(value) for value in values]
+
+def escape_copy_text(value):
+    # Chained replace runs in C and is far cheaper than str.translate with multi-character mappings
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+def encode_copy_texts(values):
+    return [COPY_NULL if value is None else escape_copy_text(value if isinstance(value, str) else str(value)) for value in values]
+
+def compile_import_columns(pg_columns, column_types):
+    # Resolved once per table: how each column is staged, encoded for COPY and converted on insert.
+    # Timestamps and booleans travel as integers and are converted by Postgres, not per cell in Python
+    staged, encoders, inserted = [], [], []
+    for pg_col in pg_columns:
+        data_type = column_types.get(pg_col, "")
+        quoted = f'"{pg_col}"'
+        if pg_col in TIMESTAMP_COLUMNS:
+            staged.append(f"NULL::bigint AS {quoted}")
+            encoders.append(encode_copy_numbers)
+            epoch = f"to_timestamp({quoted} / 1000.0)"
+            inserted.append(epoch if data_type == "timestamp with time zone" else f"{epoch} AT TIME ZONE 'UTC'")
+        elif data_type == "boolean":
+            staged.append(f"NULL::bigint AS {quoted}")
+            encoders.append(encode_copy_numbers)
+            inserted.append(f"{quoted} = 1")
+        else:
+            staged.append(quoted)
+            encoders.append(encode_copy_numbers if data_type in COPY_PLAIN_TYPES else encode_copy_texts)
+            inserted.append(quoted)
+    return staged, encoders, inserted
+
+class CopyStream:
+    # File-like adapter letting copy_expert pull COPY lines from a generator instead of a full buffer
+    def __init__(self, lines):
+        self.lines = lines
+        self.buffer = bytearray()
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            line = next(self.lines, None)
+            if line is None:
+                break
+            self.buffer.extend(line)
+        if size < 0:
+            size = len(self.buffer)
+        chunk = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return chunk
+
+def iter_copy_chunks(sqlite_conn, sqlite_table, columns, encoders, after_rowid, through_rowid, batch_size=IMPORT_BATCH_SIZE):
+    # One COPY text chunk per batch, encoded column by column
+    cursor = sqlite_conn.cursor()
+    cursor.execute(f"SELECT {', '.join(columns)} FROM {sqlite_table} WHERE rowid > ? AND rowid <= ?", (after_rowid, through_rowid))
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        encoded = [encode(values) for encode, values in zip(encoders, zip(*rows))]
+        yield ("\n".join(map("\t".join, zip(*encoded))) + "\n").encode("utf-8")
+    cursor.close()
+
+def ensure_import_checkpoint_table(pg_conn):
     cursor = pg_conn.cursor()
-    cursor.execute("SELECT column_name, data_type FROM information_schema.columns WHERE table_name = %s", (table_name,))
-    return {row[0]: row[1] for row in cursor.fetchall()}
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {IMPORT_CHECKPOINT_TABLE} (
+            pg_table TEXT PRIMARY KEY,
+            source TEXT NOT NULL,
+            last_rowid BIGINT NOT NULL,
+            rows_imported BIGINT NOT NULL,
+            completed BOOLEAN NOT NULL,
+            checkpointed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    cursor.close()
 
-def convert_timestamp_to_postgresql(value):
-    if value is None:
-        return None
-    timestamp_in_seconds = value / 1000
-    dt = datetime.fromtimestamp(timestamp_in_seconds, tz=timezone.utc)
-    return dt.strftime('%Y-%m-%d %H:%M:%S')
+def save_import_checkpoint(cursor, pg_table, checkpoint):
+    cursor.execute(
+        f"INSERT INTO {IMPORT_CHECKPOINT_TABLE} (pg_table, source, last_rowid, rows_imported, completed) VALUES (%s, %s, %s, %s, %s) "
+        "ON CONFLICT (pg_table) DO UPDATE SET source = EXCLUDED.source, last_rowid = EXCLUDED.last_rowid, "
+        "rows_imported = EXCLUDED.rows_imported, completed = EXCLUDED.completed, checkpointed_at = now()",
+        (pg_table, checkpoint["source"], checkpoint["last_rowid"], checkpoint["rows_imported"], checkpoint["completed"]),
+    )
 
-def convert_boolean_for_postgresql(value):
-    if value is None:
-        return None
-    return value == 1
+def import_interrupted(pg_conn):
+    # Any unfinished checkpoint means an import died part-way, however many rows the tables hold
+    cursor = pg_conn.cursor()
+    cursor.execute("SELECT to_regclass(%s)", (IMPORT_CHECKPOINT_TABLE,))
+    interrupted = False
+    if cursor.fetchone()[0] is not None:
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {IMPORT_CHECKPOINT_TABLE} WHERE NOT completed)")
+        interrupted = cursor.fetchone()[0]
+    cursor.close()
+    pg_conn.rollback()
+    return interrupted
 
-def insert_data_to_postgres(pg_conn, table_data, table_info, column_mapping, dry_run=False):
+def sqlite_source_fingerprint(sqlite_path):
+    stat = os.stat(sqlite_path)
+    return f"{os.path.basename(os.path.realpath(sqlite_path))}:{stat.st_size}:{stat.st_mtime_ns}"
+
+def prepare_import_checkpoints(tasks):
+    # Resumes from saved checkpoints only while an import is unfinished and its source file is unchanged;
+    # otherwise every table starts from the beginning
+    with pg_pool.connection() as pg_conn:
+        ensure_import_checkpoint_table(pg_conn)
+        cursor = pg_conn.cursor()
+        cursor.execute(f"SELECT pg_table, source, last_rowid, rows_imported, completed FROM {IMPORT_CHECKPOINT_TABLE}")
+        saved = {
+            row[0]: {"source": row[1], "last_rowid": row[2], "rows_imported": row[3], "completed": row[4]}
+            for row in cursor.fetchall()
+        }
+        resuming = any(not checkpoint["completed"] for checkpoint in saved.values())
+        if not resuming:
+            cursor.execute(f"DELETE FROM {IMPORT_CHECKPOINT_TABLE}")
+        for task in tasks:
+            source = sqlite_source_fingerprint(task["sqlite_path"])
+            checkpoint = saved.get(task["pg_table"]) if resuming else None
+            if checkpoint is None or checkpoint["source"] != source:
+                checkpoint = {"source": source, "last_rowid": 0, "rows_imported": 0, "completed": False}
+            elif checkpoint["completed"]:
+                logger.info(f"Resuming import: {task['pg_table']} already complete ({checkpoint['rows_imported']} rows)")
+            else:
+                logger.info(f"Resuming import: {task['pg_table']} after rowid {checkpoint['last_rowid']} ({checkpoint['rows_imported']} rows done)")
+            task["checkpoint"] = checkpoint
+            save_import_checkpoint(cursor, task["pg_table"], checkpoint)
+        pg_conn.commit()
+        cursor.close()
+    return resuming
+
+def copy_table_to_postgres(pg_conn, sqlite_conn, table_info, column_mapping, checkpoint):
     pg_table = table_info["pg_table"]
     sqlite_table = table_info["sqlite_table"]
-    if not table_data:
+    if checkpoint["completed"]:
         return 0
-    column_types = get_postgres_column_types(pg_conn, pg_table)
     mapping = column_mapping.get(sqlite_table, {})
-    mapping = {k: v for k, v in mapping.items() if v is not None}
-    valid_sqlite_columns = [col for col in mapping.keys() if col in table_data[0]]
-    valid_pg_columns = [mapping[col] for col in valid_sqlite_columns]
-    columns_str = ', '.join([f'"{col}"' for col in valid_pg_columns])
-    values = []
-    for row in table_data:
-        row_values = []
-        for col in valid_sqlite_columns:
-            pg_col = mapping[col]
-            value = row.get(col)
-            if pg_col in TIMESTAMP_COLUMNS and value is not None:
-                value = convert_timestamp_to_postgresql(value)
-            elif column_types.get(pg_col) == 'boolean' and value is not None:
-                value = convert_boolean_for_postgresql(value)
-            row_values.append(value)
-        values.append(tuple(row_values))
-    if dry_run:
-        return len(values)
-    cursor = pg_conn.cursor()
-    insert_query = f'INSERT INTO {pg_table} ({columns_str}) VALUES %s ON CONFLICT DO NOTHING'
-    execute_values(cursor, insert_query, values)
-    pg_conn.commit()
-    logger.info(f"Inserted {len(values)} rows into {pg_table}")
-    return len(values)
+    existing_columns = get_sqlite_table_columns(sqlite_conn, sqlite_table)
+    sqlite_columns = [col for col, pg_col in mapping.items() if pg_col is not None and col in existing_columns]
+    pg_columns = [mapping[col] for col in sqlite_columns]
+    staged, encoders, inserted = compile_import_columns(pg_columns, get_postgres_column_types(pg_conn, pg_table))
+    # COPY into a staging table first so existing rows keep ON CONFLICT DO NOTHING semantics
+    staging_table = f"import_{pg_table}"
+    columns_str = ', '.join([f'"{col}"' for col in pg_columns])
+    inserted_rows = 0
+    staged_rows = 0
+    timings = table_info.setdefault("timings", {"copy": 0.0, "insert": 0.0})
+    while True:
+        # Each chunk commits together with its checkpoint, so a restart resumes exactly after the last commit
+        through_rowid = None
+        if sqlite_columns:
+            through_rowid = sqlite_conn.execute(
+                f"SELECT max(rowid) FROM (SELECT rowid FROM {sqlite_table} WHERE rowid > ? ORDER BY rowid LIMIT ?)",
+                (checkpoint["last_rowid"], IMPORT_CHUNK_ROWS),
+            ).fetchone()[0]
+        cursor = pg_conn.cursor()
+        try:
+            if through_rowid is None:
+                checkpoint["completed"] = True
+            else:
+                chunks = iter_copy_chunks(sqlite_conn, sqlite_table, sqlite_columns, encoders, checkpoint["last_rowid"], through_rowid)
+                cursor.execute("SET LOCAL statement_timeout = %s", (IMPORT_STATEMENT_TIMEOUT_MS,))
+                cursor.execute(f"CREATE TEMP TABLE {staging_table} ON COMMIT DROP AS SELECT {', '.join(staged)} FROM {pg_table} WITH NO DATA")
+                started = time.monotonic()
+                # SQLite reads and encoding are streamed into COPY, so "copy" covers all three
+                cursor.copy_expert(f"COPY {staging_table} ({columns_str}) FROM STDIN", CopyStream(chunks), size=CHUNK_SIZE)
+                staged_rows += cursor.rowcount
+                copied = time.monotonic()
+                cursor.execute(f"INSERT INTO {pg_table} ({columns_str}) SELECT {', '.join(inserted)} FROM {staging_table} ON CONFLICT DO NOTHING")
+                inserted_rows += cursor.rowcount
+                timings["copy"] += copied - started
+                timings["insert"] += time.monotonic() - copied
+                checkpoint["rows_imported"] += cursor.rowcount
+                checkpoint["last_rowid"] = through_rowid
+            save_import_checkpoint(cursor, pg_table, checkpoint)
+            pg_conn.commit()
+        except Exception:
+            pg_conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        if checkpoint["completed"]:
+            break
+        logger.info(f"Checkpointed {pg_table} at rowid {through_rowid} ({checkpoint['rows_imported']} rows)")
+    logger.info(f"Inserted {inserted_rows} of {staged_rows} rows into {pg_table}")
+    return inserted_rows
 
-def import_data_to_postgres(sqlite_path, pg_conn, table_mappings, column_mappings):
-    total_rows = 0
-    existing_tables = []
+def build_import_levels(table_mappings):
+    # Topological levels: every table's dependencies sit in an earlier level
+    tables = {}
+    for table_info in table_mappings:
+        if table_info["sqlite_table"] in tables:
+            raise ValueError(f"Table {table_info['sqlite_table']} is listed twice in the import plan")
+        tables[table_info["sqlite_table"]] = table_info
     for table_info in table_mappings:
-        sqlite_table = table_info["sqlite_table"]
-        if check_sqlite_table_exists(sqlite_path, sqlite_table):
-            table_data = get_sqlite_data(sqlite_path, sqlite_table)
-            total_rows += len(table_data)
-            existing_tables.append(table_info)
-    if not existing_tables:
+        missing = [dep for dep in table_info.get("depends_on", []) if dep not in tables]
+        if missing:
+            raise ValueError(f"Table {table_info['sqlite_table']} depends on unknown tables {missing}")
+    levels = []
+    placed = set()
+    remaining = list(table_mappings)
+    while remaining:
+        level = [t for t in remaining if all(dep in placed for dep in t.get("depends_on", []))]
+        if not level:
+            raise ValueError(f"Dependency cycle between {sorted(t['sqlite_table'] for t in remaining)}")
+        levels.append(level)
+        placed.update(t["sqlite_table"] for t in level)
+        remaining = [t for t in remaining if t["sqlite_table"] not in placed]
+    return levels
+
+def import_table(task):
+    started = time.monotonic()
+    sqlite_conn = sqlite3.connect(f"file:{task['sqlite_path']}?mode=ro", uri=True)
+    try:
+        with pg_pool.connection() as pg_conn:
+            rows = copy_table_to_postgres(pg_conn, sqlite_conn, task, task["column_mapping"], task["checkpoint"])
+    finally:
+        sqlite_conn.close()
+    return rows, time.monotonic() - started
+
+def import_data_to_postgres(tasks, trace, workers=IMPORT_WORKERS):
+    levels = build_import_levels(tasks)
+    for index, level in enumerate(levels):
+        logger.info(f"Import level {index}: {', '.join(t['sqlite_table'] for t in level)}")
+    # Tables missing from their SQLite file are skipped, and so is everything depending on them
+    skipped = set()
+    for level in levels:
+        for task in level:
+            sqlite_conn = sqlite3.connect(f"file:{task['sqlite_path']}?mode=ro", uri=True)
+            exists = check_sqlite_table_exists(sqlite_conn, task["sqlite_table"])
+            sqlite_conn.close()
+            blocked = [dep for dep in task.get("depends_on", []) if dep in skipped]
+            if not exists or blocked:
+                reason = f"missing from {task['sqlite_path']}" if not exists else f"depends on skipped {blocked}"
+                logger.warning(f"Skipping import of {task['sqlite_table']}: {reason}")
+                skipped.add(task["sqlite_table"])
+    if skipped:
+        # Nothing will ever be imported for these, so they must not look like an interrupted import
+        with pg_pool.connection() as pg_conn:
+            cursor = pg_conn.cursor()
+            for task in tasks:
+                if task["sqlite_table"] in skipped:
+                    save_import_checkpoint(cursor, task["pg_table"], dict(task["checkpoint"], completed=True))
+            pg_conn.commit()
+            cursor.close()
+    pending = [task for level in levels for task in level if task["sqlite_table"] not in skipped]
+    if not pending:
         return 0
-    imported_tables = set()
+    workers = max(1, min(workers, len(pending)))
+    started = time.monotonic()
+    completed = set()
+    running = {}
+    errors = []
     rows_imported = 0
-    for table_info in existing_tables:
-        if not table_info["has_dependencies"]:
-            sqlite_table = table_info["sqlite_table"]
-            table_data = get_sqlite_data(sqlite_path, sqlite_table)
-            imported_rows = insert_data_to_postgres(pg_conn, table_data, table_info, column_mappings)
-            rows_imported += imported_rows
-            imported_tables.add(sqlite_table)
-    remaining_tables = [t for t in existing_tables if t["has_dependencies"]]
-    progress_made = True
-    while remaining_tables and progress_made:
-        progress_made = False
-        tables_to_remove = []
-        for table_info in remaining_tables:
-            dependencies = table_info.get("depends_on", [])
-            if all(dep in imported_tables for dep in dependencies):
-                sqlite_table = table_info["sqlite_table"]
-                table_data = get_sqlite_data(sqlite_path, sqlite_table)
-                imported_rows = insert_data_to_postgres(pg_conn, table_data, table_info, column_mappings)
-                rows_imported += imported_rows
-                imported_tables.add(sqlite_table)
-                tables_to_remove.append(table_info)
-                progress_made = True
-        for table_info in tables_to_remove:
-            remaining_tables.remove(table_info)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import") as executor:
+        # Tables start as soon as their own dependencies finish rather than waiting for the whole level
+        while pending or running:
+            ready = [task for task in pending if all(dep in completed for dep in task.get("depends_on", []))]
+            for task in ready:
+                running[executor.submit(import_table, task)] = task
+                pending.remove(task)
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                try:
+                    rows, elapsed = future.result()
+                except Exception as e:
+                    logger.error(f"Import of {task['sqlite_table']} failed: {e}")
+                    errors.append(e)
+                    pending = []  # Let running tables finish, start nothing new
+                    continue
+                logger.info(f"Imported {task['sqlite_table']} into {task['pg_table']}: {rows} rows in {elapsed:.2f}s")
+                for stage, seconds in task.get("timings", {}).items():
+                    record_stage(trace, task["dataset"], stage, seconds, table=task["pg_table"])
+                record_table_rate(trace, task["pg_table"], rows, elapsed)
+                rows_imported += rows
+                completed.add(task["sqlite_table"])
+    if errors:
+        raise errors[0]
+    logger.info(f"Import finished: {rows_imported} rows across {len(completed)} tables in {time.monotonic() - started:.2f}s")
     return rows_imported
 
-def perform_import(pg_conn, podcast_db_path, session_db_path):
+def perform_import(podcast_db_path, session_db_path):
     podcast_exists = check_file_exists(podcast_db_path)
     session_exists = check_file_exists(session_db_path)
     if not podcast_exists and not session_exists:
         logger.error("Neither podcast nor session SQLite files found")
         return False
+    # Podcast and session tables go into one graph so the two databases load side by side
+    tasks = []
     if podcast_exists:
         logger.info(f"Importing podcast data from {podcast_db_path}")
-        import_data_to_postgres(podcast_db_path, pg_conn, PODCAST_TABLES, PODCAST_COLUMN_MAPPING)
+        tasks += [dict(t, dataset="podcasts", sqlite_path=podcast_db_path, column_mapping=PODCAST_COLUMN_MAPPING) for t in PODCAST_TABLES]
     if session_exists:
         logger.info(f"Importing session data from {session_db_path}")
-        import_data_to_postgres(session_db_path, pg_conn, SESSION_TABLES, SESSION_COLUMN_MAPPING)
+        tasks += [dict(t, dataset="sessions", sqlite_path=session_db_path, column_mapping=SESSION_COLUMN_MAPPING) for t in SESSION_TABLES]
+    trace = metrics.trace("import", tables=len(tasks))
+    started = time.monotonic()
+    try:
+        trace.attributes["resumed"] = prepare_import_checkpoints(tasks)
+        rows = import_data_to_postgres(tasks, trace)
+    except Exception as e:
+        pipeline_runs.inc(pipeline="import", result="error")
+        trace.finish(result="error", error=str(e))
+        raise
+    pipeline_runs.inc(pipeline="import", result="success")
+    pipeline_duration.observe(time.monotonic() - started, pipeline="import")
+    trace.finish(result="success", rows=rows)
     return True
 
 def check_if_tables_populated(pg_conn):
@@ -341,28 +957,92 @@ def check_if_tables_populated(pg_conn):
     return True
 
 # Helper functions for export
-def setup_sqlite_tables(conn: sqlite3.Connection):
+def setup_sqlite_tables(conn: sqlite3.Connection, dataset):
     cursor = conn.cursor()
-    for schema in SQLITE_SCHEMAS.values():
+    for schema in dataset["schemas"].values():
         cursor.execute(schema)
     conn.commit()
     cursor.close()
 
-def get_postgres_tables(pg_conn, schema):
-    cursor = pg_conn.cursor()
-    query = "SELECT table_name FROM information_schema.tables WHERE table_schema = %s AND table_type = 'BASE TABLE' AND table_name IN %s"
-    cursor.execute(query, (schema, tuple(TABLE_MAPPING.keys())))
-    tables = [row[0] for row in cursor.fetchall()]
-    cursor.close()
-    return tables
+def fts_table_schema(fts_table, fts):
+    columns = ", ".join(fts["columns"])
+    return f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5({columns}, content='{fts['content']}', content_rowid='id')"
+
+def fts_changed_rowids_query(fts, source, target):
+    # Rows of source whose indexed text is missing from or different in target
+    columns = ", ".join(["id"] + fts["columns"])
+    return f"SELECT id FROM (SELECT {columns} FROM {source}.{fts['content']} EXCEPT SELECT {columns} FROM {target}.{fts['content']})"
+
+def sync_fts_index(conn, fts_table, fts):
+    # The index still describes the attached old copy of the content table, so only rows whose text
+    # changed are taken out (with the values they were indexed with) and put back in
+    columns = ", ".join(fts["columns"])
+    conn.execute(
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {columns}) SELECT 'delete', id, {columns} FROM old.{fts['content']} "
+        f"WHERE id IN ({fts_changed_rowids_query(fts, 'old', 'main')})"
+    )
+    conn.execute(
+        f"INSERT INTO {fts_table}(rowid, {columns}) SELECT id, {columns} FROM main.{fts['content']} "
+        f"WHERE id IN ({fts_changed_rowids_query(fts, 'main', 'old')})"
+    )
+
+def build_search_indexes(conn, dataset, changed_tables=None, previous_path=None):
+    # Runs after the bulk load: one sorted build per index instead of row-by-row maintenance.
+    # previous_path is the artifact an incremental build started from, which lets FTS follow row by row
+    if not BUILD_SEARCH_INDEXES:
+        return
+    for statement in dataset["indexes"]:
+        conn.execute(statement)
+    if previous_path is not None:
+        conn.execute("ATTACH DATABASE ? AS old", (previous_path,))
+    for fts_table, fts in dataset["fts_tables"].items():
+        created = not check_sqlite_table_exists(conn, fts_table)
+        conn.execute(fts_table_schema(fts_table, fts))
+        # External content is not tracked automatically, so re-index whenever the source table changed
+        if created or changed_tables is None or previous_path is None:
+            conn.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES('rebuild')")
+        elif fts["content"] in changed_tables:
+            sync_fts_index(conn, fts_table, fts)
+    conn.commit()
+    if previous_path is not None:
+        conn.execute("DETACH DATABASE old")
+
+def open_export_sqlite(path, new):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    if new:
+        conn.execute(f"PRAGMA page_size={SQLITE_PAGE_SIZE}")
+    if SQLITE_FAST_BUILD:
+        # Nothing reads the file until it is renamed into place, and a failed export discards it,
+        # so there is nothing for a journal or fsync to protect
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA locking_mode=EXCLUSIVE")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA cache_size=-{SQLITE_BUILD_CACHE_MB * 1024}")
+    return conn
+
+def persist_sqlite_build(conn, path):
+    # Writes a compacted copy once, instead of VACUUM rewriting the file in place through a journal
+    conn.commit()
+    try:
+        conn.execute("VACUUM INTO ?", (path,))
+    except sqlite3.OperationalError:
+        # SQLite before 3.27 has no VACUUM INTO
+        target = sqlite3.connect(path)
+        conn.backup(target)
+        target.close()
+
+def remove_export_files(job):
+    for path in (job["temp_path"], job["build_path"]):
+        if path != ":memory:" and os.path.exists(path):
+            os.remove(path)
+
+def get_postgres_tables(pg_conn, schema, table_mapping):
+    return [table for table in schema_cache.get_tables(pg_conn, schema) if table in table_mapping]
 
 def get_table_columns(pg_conn, schema, table):
-    cursor = pg_conn.cursor()
-    query = "SELECT column_name FROM information_schema.columns WHERE table_schema = %s AND table_name = %s ORDER BY ordinal_position"
-    cursor.execute(query, (schema, table))
-    columns = [row[0] for row in cursor.fetchall()]
-    cursor.close()
-    return columns
+    return [column for column, _ in schema_cache.get_columns(pg_conn, schema, table)]
 
 def get_sqlite_table_columns(conn, table):
     cursor = conn.cursor()
@@ -378,188 +1058,1607 @@ def timestamp_to_epoch(dt):
         dt = datetime.fromisoformat(dt.replace('Z', '+00:00'))
     return int(dt.timestamp() * 1000)
 
-def export_table_data(pg_conn, sqlite_conn, schema, pg_table, batch_size=1000):
-    sqlite_table = TABLE_MAPPING.get(pg_table)
-    if not sqlite_table:
+def load_export_state(dataset):
+    state_file = dataset["state_file"]
+    if not os.path.exists(state_file):
+        return {}
+    try:
+        with open(state_file) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable export state {state_file}: {e}")
+        return {}
+
+def save_export_state(dataset, state):
+    temp_path = f"{dataset['state_file']}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(temp_path, dataset["state_file"])
+
+def artifact_fingerprint(filepath):
+    stat = os.stat(filepath)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def should_export_incrementally(state, final_db_path):
+    if not INCREMENTAL_EXPORT or not state.get("high_water_marks"):
+        return False
+    if not os.path.exists(final_db_path) or state.get("artifact") != artifact_fingerprint(final_db_path):
+        logger.info("Previous artifact missing or changed outside the exporter, running full export")
+        return False
+    if full_export_due(state):
+        logger.info(f"No full export in the last {FULL_EXPORT_INTERVAL_HOURS}h, running full reconcile")
+        return False
+    return True
+
+def full_export_due(state):
+    last_full_export = state.get("last_full_export")
+    if not last_full_export:
+        return True
+    return datetime.now(timezone.utc) - datetime.fromisoformat(last_full_export) >= timedelta(hours=FULL_EXPORT_INTERVAL_HOURS)
+
+def get_table_high_water_mark(pg_conn, schema, pg_table):
+    if UPDATED_AT_COLUMN not in get_table_columns(pg_conn, schema, pg_table):
+        return None
+    cursor = pg_conn.cursor()
+    cursor.execute(f'SELECT MAX("{UPDATED_AT_COLUMN}") FROM {pg_table}')
+    high_water_mark = cursor.fetchone()[0]
+    cursor.close()
+    return high_water_mark
+
+def install_export_support(pg_conn):
+    # updated_at indexes serve the high-water-mark lookups and incremental scans, and the update trigger
+    # makes in-place edits visible to them; the delete log lets an incremental export remove deleted rows
+    # without comparing every key in the catalogue
+    cursor = pg_conn.cursor()
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION {UPDATED_AT_TRIGGER_NAME}() RETURNS trigger AS $$
+        BEGIN
+            NEW.{UPDATED_AT_COLUMN} := now();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DELETE_LOG_TABLE} (
+            table_name text NOT NULL,
+            key_data jsonb,
+            deleted_at timestamptz NOT NULL DEFAULT now()
+        )
+    """)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {DELETE_LOG_TABLE}_deleted_at_idx ON {DELETE_LOG_TABLE} (deleted_at)")
+    # A truncate logs no keys, which sends the next export back to a full key sweep of that table
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION {DELETE_LOG_TRIGGER_NAME}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                INSERT INTO {DELETE_LOG_TABLE} (table_name) VALUES (TG_TABLE_NAME);
+            ELSE
+                INSERT INTO {DELETE_LOG_TABLE} (table_name, key_data)
+                SELECT TG_TABLE_NAME, jsonb_object_agg(key, to_jsonb(OLD) -> key) FROM unnest(TG_ARGV) AS key;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for dataset in EXPORT_DATASETS.values():
+        for pg_table in get_postgres_tables(pg_conn, "public", dataset["table_mapping"]):
+            if UPDATED_AT_COLUMN in get_table_columns(pg_conn, "public", pg_table):
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS {pg_table}_{UPDATED_AT_COLUMN}_idx ON {pg_table} ("{UPDATED_AT_COLUMN}")')
+                cursor.execute(f"DROP TRIGGER IF EXISTS {UPDATED_AT_TRIGGER_NAME} ON {pg_table}")
+                cursor.execute(
+                    f"CREATE TRIGGER {UPDATED_AT_TRIGGER_NAME} BEFORE UPDATE ON {pg_table} "
+                    f"FOR EACH ROW EXECUTE PROCEDURE {UPDATED_AT_TRIGGER_NAME}()"
+                )
+            key_columns = dataset["key_columns"].get(pg_table)
+            if not key_columns:
+                continue
+            arguments = ", ".join(f"'{col}'" for col in key_columns)
+            cursor.execute(f"DROP TRIGGER IF EXISTS {DELETE_LOG_TRIGGER_NAME} ON {pg_table}")
+            cursor.execute(
+                f"CREATE TRIGGER {DELETE_LOG_TRIGGER_NAME} AFTER DELETE ON {pg_table} "
+                f"FOR EACH ROW EXECUTE PROCEDURE {DELETE_LOG_TRIGGER_NAME}({arguments})"
+            )
+            cursor.execute(f"DROP TRIGGER IF EXISTS {DELETE_LOG_TRIGGER_NAME}_truncate ON {pg_table}")
+            cursor.execute(
+                f"CREATE TRIGGER {DELETE_LOG_TRIGGER_NAME}_truncate AFTER TRUNCATE ON {pg_table} "
+                f"FOR EACH STATEMENT EXECUTE PROCEDURE {DELETE_LOG_TRIGGER_NAME}()"
+            )
+    pg_conn.commit()
+    cursor.close()
+
+def prune_delete_log():
+    try:
+        with pg_pool.connection() as pg_conn:
+            cursor = pg_conn.cursor()
+            cursor.execute(f"DELETE FROM {DELETE_LOG_TABLE} WHERE deleted_at < now() - %s * interval '1 hour'", (DELETE_LOG_RETENTION_HOURS,))
+            pruned = cursor.rowcount
+            pg_conn.commit()
+            cursor.close()
+    except Exception as e:
+        logger.warning(f"Could not prune the delete log: {e}")
+        return
+    if pruned:
+        logger.info(f"Pruned {pruned} delete log entries older than {DELETE_LOG_RETENTION_HOURS}h")
+
+def get_snapshot_time(pg_conn):
+    cursor = pg_conn.cursor()
+    cursor.execute("SELECT now()")
+    snapshot_time = cursor.fetchone()[0]
+    cursor.close()
+    return snapshot_time
+
+def get_delete_logged_tables(pg_conn):
+    cursor = pg_conn.cursor()
+    cursor.execute("SELECT tgrelid::regclass::text FROM pg_trigger WHERE tgname = %s", (DELETE_LOG_TRIGGER_NAME,))
+    tables = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return tables
+
+def reconcile_deleted_rows(pg_conn, sqlite_conn, dataset, pg_table, since=None):
+    # since is the previous export's delete mark for this table; without one every key is compared
+    sqlite_table = dataset["table_mapping"].get(pg_table)
+    key_columns = dataset["key_columns"].get(pg_table)
+    if not sqlite_table or not key_columns:
         return 0
+    if since is None or datetime.fromisoformat(since) < datetime.now(timezone.utc) - timedelta(hours=DELETE_LOG_RETENTION_HOURS):
+        return sweep_deleted_rows(pg_conn, sqlite_conn, dataset, pg_table)
+    since = datetime.fromisoformat(since) - timedelta(seconds=HWM_OVERLAP_SECONDS)
+    cursor = pg_conn.cursor()
+    cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {DELETE_LOG_TABLE} WHERE table_name = %s AND deleted_at > %s AND key_data IS NULL)", (pg_table, since))
+    truncated = cursor.fetchone()[0]
+    if truncated:
+        cursor.close()
+        return sweep_deleted_rows(pg_conn, sqlite_conn, dataset, pg_table)
+    # Keys come back typed through the table's row type; rows deleted and then re-inserted are skipped
+    columns = ", ".join(f"k.{col}" for col in key_columns)
+    live = " AND ".join(f"t.{col} = k.{col}" for col in key_columns)
+    cursor.execute(f"""
+        SELECT DISTINCT {columns}
+        FROM {DELETE_LOG_TABLE} AS d, jsonb_populate_record(NULL::{pg_table}, d.key_data) AS k
+        WHERE d.table_name = %s AND d.deleted_at > %s AND NOT EXISTS (SELECT 1 FROM {pg_table} AS t WHERE {live})
+    """, (pg_table, since))
+    keys = cursor.fetchall()
+    cursor.close()
+    if not keys:
+        return 0
+    sqlite_keys = [dataset["column_mapping"][pg_table][col] for col in key_columns]
+    match = " AND ".join(f"{col} = ?" for col in sqlite_keys)
+    deleted = sqlite_conn.executemany(f"DELETE FROM {sqlite_table} WHERE {match}", keys).rowcount
+    sqlite_conn.commit()
+    return deleted
+
+def sweep_deleted_rows(pg_conn, sqlite_conn, dataset, pg_table, batch_size=10000):
+    # Streams every Postgres key of the table; only used when the delete log cannot be trusted
+    sqlite_table = dataset["table_mapping"][pg_table]
+    key_columns = dataset["key_columns"][pg_table]
+    sqlite_keys = [dataset["column_mapping"][pg_table][col] for col in key_columns]
+    sqlite_conn.execute("DROP TABLE IF EXISTS temp.live_keys")
+    # Copying the declared types matters: without the table's affinity the NOT EXISTS probe cannot use the key index
+    sqlite_conn.execute(f"CREATE TEMP TABLE live_keys AS SELECT {', '.join(sqlite_keys)} FROM {sqlite_table} WHERE 0")
+    sqlite_conn.execute(f"CREATE UNIQUE INDEX temp.live_keys_key ON live_keys ({', '.join(sqlite_keys)})")
+    insert_key = f"INSERT OR IGNORE INTO temp.live_keys VALUES ({','.join(['?' for _ in sqlite_keys])})"
+    pg_cursor = pg_conn.cursor(name=f"live_keys_{pg_table}")
+    pg_cursor.itersize = batch_size
+    pg_cursor.execute(f"SELECT {', '.join(key_columns)} FROM {pg_table}")
+    while True:
+        rows = pg_cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        sqlite_conn.executemany(insert_key, rows)
+    pg_cursor.close()
+    match = " AND ".join([f"k.{col} = {sqlite_table}.{col}" for col in sqlite_keys])
+    deleted = sqlite_conn.execute(f"DELETE FROM {sqlite_table} WHERE NOT EXISTS (SELECT 1 FROM temp.live_keys AS k WHERE {match})").rowcount
+    sqlite_conn.execute("DROP TABLE temp.live_keys")
+    sqlite_conn.commit()
+    return deleted
+
+def compile_export_columns(pg_columns, column_types, defaults=None):
+    # Resolved once per table. Postgres turns timestamps into epoch milliseconds, booleans into integers
+    # and NULLs into their defaults in the SELECT, so those rows reach SQLite without any per-cell Python work
+    defaults = defaults or {}
+    expressions, converters = [], []
+    for pg_col in pg_columns:
+        data_type = column_types.get(pg_col, "")
+        quoted = f'"{pg_col}"'
+        if data_type.startswith("timestamp") or data_type == "date":
+            expressions.append(f"floor(extract(epoch FROM {quoted}) * 1000)::bigint")
+            converters.append(None)
+        elif data_type == "boolean":
+            expressions.append(f"{quoted}::int")
+            converters.append(None)
+        else:
+            expressions.append(quoted)
+            # Dates kept as text still have to be parsed here
+            converters.append(timestamp_to_epoch if "date" in pg_col.lower() else None)
+        if pg_col in defaults:
+            literal = str(defaults[pg_col]).replace("'", "''")
+            expressions[-1] = f"COALESCE({expressions[-1]}, '{literal}')"
+    return expressions, converters
+
+def plan_table_export(pg_conn, sqlite_conn, dataset, schema, pg_table, since=None, upsert=False):
+    sqlite_table = dataset["table_mapping"].get(pg_table)
+    if not sqlite_table:
+        return None
     sqlite_columns = get_sqlite_table_columns(sqlite_conn, sqlite_table)
     pg_columns = get_table_columns(pg_conn, schema, pg_table)
-    excluded = set(EXCLUDED_COLUMNS.get(pg_table, []))
-    column_map = {pg_col: COLUMN_MAPPING.get(pg_table, {}).get(pg_col, pg_col) for pg_col in pg_columns if pg_col not in excluded and COLUMN_MAPPING.get(pg_table, {}).get(pg_col, pg_col) in sqlite_columns}
+    excluded = set(dataset["excluded_columns"].get(pg_table, []))
+    mapping = dataset["column_mapping"].get(pg_table, {})
+    column_map = {pg_col: mapping.get(pg_col, pg_col) for pg_col in pg_columns if pg_col not in excluded and mapping.get(pg_col, pg_col) in sqlite_columns}
     if not column_map:
-        return 0
-    sqlite_cols = list(column_map.values())
-    placeholders = ",".join(["?" for _ in sqlite_cols])
-    sqlite_insert = f"INSERT OR REPLACE INTO {sqlite_table} ({','.join(sqlite_cols)}) VALUES ({placeholders})"
+        return None
+    constants = {col: value for col, value in dataset["constant_columns"].get(sqlite_table, {}).items() if col in sqlite_columns}
+    sqlite_cols = list(column_map.values()) + list(constants)
+    placeholders = ",".join(["?" for _ in column_map] + [repr(value) for value in constants.values()])
     pg_cols = list(column_map.keys())
-    pg_cols_str = ", ".join([f'"{col}"' for col in pg_cols])
-    pg_cursor = pg_conn.cursor(cursor_factory=RealDictCursor)
-    pg_query = f"SELECT {pg_cols_str} FROM {pg_table}"
+    expressions, converters = compile_export_columns(pg_cols, get_postgres_column_types(pg_conn, pg_table), dataset["column_defaults"].get(pg_table))
+    pg_query = f"SELECT {', '.join(expressions)} FROM {pg_table}"
+    params = None
+    if since is not None:
+        pg_query += f' WHERE "{UPDATED_AT_COLUMN}" > %s'
+        params = (since - timedelta(seconds=HWM_OVERLAP_SECONDS),)
+    sqlite_insert = f"INSERT OR REPLACE INTO {sqlite_table} ({','.join(sqlite_cols)}) VALUES ({placeholders})"
+    keys = [row[1] for row in sqlite_conn.execute(f"PRAGMA table_info({sqlite_table})") if row[5] > 0]
+    if upsert and keys:
+        # Updating an existing file: rows re-read from the overlap window usually match what it holds, and
+        # leaving those untouched keeps them out of the change count
+        values = [col for col in sqlite_cols if col not in keys]
+        sqlite_insert = f"INSERT INTO {sqlite_table} ({','.join(sqlite_cols)}) VALUES ({placeholders}) ON CONFLICT ({','.join(keys)}) "
+        if values:
+            sqlite_insert += (
+                f"DO UPDATE SET {', '.join(f'{col} = excluded.{col}' for col in values)} "
+                f"WHERE ({', '.join(values)}) IS NOT ({', '.join(f'excluded.{col}' for col in values)})"
+            )
+        else:
+            sqlite_insert += "DO NOTHING"
+    return {
+        "dataset": dataset["name"],
+        "pg_table": pg_table,
+        "rows": 0,
+        "changed": 0,
+        "query": pg_query,
+        "params": params,
+        "converters": converters,
+        "timings": {"query": 0.0, "convert": 0.0, "insert": 0.0},
+        "sqlite_insert": sqlite_insert,
+    }
+
+def iter_table_export_batches(pg_conn, plan, batch_size=EXPORT_BATCH_SIZE):
+    converters = plan["converters"]
+    needs_conversion = any(converters)
+    timings = plan["timings"]
+    # Named cursor keeps the result set on the server; rows arrive batch_size at a time
+    pg_cursor = pg_conn.cursor(name=f"export_{plan['pg_table']}")
+    pg_cursor.itersize = batch_size
+    try:
+        started = time.monotonic()
+        pg_cursor.execute(plan["query"], plan["params"])
+        while True:
+            rows = pg_cursor.fetchmany(batch_size)
+            fetched = time.monotonic()
+            timings["query"] += fetched - started
+            if not rows:
+                break
+            if needs_conversion:
+                columns = list(zip(*rows))
+                for index, convert in enumerate(converters):
+                    if convert is not None:
+                        columns[index] = [None if value is None else convert(value) for value in columns[index]]
+                rows = list(zip(*columns))
+                timings["convert"] += time.monotonic() - fetched
+            yield rows
+            started = time.monotonic()
+    finally:
+        pg_cursor.close()
+
+def export_tables_sequentially(pg_conn, sqlite_conns, plans, batch_size=EXPORT_BATCH_SIZE):
     total_rows = 0
-    pg_cursor.execute(pg_query)
-    sqlite_cursor = sqlite_conn.cursor()
-    batch = []
-    for row in pg_cursor:
-        sqlite_row = [
-            timestamp_to_epoch(row[pg_col]) if "date" in pg_col.lower() and row[pg_col] is not None
-            else (1 if row[pg_col] else 0) if isinstance(row[pg_col], bool)
-            else row[pg_col]
-            for pg_col in column_map.keys()
-        ]
-        batch.append(sqlite_row)
-        if len(batch) >= batch_size:
-            sqlite_cursor.executemany(sqlite_insert, batch)
-            total_rows += len(batch)
-            batch = []
-    if batch:
-        sqlite_cursor.executemany(sqlite_insert, batch)
-        total_rows += len(batch)
-    sqlite_conn.commit()
+    for plan in plans:
+        sqlite_conn = sqlite_conns[plan["dataset"]]
+        for rows in iter_table_export_batches(pg_conn, plan, batch_size):
+            started = time.monotonic()
+            plan["changed"] += sqlite_conn.executemany(plan["sqlite_insert"], rows).rowcount
+            plan["timings"]["insert"] += time.monotonic() - started
+            plan["rows"] += len(rows)
+            total_rows += len(rows)
+    for sqlite_conn in sqlite_conns.values():
+        sqlite_conn.commit()
     return total_rows
 
-def export_postgres_to_sqlite():
-    logger.info("Starting PostgreSQL to SQLite export")
-    temp_db_path = os.path.join(STORAGE_DIR, f"{PODCAST_DB_FILE}.tmp")
-    final_db_path = os.path.join(STORAGE_DIR, PODCAST_DB_FILE)
-    backup_path = os.path.join(BACKUP_DIR, PODCAST_DB_FILE)  # Fixed name, no timestamp
+def export_postgres_snapshot(pg_conn):
+    # Switches the coordinator into a read-only REPEATABLE READ transaction and shares its snapshot
+    pg_conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    cursor = pg_conn.cursor()
+    cursor.execute("SELECT pg_export_snapshot()")
+    snapshot_id = cursor.fetchone()[0]
+    cursor.close()
+    return snapshot_id
+
+def export_table_worker(snapshot_id, plan, batch_size, batches, cancelled):
+    # Runs on a worker thread: reads one table under the shared snapshot and hands batches to the writer
+    result = None
     try:
-        pg_conn = psycopg2.connect(host=PG_HOST, port=PG_PORT, dbname=PG_DBNAME, user=PG_USER, password=PG_PASSWORD)
-        sqlite_conn = sqlite3.connect(temp_db_path)
-        sqlite_conn.row_factory = sqlite3.Row
-        setup_sqlite_tables(sqlite_conn)
-        pg_tables = get_postgres_tables(pg_conn, "public")
-        for pg_table in pg_tables:
-            export_table_data(pg_conn, sqlite_conn, "public", pg_table)
-        sqlite_conn.execute("VACUUM")
-        sqlite_conn.execute("ANALYZE")
-        sqlite_conn.close()
-        pg_conn.close()
-        if os.path.exists(final_db_path):
-            os.replace(final_db_path, backup_path)  # Overwrite existing backup
-            logger.info(f"Backed up existing file to {backup_path}")
-        os.rename(temp_db_path, final_db_path)
-        logger.info("Export completed successfully")
+        if cancelled.is_set():
+            return
+        with pg_pool.connection() as worker_conn:
+            worker_conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+            cursor = worker_conn.cursor()
+            cursor.execute("SET TRANSACTION SNAPSHOT %s", (snapshot_id,))
+            cursor.close()
+            for rows in iter_table_export_batches(worker_conn, plan, batch_size):
+                if cancelled.is_set():
+                    break
+                batches.put((plan, rows))
     except Exception as e:
+        result = e
+    finally:
+        batches.put((plan, result))
+
+def export_tables_in_parallel(sqlite_conns, snapshot_id, plans, batch_size=EXPORT_BATCH_SIZE):
+    # Workers read concurrently; this thread is the only SQLite writer
+    workers = min(EXPORT_WORKERS, len(plans))
+    batches = queue.Queue(maxsize=workers * 2)
+    cancelled = threading.Event()
+    errors = []
+    total_rows = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export") as executor:
+        for plan in plans:
+            executor.submit(export_table_worker, snapshot_id, plan, batch_size, batches, cancelled)
+        pending = len(plans)
+        while pending:
+            plan, item = batches.get()
+            if isinstance(item, list):
+                if cancelled.is_set():
+                    continue
+                try:
+                    started = time.monotonic()
+                    plan["changed"] += sqlite_conns[plan["dataset"]].executemany(plan["sqlite_insert"], item).rowcount
+                    plan["timings"]["insert"] += time.monotonic() - started
+                    plan["rows"] += len(item)
+                    total_rows += len(item)
+                except Exception as e:
+                    # Keep draining until every worker reports, or they stay blocked on the full queue
+                    logger.error(f"Writing {plan['pg_table']} failed: {e}")
+                    errors.append(e)
+                    cancelled.set()
+                continue
+            pending -= 1
+            if isinstance(item, Exception):
+                logger.error(f"Export worker for {plan['pg_table']} failed: {item}")
+                errors.append(item)
+                cancelled.set()
+    if errors:
+        raise errors[0]
+    for sqlite_conn in sqlite_conns.values():
+        sqlite_conn.commit()
+    return total_rows
+
+def prepare_dataset_export(pg_conn, dataset, schema_fingerprint, force_full):
+    name = dataset["name"]
+    job = {
+        "dataset": dataset,
+        "state": load_export_state(dataset),
+        "temp_path": os.path.join(STORAGE_DIR, f"{dataset['db_file']}.tmp"),
+        "final_path": os.path.join(STORAGE_DIR, dataset["db_file"]),
+        "schema_fingerprint": schema_fingerprint,
+    }
+    incremental = not force_full and should_export_incrementally(job["state"], job["final_path"])
+    if incremental and job["state"].get("schema_fingerprint") != schema_fingerprint:
+        logger.info(f"Postgres schema changed since the last {name} export, running full export")
+        incremental = False
+    logger.info(f"Starting PostgreSQL to SQLite {name} export ({'incremental' if incremental else 'full'})")
+    job["incremental"] = incremental
+    previous_marks = job["state"].get("high_water_marks", {}) if incremental else {}
+    if incremental:
+        job["build_path"] = job["temp_path"]
+        shutil.copyfile(job["final_path"], job["temp_path"])
+    else:
+        # Fast full builds go to a scratch file (or RAM) and reach temp_path in one write
+        if not SQLITE_FAST_BUILD:
+            job["build_path"] = job["temp_path"]
+        elif SQLITE_BUILD_IN_MEMORY:
+            job["build_path"] = ":memory:"
+        else:
+            job["build_path"] = f"{job['temp_path']}.build"
+        remove_export_files(job)
+    sqlite_conn = open_export_sqlite(job["build_path"], new=not incremental)
+    job["sqlite_conn"] = sqlite_conn
+    setup_sqlite_tables(sqlite_conn, dataset)
+    job["pg_tables"] = get_postgres_tables(pg_conn, "public", dataset["table_mapping"])
+    job["high_water_marks"] = {}
+    job["plans"] = []
+    for pg_table in job["pg_tables"]:
+        high_water_mark = get_table_high_water_mark(pg_conn, "public", pg_table)
+        if high_water_mark is not None:
+            job["high_water_marks"][pg_table] = high_water_mark.isoformat()
+        # Always scanned, even with an unchanged mark: a transaction that commits late carries an older
+        # updated_at, and only the overlap window below the previous mark finds it
+        since = previous_marks.get(pg_table)
+        since = datetime.fromisoformat(since) if since else None
+        plan = plan_table_export(pg_conn, sqlite_conn, dataset, "public", pg_table, since=since, upsert=incremental)
+        if plan is not None:
+            job["plans"].append(plan)
+    return job
+
+def finish_dataset_export(job, exported_rows, trace):
+    dataset = job["dataset"]
+    name = dataset["name"]
+    sqlite_conn = job["sqlite_conn"]
+    changed_tables = [dataset["table_mapping"][pg_table] for pg_table in job["changed_tables"]]
+    with pipeline_stage(trace, name, "index_build"):
+        if job["incremental"]:
+            build_search_indexes(sqlite_conn, dataset, changed_tables, job["final_path"])
+        else:
+            build_search_indexes(sqlite_conn, dataset)
+    with pipeline_stage(trace, name, "vacuum_analyze"):
+        if job["incremental"]:
+            sqlite_conn.execute("PRAGMA optimize")
+        elif job["build_path"] == job["temp_path"]:
+            sqlite_conn.execute("VACUUM")
+            sqlite_conn.execute("ANALYZE")
+        else:
+            sqlite_conn.execute("ANALYZE")
+    if job["build_path"] != job["temp_path"]:
+        with pipeline_stage(trace, name, "persist"):
+            persist_sqlite_build(sqlite_conn, job["temp_path"])
+    sqlite_conn.close()
+    if job["build_path"] not in (job["temp_path"], ":memory:"):
+        os.remove(job["build_path"])
+    final_db_path = job["final_path"]
+    if job["incremental"] and not job["changed_tables"]:
+        os.remove(job["temp_path"])
+        logger.info(f"No {dataset['name']} changes since last export, keeping current artifact")
+    else:
+        logger.info(f"Export of {dataset['name']} completed successfully ({exported_rows} rows from {len(job['changed_tables'])} tables)")
+        with pipeline_stage(trace, name, "publish"):
+            entry = publish_artifact_version(dataset, job["temp_path"])
+        if dataset["shards"]:
+            with pipeline_stage(trace, name, "shards"):
+                build_sharded_bundles(os.path.join(HISTORY_DIR, entry["file"]), entry["version"])
+    state = job["state"]
+    save_export_state(dataset, {
+        "high_water_marks": job["high_water_marks"],
+        "delete_marks": job["delete_marks"],
+        "last_full_export": state.get("last_full_export") if job["incremental"] else datetime.now(timezone.utc).isoformat(),
+        "last_export": datetime.now(timezone.utc).isoformat(),
+        "artifact": artifact_fingerprint(final_db_path),
+        "schema_fingerprint": job["schema_fingerprint"],
+    })
+
+def export_postgres_to_sqlite(force_full=False, datasets=None):
+    # All datasets are read in one pass: one snapshot, one worker pool, one SQLite writer thread
+    datasets = [EXPORT_DATASETS[name] for name in (datasets or EXPORT_DATASETS)]
+    jobs = []
+    trace = metrics.trace("export", datasets=[dataset["name"] for dataset in datasets], force_full=force_full)
+    started = time.monotonic()
+    try:
+        # Held on its own autocommit session from the first read until the last artifact is published, so
+        # even during a leadership handover two processes never build and publish at the same time
+        if not export_advisory_lock.try_acquire():
+            logger.warning("Another process is exporting, skipping this export")
+            pipeline_runs.inc(pipeline="export", result="skipped")
+            trace.finish(result="skipped")
+            return
+        with pg_pool.connection() as pg_conn:
+            # Everything below reads one snapshot, so map tables never reference rows missing from the file
+            snapshot_id = export_postgres_snapshot(pg_conn)
+            schema_fingerprint = schema_cache.refresh(pg_conn, "public")
+            for dataset in datasets:
+                jobs.append(prepare_dataset_export(pg_conn, dataset, schema_fingerprint, force_full))
+            # Deletes logged after this snapshot began are picked up by the next export
+            delete_logged = get_delete_logged_tables(pg_conn)
+            delete_mark = get_snapshot_time(pg_conn).isoformat()
+            for job in jobs:
+                job["delete_marks"] = {pg_table: delete_mark for pg_table in job["pg_tables"] if pg_table in delete_logged}
+            sqlite_conns = {job["dataset"]["name"]: job["sqlite_conn"] for job in jobs}
+            plans = [plan for job in jobs for plan in job["plans"]]
+            if EXPORT_WORKERS > 1 and len(plans) > 1:
+                export_tables_in_parallel(sqlite_conns, snapshot_id, plans)
+            else:
+                export_tables_sequentially(pg_conn, sqlite_conns, plans)
+            for plan in plans:
+                for stage, seconds in plan["timings"].items():
+                    record_stage(trace, plan["dataset"], stage, seconds, table=plan["pg_table"])
+                record_table_rate(trace, plan["pg_table"], plan["rows"], sum(plan["timings"].values()))
+            for job in jobs:
+                job["changed_tables"] = [plan["pg_table"] for plan in job["plans"] if plan["changed"]]
+                if not job["incremental"]:
+                    continue
+                dataset = job["dataset"]
+                previous_marks = job["state"].get("delete_marks", {})
+                with pipeline_stage(trace, dataset["name"], "reconcile"):
+                    for pg_table in job["pg_tables"]:
+                        since = previous_marks.get(pg_table) if pg_table in delete_logged else None
+                        deleted = reconcile_deleted_rows(pg_conn, job["sqlite_conn"], dataset, pg_table, since)
+                        if deleted:
+                            logger.info(f"Removed {deleted} deleted rows from {dataset['table_mapping'][pg_table]}")
+                            if pg_table not in job["changed_tables"]:
+                                job["changed_tables"].append(pg_table)
+            # Everything is read; ending the snapshot now keeps indexing, compression and patching from
+            # pinning the vacuum horizon
+            pg_conn.rollback()
+        # Each dataset publishes on its own so one failing artifact does not hold back the others
+        failed = []
+        for job in jobs:
+            try:
+                finish_dataset_export(job, sum(plan["rows"] for plan in job["plans"]), trace)
+            except Exception as e:
+                logger.error(f"Publishing {job['dataset']['name']} failed: {e}")
+                failed.append(job["dataset"]["name"])
+                job["sqlite_conn"].close()
+                remove_export_files(job)
+        if failed:
+            raise RuntimeError(f"Publishing failed for {', '.join(failed)}")
+        pipeline_runs.inc(pipeline="export", result="success")
+        pipeline_duration.observe(time.monotonic() - started, pipeline="export")
+        trace.finish(result="success", rows=sum(plan["rows"] for job in jobs for plan in job["plans"]))
+    except Exception as e:
+        pipeline_runs.inc(pipeline="export", result="error")
+        trace.finish(result="error", error=str(e))
         logger.error(f"Export failed: {e}")
-        if os.path.exists(temp_db_path):
-            os.remove(temp_db_path)
+        for job in jobs:
+            job["sqlite_conn"].close()
+            remove_export_files(job)
         raise
+    finally:
+        export_advisory_lock.release()
+
+# Compressed artifact variants
+def build_compressed_variants(db_path):
+    for encoding, suffix in ENCODING_SUFFIXES.items():
+        variant_path = f"{db_path}{suffix}"
+        temp_path = f"{variant_path}.tmp"
+        if encoding == "zstd" and zstandard is None:
+            if os.path.exists(variant_path):
+                os.remove(variant_path)
+            continue
+        with open(db_path, "rb") as src, open(temp_path, "wb") as dst:
+            if encoding == "gzip":
+                with gzip.GzipFile(fileobj=dst, mode="wb", compresslevel=GZIP_LEVEL, mtime=0) as gz:
+                    shutil.copyfileobj(src, gz, CHUNK_SIZE)
+            else:
+                zstandard.ZstdCompressor(level=ZSTD_LEVEL, threads=-1).copy_stream(src, dst)
+        os.replace(temp_path, variant_path)
+        logger.info(f"Built {encoding} variant of {os.path.basename(db_path)} ({os.path.getsize(variant_path)} bytes)")
+
+def parse_accept_encoding(header):
+    codings = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        codings[coding.strip().lower()] = quality
+    return codings
+
+def select_artifact_variant(filepath, accept_encoding):
+    codings = parse_accept_encoding(accept_encoding)
+    raw_mtime = os.stat(filepath).st_mtime_ns
+    candidates = []
+    for preference, (encoding, suffix) in enumerate(ENCODING_SUFFIXES.items()):
+        variant_path = f"{filepath}{suffix}"
+        quality = codings.get(encoding, codings.get("*", 0.0))
+        # A sibling older than the raw file belongs to a previous export
+        if quality > 0 and os.path.exists(variant_path) and os.stat(variant_path).st_mtime_ns >= raw_mtime:
+            candidates.append((-quality, preference, encoding, variant_path))
+    if not candidates:
+        return None, filepath
+    _, _, encoding, variant_path = min(candidates)
+    return encoding, variant_path
+
+# Published versions and delta patches
+def compute_file_hash(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_publish_manifest(dataset):
+    if not os.path.exists(dataset["manifest_file"]):
+        return {"versions": [], "patches": []}
+    with open(dataset["manifest_file"]) as f:
+        return json.load(f)
+
+def save_publish_manifest(dataset, manifest):
+    temp_path = f"{dataset['manifest_file']}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, dataset["manifest_file"])
+
+def get_sqlite_key_columns(conn, db_name, table):
+    table_info = conn.execute(f"PRAGMA {db_name}.table_info({table})").fetchall()
+    keys = [row[1] for row in sorted(table_info, key=lambda row: row[5]) if row[5] > 0]
+    return keys or [row[1] for row in table_info]
+
+def build_sqlite_patch(old_path, new_path, patch_path, tables, epilogue=(), fts_tables=None):
+    conn = sqlite3.connect(f"file:{new_path}?mode=ro", uri=True)
+    try:
+        conn.execute("ATTACH DATABASE ? AS old", (f"file:{old_path}?mode=ro",))
+        for table in tables:
+            old_columns = [row[1] for row in conn.execute(f"PRAGMA old.table_info({table})")]
+            new_columns = [row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")]
+            if old_columns != new_columns:
+                logger.info(f"Schema of {table} changed between versions, skipping patch")
+                return None
+        # FTS tables the client already has are kept in step row by row; new ones are built at the end
+        fts_tables = fts_tables or {}
+        synced_fts = {name: fts for name, fts in fts_tables.items() if check_sqlite_table_exists(conn, name, "old")}
+        statements = 0
+        with gzip.open(patch_path, "wt", encoding="utf-8") as out:
+            out.write("BEGIN;\n")
+            # Outgoing text is dropped from the index before the content rows it was indexed from change
+            for fts_table, fts in synced_fts.items():
+                columns = ", ".join(fts["columns"])
+                for (rowid,) in conn.execute(fts_changed_rowids_query(fts, "old", "main")):
+                    out.write(f"INSERT INTO {fts_table}({fts_table}, rowid, {columns}) SELECT 'delete', id, {columns} FROM {fts['content']} WHERE id = {rowid};\n")
+                    statements += 1
+            # Children first for deletes, parents first for upserts
+            for table in reversed(tables):
+                keys = get_sqlite_key_columns(conn, "main", table)
+                key_list = ", ".join(keys)
+                condition = " || ' AND ' || ".join([f"'{key} = ' || quote({key})" for key in keys])
+                query = f"SELECT {condition} FROM (SELECT {key_list} FROM old.{table} EXCEPT SELECT {key_list} FROM main.{table})"
+                for (where,) in conn.execute(query):
+                    out.write(f"DELETE FROM {table} WHERE {where};\n")
+                    statements += 1
+            for table in tables:
+                columns = [row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")]
+                column_list = ", ".join(columns)
+                values = " || ',' || ".join([f"quote({col})" for col in columns])
+                query = f"SELECT {values} FROM (SELECT {column_list} FROM main.{table} EXCEPT SELECT {column_list} FROM old.{table})"
+                for (row_values,) in conn.execute(query):
+                    out.write(f"INSERT OR REPLACE INTO {table} ({column_list}) VALUES ({row_values});\n")
+                    statements += 1
+            for fts_table, fts in synced_fts.items():
+                columns = ", ".join(fts["columns"])
+                for (rowid,) in conn.execute(fts_changed_rowids_query(fts, "main", "old")):
+                    out.write(f"INSERT INTO {fts_table}(rowid, {columns}) SELECT id, {columns} FROM {fts['content']} WHERE id = {rowid};\n")
+                    statements += 1
+            # Secondary indexes are re-applied rather than diffed
+            for statement in epilogue:
+                out.write(f"{statement};\n")
+            for fts_table, fts in fts_tables.items():
+                if fts_table not in synced_fts:
+                    out.write(f"{fts_table_schema(fts_table, fts)};\n")
+                    out.write(f"INSERT INTO {fts_table}({fts_table}) VALUES('rebuild');\n")
+            out.write("COMMIT;\n")
+        return statements
+    finally:
+        conn.close()
+
+def set_current_artifact(dataset, artifact_file):
+    # The current pointer is a symlink swapped with one rename; readers resolve it once and then
+    # only touch an immutable file, so a download never sees a publish happen underneath it
+    final_path = os.path.join(STORAGE_DIR, dataset["db_file"])
+    link_path = f"{final_path}.link"
+    if os.path.lexists(link_path):
+        os.remove(link_path)
+    os.symlink(os.path.relpath(os.path.join(HISTORY_DIR, artifact_file), STORAGE_DIR), link_path)
+    os.replace(link_path, final_path)
+    # Variants and sidecars from before the store live next to the pointer and are now stale
+    for suffix in list(ENCODING_SUFFIXES.values()) + [ARTIFACT_METADATA_SUFFIX]:
+        if os.path.exists(f"{final_path}{suffix}"):
+            os.remove(f"{final_path}{suffix}")
+
+def remove_artifact_files(artifact_path):
+    for suffix in [""] + list(ENCODING_SUFFIXES.values()) + [ARTIFACT_METADATA_SUFFIX]:
+        if os.path.exists(f"{artifact_path}{suffix}"):
+            os.remove(f"{artifact_path}{suffix}")
+
+def publish_artifact_version(dataset, db_path):
+    # Moves a finished build into the store under its content hash and points "current" at it
+    manifest = load_publish_manifest(dataset)
+    versions = manifest["versions"]
+    file_hash = compute_file_hash(db_path)
+    if versions and versions[-1]["hash"] == file_hash:
+        os.remove(db_path)
+        set_current_artifact(dataset, versions[-1]["file"])
+        return versions[-1]
+    version = versions[-1]["version"] + 1 if versions else 1
+    stem, ext = os.path.splitext(dataset["db_file"])
+    history_file = f"{stem}-{file_hash[:16]}{ext}"
+    history_path = os.path.join(HISTORY_DIR, history_file)
+    os.replace(db_path, history_path)
+    build_compressed_variants(history_path)
+    if versions:
+        previous = versions[-1]
+        patch_file = f"{stem}-v{previous['version']}-v{version}.sql.gz"
+        patch_path = os.path.join(PATCH_DIR, patch_file)
+        try:
+            indexes, fts_tables = (dataset["indexes"], dataset["fts_tables"]) if BUILD_SEARCH_INDEXES else ([], {})
+            statements = build_sqlite_patch(os.path.join(HISTORY_DIR, previous["file"]), history_path, patch_path, list(dataset["schemas"]), indexes, fts_tables)
+            if statements is not None:
+                manifest["patches"].append({
+                    "from_version": previous["version"],
+                    "to_version": version,
+                    "file": patch_file,
+                    "size": os.path.getsize(patch_path),
+                    "hash": compute_file_hash(patch_path),
+                    "statements": statements,
+                })
+                logger.info(f"Built patch {patch_file} with {statements} statements")
+        except sqlite3.Error as e:
+            logger.warning(f"Could not build patch from version {previous['version']}: {e}")
+            if os.path.exists(patch_path):
+                os.remove(patch_path)
+    entry = {
+        "version": version,
+        "hash": file_hash,
+        "size": os.path.getsize(history_path),
+        "file": history_file,
+        "published_at": datetime.now(timezone.utc).isoformat(),
+    }
+    write_artifact_metadata(history_path, entry)
+    versions.append(entry)
+    retention_cutoff = datetime.now(timezone.utc) - timedelta(minutes=ARTIFACT_MIN_RETENTION_MINUTES)
+    while len(versions) > ARTIFACT_HISTORY_SIZE and datetime.fromisoformat(versions[0]["published_at"]) < retention_cutoff:
+        expired = versions.pop(0)
+        # Content that came back in a later version shares the same file
+        if not any(v["file"] == expired["file"] for v in versions):
+            remove_artifact_files(os.path.join(HISTORY_DIR, expired["file"]))
+        for patch in [p for p in manifest["patches"] if p["from_version"] == expired["version"]]:
+            patch_path = os.path.join(PATCH_DIR, patch["file"])
+            if os.path.exists(patch_path):
+                os.remove(patch_path)
+            manifest["patches"].remove(patch)
+    save_publish_manifest(dataset, manifest)
+    set_current_artifact(dataset, history_file)
+    logger.info(f"Published {dataset['name']} version {version} ({file_hash[:12]})")
+    return entry
+
+# Sharded bundles
+def build_shard(source_path, shard_path, queries):
+    # queries maps each table to the SELECT over the attached source that fills it
+    if os.path.exists(shard_path):
+        os.remove(shard_path)
+    conn = sqlite3.connect(shard_path)
+    try:
+        for table in queries:
+            conn.execute(SQLITE_SCHEMAS[table])
+        conn.execute("ATTACH DATABASE ? AS src", (f"file:{source_path}?mode=ro",))
+        for table, query in queries.items():
+            conn.execute(f"INSERT INTO main.{table} {query}")
+        conn.commit()
+        conn.execute("DETACH DATABASE src")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+def compute_channel_digests(conn):
+    # One ordered pass over episode rows tells which channel shards actually changed
+    digests = {}
+    counts = {}
+    for (channel_id, *row) in conn.execute("SELECT channelId, * FROM PodcastEpisodes ORDER BY channelId, id"):
+        digests.setdefault(channel_id, hashlib.sha256()).update(repr(row).encode("utf-8"))
+        counts[channel_id] = counts.get(channel_id, 0) + 1
+    query = "SELECT e.channelId, m.* FROM EpisodeCategoryMap AS m JOIN PodcastEpisodes AS e ON e.id = m.episodeId ORDER BY e.channelId, m.episodeId, m.categoryId"
+    for (channel_id, *row) in conn.execute(query):
+        digests[channel_id].update(repr(row).encode("utf-8"))
+    return {channel_id: (digest.hexdigest(), counts[channel_id]) for channel_id, digest in digests.items()}
+
+def publish_shard(temp_path, prefix):
+    # Content-addressed name: an unchanged shard keeps its URL, so clients never refetch it
+    shard_hash = compute_file_hash(temp_path)
+    shard_file = f"{prefix}-{shard_hash[:16]}.db"
+    os.replace(temp_path, os.path.join(SHARD_DIR, shard_file))
+    return {"file": shard_file, "hash": shard_hash, "size": os.path.getsize(os.path.join(SHARD_DIR, shard_file))}
+
+def load_shard_manifest():
+    if not os.path.exists(SHARD_MANIFEST_FILE):
+        return None
+    with open(SHARD_MANIFEST_FILE) as f:
+        return json.load(f)
+
+def build_sharded_bundles(db_path, version):
+    previous = load_shard_manifest() or {"core": None, "channels": []}
+    previous_channels = {c["channel_id"]: c for c in previous["channels"]}
+    temp_path = os.path.join(SHARD_DIR, "shard.db.tmp")
+    build_shard(db_path, temp_path, {table: f"SELECT * FROM src.{table}" for table in SHARD_CORE_TABLES})
+    core = publish_shard(temp_path, "core")
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        channel_digests = compute_channel_digests(conn)
+    finally:
+        conn.close()
+    channels = []
+    rebuilt = 0
+    for channel_id, (digest, episodes) in sorted(channel_digests.items()):
+        entry = previous_channels.get(channel_id)
+        if entry is None or entry["digest"] != digest or not os.path.exists(os.path.join(SHARD_DIR, entry["file"])):
+            build_shard(db_path, temp_path, {
+                "PodcastEpisodes": f"SELECT * FROM src.PodcastEpisodes WHERE channelId = {int(channel_id)} ORDER BY id",
+                "EpisodeCategoryMap": (
+                    "SELECT m.* FROM src.EpisodeCategoryMap AS m JOIN src.PodcastEpisodes AS e ON e.id = m.episodeId "
+                    f"WHERE e.channelId = {int(channel_id)} ORDER BY m.episodeId, m.categoryId"
+                ),
+            })
+            entry = dict(publish_shard(temp_path, f"channel-{int(channel_id)}"), channel_id=channel_id, digest=digest, episodes=episodes)
+            rebuilt += 1
+        channels.append(entry)
+    manifest = {
+        "version": version,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "core": core,
+        "channels": channels,
+    }
+    temp_manifest = f"{SHARD_MANIFEST_FILE}.tmp"
+    with open(temp_manifest, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_manifest, SHARD_MANIFEST_FILE)
+    # Keep the previous generation too, so clients holding the old manifest can finish downloading
+    referenced = {core["file"]} | {c["file"] for c in channels}
+    if previous["core"]:
+        referenced |= {previous["core"]["file"]} | {c["file"] for c in previous["channels"]}
+    for name in os.listdir(SHARD_DIR):
+        if SHARD_FILE_PATTERN.match(name) and name not in referenced:
+            os.remove(os.path.join(SHARD_DIR, name))
+    logger.info(f"Published shards for version {version}: core plus {len(channels)} channels ({rebuilt} rebuilt)")
+    return manifest
+
+# Artifact metadata and conditional requests
+artifact_metadata_cache = {}
+
+def write_artifact_metadata(db_path, entry):
+    stat = os.stat(db_path)
+    metadata = {
+        "version": entry["version"],
+        "hash": entry["hash"],
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "published_at": entry["published_at"],
+        "file": entry["file"],
+    }
+    metadata_path = f"{db_path}{ARTIFACT_METADATA_SUFFIX}"
+    with open(f"{metadata_path}.tmp", "w") as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(f"{metadata_path}.tmp", metadata_path)
+    return metadata
+
+def get_artifact_metadata(dataset, db_path):
+    stat = os.stat(db_path)
+    metadata_path = f"{db_path}{ARTIFACT_METADATA_SUFFIX}"
+    if os.path.exists(metadata_path):
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+        if metadata.get("size") == stat.st_size and metadata.get("mtime_ns") == stat.st_mtime_ns:
+            return metadata
+    # Files that predate the sidecar (e.g. the seed database) are hashed once and cached
+    cached = artifact_metadata_cache.get(db_path)
+    if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+        return cached
+    file_hash = compute_file_hash(db_path)
+    published = next((v for v in load_publish_manifest(dataset)["versions"] if v["hash"] == file_hash), None)
+    metadata = {
+        "version": published["version"] if published else 0,
+        "hash": file_hash,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "published_at": published["published_at"] if published else None,
+    }
+    artifact_metadata_cache[db_path] = metadata
+    return metadata
+
+def artifact_etag(metadata, encoding=None):
+    # Each content-coding is a different representation and needs its own validator
+    return f'"{metadata["hash"][:32]}{"-" + encoding if encoding else ""}"'
+
+def artifact_last_modified(metadata):
+    return formatdate(metadata["mtime_ns"] / 1e9, usegmt=True)
+
+def etag_in_header(header, etag):
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+def is_not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        return etag_in_header(if_none_match, etag)
+    if_modified_since = request.headers.get("If-Modified-Since")
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def if_range_allows_partial(request, etag, last_modified):
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"'):
+        return if_range == etag  # If-Range requires a strong match
+    return if_range == last_modified
+
+# Change notifications
+export_lock = threading.Lock()  # Listener-driven and scheduled exports never overlap
+change_state = {
+    "listening": False,
+    "datasets": {name: {"pending": 0, "first_change": None, "last_change": None, "tables": set()} for name in EXPORT_DATASETS},
+    "thread": None,
+}
+
+def run_export_job(force_full=False, datasets=None):
+    if not leader_active.is_set():
+        logger.info("Not the export leader, skipping export")
+        return
+    with export_lock:
+        profile_run("export", lambda: export_postgres_to_sqlite(force_full=force_full, datasets=datasets))
+
+def install_change_triggers(pg_conn):
+    # Statement-level triggers, so a bulk update sends one notification per table rather than per row
+    cursor = pg_conn.cursor()
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION {CHANGE_TRIGGER_NAME}() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify(TG_ARGV[0], TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for dataset in EXPORT_DATASETS.values():
+        for pg_table in get_postgres_tables(pg_conn, "public", dataset["table_mapping"]):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {CHANGE_TRIGGER_NAME} ON {pg_table}")
+            cursor.execute(
+                f"CREATE TRIGGER {CHANGE_TRIGGER_NAME} AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {pg_table} "
+                f"FOR EACH STATEMENT EXECUTE PROCEDURE {CHANGE_TRIGGER_NAME}('{CHANGE_CHANNEL}')"
+            )
+    pg_conn.commit()
+    cursor.close()
+
+def note_change(source, datasets=None):
+    # source is the changed table; datasets defaults to every dataset exporting it
+    if datasets is None:
+        datasets = [name for name, dataset in EXPORT_DATASETS.items() if source in dataset["table_mapping"]]
+    now = time.monotonic()
+    for name in datasets:
+        pending = change_state["datasets"][name]
+        if not pending["pending"]:
+            pending["first_change"] = now
+        pending["pending"] += 1
+        pending["last_change"] = now
+        pending["tables"].add(source)
+
+def change_deadline(name):
+    # Waits for a quiet debounce window, but never longer than the staleness bound after the first change
+    pending = change_state["datasets"][name]
+    if not pending["pending"]:
+        return None
+    dataset = EXPORT_DATASETS[name]
+    return min(pending["last_change"] + dataset["debounce_seconds"], pending["first_change"] + dataset["max_staleness_seconds"])
+
+def due_change_datasets(now):
+    return [name for name in EXPORT_DATASETS if change_deadline(name) is not None and change_deadline(name) <= now]
+
+def change_wait_timeout(now):
+    deadlines = [deadline for deadline in map(change_deadline, EXPORT_DATASETS) if deadline is not None]
+    if not deadlines:
+        return 1.0
+    return min(max(min(deadlines) - now, 0), 1.0)
+
+def export_pending_changes(datasets):
+    for name in datasets:
+        pending = change_state["datasets"][name]
+        logger.info(f"Exporting {name} after {pending['pending']} change notifications ({', '.join(sorted(pending['tables']))})")
+        pending.update(pending=0, first_change=None, last_change=None, tables=set())
+    try:
+        run_export_job(datasets=datasets)
+    except Exception as e:
+        logger.error(f"Change-driven export failed, retrying after the debounce window: {e}")
+        note_change("retry", datasets)
+
+def leader_duties_running():
+    return leader_active.is_set() and not shutdown_requested.is_set()
+
+def run_change_listener():
+    delay = BOOTSTRAP_BACKOFF_INITIAL
+    connected_before = False
+    while leader_duties_running():
+        listen_conn = None
+        try:
+            listen_conn = pg_pool.dedicated_connection()
+            listen_conn.autocommit = True
+            cursor = listen_conn.cursor()
+            cursor.execute(f"LISTEN {CHANGE_CHANNEL}")
+            cursor.close()
+            change_state["listening"] = True
+            logger.info(f"Listening for changes on {CHANGE_CHANNEL}")
+            if connected_before:
+                note_change("reconnect", list(EXPORT_DATASETS))  # Notifications sent while disconnected are lost; catch up once
+            connected_before = True
+            delay = BOOTSTRAP_BACKOFF_INITIAL
+            while leader_duties_running():
+                if select.select([listen_conn], [], [], change_wait_timeout(time.monotonic()))[0]:
+                    listen_conn.poll()
+                    while listen_conn.notifies:
+                        note_change(listen_conn.notifies.pop(0).payload)
+                due = due_change_datasets(time.monotonic())
+                if due:
+                    export_pending_changes(due)
+        except Exception as e:
+            logger.error(f"Change listener failed: {e}")
+        finally:
+            change_state["listening"] = False
+            if listen_conn is not None:
+                listen_conn.close()
+        shutdown_requested.wait(delay)
+        delay = min(delay * 2, BOOTSTRAP_BACKOFF_MAX)
+
+def scheduled_export():
+    # While the listener is connected nothing can change unnoticed, so the interval job
+    # only has work to do for the periodic full reconcile
+    datasets = list(EXPORT_DATASETS)
+    if change_state["listening"]:
+        datasets = [
+            name for name, dataset in EXPORT_DATASETS.items()
+            if change_state["datasets"][name]["pending"] or full_export_due(load_export_state(dataset))
+        ]
+    if not datasets:
+        logger.info("No change notifications since the last export, skipping scheduled export")
+        return
+    run_export_job(datasets=datasets)
 
 # Scheduler setup
 scheduler = BackgroundScheduler()
-scheduler.add_job(export_postgres_to_sqlite, "interval", hours=24)
-
-# File streaming
-async def file_streamer(filepath: str, start_byte: int = 0, end_byte: Optional[int] = None):
-    async with aiofiles.open(filepath, "rb") as f:
-        if start_byte:
-            await f.seek(start_byte)
-        remaining = end_byte - start_byte + 1 if end_byte else None
-        while True:
-            chunk_size = min(CHUNK_SIZE, remaining) if remaining else CHUNK_SIZE
-            chunk = await f.read(chunk_size)
-            if not chunk:
-                break
-            yield chunk
-            if remaining:
-                remaining -= len(chunk)
-                if remaining <= 0:
-                    break
+scheduler.add_job(scheduled_export, "interval", minutes=EXPORT_INTERVAL_MINUTES, max_instances=1, coalesce=True)
+scheduler.add_job(prune_delete_log, "interval", hours=1, max_instances=1, coalesce=True)
+
+# Bootstrap
+bootstrap_state = {"phase": "starting", "phase_since": datetime.now(timezone.utc).isoformat(), "role": None, "attempts": 0, "last_error": None}
+shutdown_requested = threading.Event()
+leader_lock = AdvisoryLock(pg_pool, LEADER_LOCK_KEY)
+export_advisory_lock = AdvisoryLock(pg_pool, EXPORT_LOCK_KEY)
+leader_active = threading.Event()  # Set while this process runs the import and export jobs
+
+def set_bootstrap_phase(phase):
+    logger.info(f"Bootstrap phase: {phase}")
+    bootstrap_state["phase"] = phase
+    bootstrap_state["phase_since"] = datetime.now(timezone.utc).isoformat()
+
+def acquire_leadership():
+    if not LEADER_ELECTION:
+        return True
+    try:
+        return leader_lock.try_acquire()
+    except Exception as e:
+        logger.warning(f"Leader election failed: {e}")
+        return False
+
+def stop_leader_duties():
+    leader_active.clear()
+    if scheduler.running:
+        scheduler.pause()
+    listener = change_state["thread"]
+    if listener is not None:
+        listener.join(timeout=5)
+
+def watch_leadership():
+    # Re-verifies the lock; when it is lost another worker takes over the jobs
+    while not shutdown_requested.wait(LEADER_CHECK_SECONDS):
+        if not leader_lock.is_held():
+            logger.warning("Lost export leadership, stopping import and export jobs")
+            stop_leader_duties()
+            return
+
+def run_bootstrap():
+    # Runs on its own thread so the server answers requests while waiting, importing and exporting.
+    # With several workers or replicas only the leader imports and exports; followers serve whatever
+    # it publishes, since every request resolves the current artifact pointer
+    podcast_db_path = os.path.join(STORAGE_DIR, PODCAST_DB_FILE)
+    session_db_path = os.path.join(STORAGE_DIR, SESSION_DB_FILE)
+    delay = BOOTSTRAP_BACKOFF_INITIAL
+    while not shutdown_requested.is_set():
+        if not acquire_leadership():
+            if bootstrap_state["role"] != "follower":
+                logger.info("Another worker holds the export leadership, serving published artifacts only")
+                bootstrap_state["role"] = "follower"
+                set_bootstrap_phase("following")
+            shutdown_requested.wait(LEADER_CHECK_SECONDS)
+            continue
+        if bootstrap_state["role"] != "leader":
+            logger.info("This worker is the export leader")
+            bootstrap_state["role"] = "leader"
+        bootstrap_state["attempts"] += 1
+        set_bootstrap_phase("waiting_for_backend")
+        if check_backend_availability(BACKEND_URL):
+            try:
+                set_bootstrap_phase("checking_tables")
+                with pg_pool.connection() as pg_conn:
+                    interrupted = import_interrupted(pg_conn)
+                    populated = check_if_tables_populated(pg_conn)
+                if interrupted or not populated:
+                    if interrupted:
+                        logger.info("A previous import did not finish, resuming from its checkpoints")
+                    else:
+                        logger.info("Tables are not populated, performing import")
+                    set_bootstrap_phase("importing")
+                    profile_run("import", lambda: perform_import(podcast_db_path, session_db_path))
+                else:
+                    logger.info("Tables are already populated, skipping import")
+                try:
+                    with pg_pool.connection() as pg_conn:
+                        install_export_support(pg_conn)
+                except Exception as e:
+                    logger.warning(f"Could not install the updated_at indexes and delete log, incremental exports will compare every key: {e}")
+                leader_active.set()
+                set_bootstrap_phase("exporting")
+                run_export_job()
+                if CHANGE_NOTIFICATIONS:
+                    start_change_listener()
+                if scheduler.running:
+                    scheduler.resume()
+                else:
+                    scheduler.start()
+                bootstrap_state["last_error"] = None
+                set_bootstrap_phase("ready")
+                if not LEADER_ELECTION:
+                    return
+                watch_leadership()
+                delay = BOOTSTRAP_BACKOFF_INITIAL
+                continue
+            except Exception as e:
+                logger.error(f"Bootstrap attempt failed: {e}")
+                bootstrap_state["last_error"] = str(e)
+        logger.info(f"Bootstrap retrying in {delay:g} seconds")
+        shutdown_requested.wait(delay)
+        delay = min(delay * 2, BOOTSTRAP_BACKOFF_MAX)
+
+def start_change_listener():
+    try:
+        with pg_pool.connection() as pg_conn:
+            install_change_triggers(pg_conn)
+    except Exception as e:
+        # Without triggers the interval job keeps exporting on its own
+        logger.warning(f"Could not install change triggers, relying on the {EXPORT_INTERVAL_MINUTES} minute schedule: {e}")
+        return
+    change_state["thread"] = threading.Thread(target=run_change_listener, name="change-listener", daemon=True)
+    change_state["thread"].start()
+
+# File serving
+def get_served_artifact_path(dataset):
+    # Resolves the current pointer; before the first export this is the seed file itself
+    filepath = os.path.realpath(os.path.join(STORAGE_DIR, dataset["db_file"]))
+    return filepath if os.path.exists(filepath) else None
+
+def require_served_artifact(dataset):
+    filepath = get_served_artifact_path(dataset)
+    if filepath is None:
+        if bootstrap_state["phase"] != "ready":
+            raise HTTPException(status_code=503, detail="Database is still being prepared", headers={"Retry-After": str(POLL_INTERVAL)})
+        raise HTTPException(status_code=404, detail="Database file not found")
+    return filepath
+
+def serve_file(request: Request, filepath: str, headers: dict, media_type: str = "application/octet-stream",
+               etag: Optional[str] = None, last_modified: Optional[str] = None, send_body: bool = True):
+    file_size = os.path.getsize(filepath)
+    ranges = None
+    if etag is None or if_range_allows_partial(request, etag, last_modified):
+        try:
+            ranges = parse_range_header(request.headers.get("Range"), file_size)
+        except RangeNotSatisfiable as e:
+            logger.info(f"Rejecting range request for {os.path.basename(filepath)}: {e}")
+            download_responses.inc(kind="range_not_satisfiable")
+            return range_not_satisfiable_response(file_size, headers)
+    return FileRangeResponse(filepath, file_size, ranges, headers=headers, media_type=media_type, send_body=send_body,
+                             admission=download_admission, on_finish=record_download)
+
+# Read-only query API
+EPISODE_COLUMNS = "e.id, e.channelId, e.guid, e.title, e.description, e.link, e.pubDate, e.duration, e.explicit, e.imageUrl, e.mediaUrl, e.mediaType, e.mediaLength"
+CHANNEL_COLUMNS = "c.id, c.title, c.link, c.description, c.copyright, c.language, c.author, c.ownerEmail, c.ownerName, c.imageUrl, c.lastBuildDate"
+CHANNEL_STATS = (
+    "(SELECT COUNT(*) FROM PodcastEpisodes AS e WHERE e.channelId = c.id) AS episodeCount, "
+    "(SELECT MAX(e.pubDate) FROM PodcastEpisodes AS e WHERE e.channelId = c.id) AS latestPubDate"
+)
+
+def parse_episode_cursor(cursor):
+    # Cursors are "<pubDate>:<id>" of the last episode on the previous page
+    if cursor is None:
+        return None
+    match = re.fullmatch(r"(-?\d+):(-?\d+)", cursor)
+    if not match:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return int(match.group(1)), int(match.group(2))
+
+def query_episode_page(conn, join, condition, params, cursor, limit):
+    # Newest first; the row-value comparison continues exactly after the last (pubDate, id) seen
+    if cursor is not None:
+        condition += " AND (e.pubDate, e.id) < (?, ?)"
+        params = list(params) + list(cursor)
+    rows = conn.execute(
+        f"SELECT {EPISODE_COLUMNS} FROM PodcastEpisodes AS e {join} WHERE {condition} "
+        "ORDER BY e.pubDate DESC, e.id DESC LIMIT ?",
+        list(params) + [limit + 1],
+    ).fetchall()
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = f"{items[-1]['pubDate']}:{items[-1]['id']}" if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+def query_channel_page(conn, cursor, limit):
+    rows = conn.execute(
+        f"SELECT {CHANNEL_COLUMNS}, {CHANNEL_STATS} FROM PodcastChannels AS c WHERE c.id > ? ORDER BY c.id LIMIT ?",
+        (cursor or 0, limit + 1),
+    ).fetchall()
+    items = [dict(row) for row in rows[:limit]]
+    return {"items": items, "next_cursor": str(items[-1]["id"]) if len(rows) > limit else None}
+
+def query_channel(conn, channel_id):
+    row = conn.execute(f"SELECT {CHANNEL_COLUMNS}, {CHANNEL_STATS} FROM PodcastChannels AS c WHERE c.id = ?", (channel_id,)).fetchone()
+    if row is None:
+        return None
+    channel = dict(row)
+    channel["categories"] = [dict(r) for r in conn.execute(
+        "SELECT cc.id, cc.name FROM ChannelCategoryMap AS m JOIN PodcastChannelCategories AS cc ON cc.id = m.categoryId "
+        "WHERE m.channelId = ? ORDER BY cc.name",
+        (channel_id,),
+    )]
+    return channel
+
+def query_channel_episodes(conn, channel_id, cursor, limit):
+    if conn.execute("SELECT 1 FROM PodcastChannels WHERE id = ?", (channel_id,)).fetchone() is None:
+        return None
+    return query_episode_page(conn, "", "e.channelId = ?", [channel_id], cursor, limit)
+
+def query_categories(conn):
+    rows = conn.execute(
+        "SELECT c.id, c.name, COUNT(m.episodeId) AS episodeCount FROM PodcastEpisodeCategories AS c "
+        "LEFT JOIN EpisodeCategoryMap AS m ON m.categoryId = c.id GROUP BY c.id ORDER BY c.name"
+    ).fetchall()
+    return {"items": [dict(row) for row in rows]}
+
+def query_category_episodes(conn, category_id, cursor, limit):
+    if conn.execute("SELECT 1 FROM PodcastEpisodeCategories WHERE id = ?", (category_id,)).fetchone() is None:
+        return None
+    join = "JOIN EpisodeCategoryMap AS m ON m.episodeId = e.id"
+    return query_episode_page(conn, join, "m.categoryId = ?", [category_id], cursor, limit)
+
+async def snapshot_query(request: Request, key, query, *args):
+    # Answers from the current podcast artifact; rendered bodies are cached per artifact hash
+    dataset = EXPORT_DATASETS["podcasts"]
+    filepath = require_served_artifact(dataset)
+    metadata = await run_in_threadpool(get_artifact_metadata, dataset, filepath)
+    cache_key = (metadata["hash"],) + key
+    cached = query_cache.get(cache_key)
+    if cached is None:
+        def run():
+            with snapshot_reader.connection(filepath) as conn:
+                return query(conn, *args)
+        result = await run_in_threadpool(run)
+        if result is None:
+            body = None
+        else:
+            body = json.dumps(dict(result, version=metadata["version"]), separators=(",", ":")).encode("utf-8")
+        etag = f'"{hashlib.sha1(repr(cache_key).encode("utf-8")).hexdigest()[:32]}"'
+        cached = (body, etag)
+        query_cache.put(cache_key, cached)
+    body, etag = cached
+    if body is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    headers = {"ETag": etag, "Cache-Control": API_CACHE_CONTROL}
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None and etag_in_header(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 # Endpoints
 @app.get("/")
 async def root():
     return {"message": "KotlinApp Combined Server is running"}
 
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok", "phase": bootstrap_state["phase"]}
+
+def require_admin(request: Request):
+    # Disabled admin endpoints look like any other unknown path
+    if not ADMIN_SECRET:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(request.headers.get("X-Admin-Secret", ""), ADMIN_SECRET):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+def refresh_artifact_metrics():
+    for dataset in EXPORT_DATASETS.values():
+        filepath = get_served_artifact_path(dataset)
+        if filepath is None:
+            continue
+        artifact_version.set(get_artifact_metadata(dataset, filepath)["version"], dataset=dataset["name"])
+        for encoding, suffix in [("identity", "")] + list(ENCODING_SUFFIXES.items()):
+            if os.path.exists(filepath + suffix):
+                artifact_size.set(os.path.getsize(filepath + suffix), dataset=dataset["name"], encoding=encoding)
+
+@app.get("/metrics")
+async def get_metrics():
+    # Artifact gauges are read from the store, so followers report what the leader published
+    await run_in_threadpool(refresh_artifact_metrics)
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/admin/profile")
+async def request_profile(request: Request, target: str = "export", allocations: bool = True, run: bool = False, full: bool = False):
+    require_admin(request)
+    if target not in ("export", "import"):
+        raise HTTPException(status_code=400, detail="target must be export or import")
+    if target == "export" and not leader_active.is_set():
+        raise HTTPException(status_code=409, detail="This worker is not the export leader")
+    arm_profile(target, allocations)
+    if run and target == "export":
+        threading.Thread(target=run_export_job, kwargs={"force_full": full}, name="profiled-export", daemon=True).start()
+    return {"armed": target, "allocations": allocations, "started": run and target == "export"}
+
+@app.get("/admin/profiles")
+async def get_profile_reports(request: Request):
+    require_admin(request)
+    with profile_lock:
+        pending = dict(pending_profiles)
+    return {"pending": pending, "reports": await run_in_threadpool(list_profile_reports)}
+
+@app.get("/admin/profiles/{report_file}")
+async def download_profile_report(request: Request, report_file: str):
+    require_admin(request)
+    filepath = os.path.join(PROFILE_DIR, report_file)
+    if not PROFILE_FILE_PATTERN.match(report_file) or not os.path.exists(filepath):
+        raise HTTPException(status_code=404, detail="Report not found")
+    media_type = "text/plain; charset=utf-8" if report_file.endswith(".txt") else "application/octet-stream"
+    headers = {"Content-Disposition": f"attachment; filename={report_file}", "Cache-Control": "no-store"}
+    return serve_file(request, filepath, headers, media_type=media_type)
+
+@app.get("/readyz")
+async def readyz():
+    # Ready as soon as an artifact can be served, even while bootstrap is still exporting
+    artifact_available = get_served_artifact_path(EXPORT_DATASETS["podcasts"]) is not None
+    changes = {"listening": change_state["listening"], "pending": {name: s["pending"] for name, s in change_state["datasets"].items()}}
+    body = dict(bootstrap_state, artifact_available=artifact_available, change_notifications=changes, postgres_pool=pg_pool.get_stats(),
+                downloads=download_admission.get_stats() if download_admission else None)
+    return JSONResponse(body, status_code=200 if artifact_available else 503)
+
+async def serve_artifact(request: Request, dataset, filepath: str, cache_control: str, send_body: bool):
+    metadata = await run_in_threadpool(get_artifact_metadata, dataset, filepath)
+    encoding, filepath = select_artifact_variant(filepath, request.headers.get("Accept-Encoding"))
+    etag = artifact_etag(metadata, encoding)
+    last_modified = artifact_last_modified(metadata)
+    headers = {"Vary": "Accept-Encoding", "ETag": etag, "Last-Modified": last_modified, "Cache-Control": cache_control}
+    if is_not_modified(request, etag, last_modified):
+        download_responses.inc(kind="not_modified")
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    headers["Content-Disposition"] = f"attachment; filename={dataset['db_file']}"
+    return serve_file(request, filepath, headers, etag=etag, last_modified=last_modified, send_body=send_body)
+
+async def serve_latest_artifact(request: Request, dataset, send_body: bool):
+    # The stable URL must be revalidated; clients and caches that can should follow the hash-named URL
+    filepath = require_served_artifact(dataset)
+    return await serve_artifact(request, dataset, filepath, "no-cache", send_body)
+
+async def serve_stored_artifact(request: Request, dataset, artifact_file: str, send_body: bool):
+    manifest = await run_in_threadpool(load_publish_manifest, dataset)
+    entry = next((v for v in manifest["versions"] if v["file"] == artifact_file), None)
+    filepath = os.path.join(HISTORY_DIR, artifact_file)
+    if entry is None or not os.path.exists(filepath):
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return await serve_artifact(request, dataset, filepath, IMMUTABLE_CACHE_CONTROL, send_body)
+
+def artifact_url(dataset, metadata):
+    if metadata.get("file"):
+        return f"{dataset['url_prefix']}/database/artifacts/{metadata['file']}"
+    return f"{dataset['url_prefix']}/download_latest_file"
+
+async def get_latest_version_info(dataset):
+    db_path = require_served_artifact(dataset)
+    metadata = await run_in_threadpool(get_artifact_metadata, dataset, db_path)
+    return VersionInfo(
+        version=str(metadata["version"]),
+        required=True,
+        url=artifact_url(dataset, metadata),
+        size=metadata["size"],
+        hash=metadata["hash"],
+        description=f"Latest {dataset['name'][:-1]} database export"
+    )
+
+def build_patch_plan(dataset, version, content_hash, accept_encoding=None):
+    prefix = dataset["url_prefix"]
+    manifest = load_publish_manifest(dataset)
+    versions = manifest["versions"]
+    if not versions:
+        raise HTTPException(status_code=404, detail="No published versions")
+    latest = versions[-1]
+    # Patches are already gzipped, so weigh them against the variant this client would really download
+    _, variant_path = select_artifact_variant(os.path.join(HISTORY_DIR, latest["file"]), accept_encoding)
+    full_size = os.path.getsize(variant_path)
+    current = next((v for v in versions if v["version"] == version or v["hash"] == content_hash), None)
+    full_download = PatchPlan(
+        current_version=current["version"] if current else None,
+        latest_version=latest["version"],
+        latest_hash=latest["hash"],
+        full_download=True,
+        url=artifact_url(dataset, latest),
+        size=full_size,
+    )
+    if current is None:
+        return full_download
+    patches_by_origin = {p["from_version"]: p for p in manifest["patches"]}
+    chain = []
+    cursor = current["version"]
+    while cursor != latest["version"]:
+        patch = patches_by_origin.get(cursor)
+        if patch is None:
+            return full_download
+        chain.append(patch)
+        cursor = patch["to_version"]
+    chain_size = sum(p["size"] for p in chain)
+    if chain_size >= full_size:
+        return full_download
+    return PatchPlan(
+        current_version=current["version"],
+        latest_version=latest["version"],
+        latest_hash=latest["hash"],
+        full_download=False,
+        size=chain_size,
+        patches=[
+            PatchInfo(from_version=p["from_version"], to_version=p["to_version"], url=f"{prefix}/database/patches/{p['file']}", size=p["size"], hash=p["hash"])
+            for p in chain
+        ],
+    )
+
+def serve_patch(request: Request, dataset, patch_file: str):
+    patch = next((p for p in load_publish_manifest(dataset)["patches"] if p["file"] == patch_file), None)
+    if patch is None:
+        raise HTTPException(status_code=404, detail="Patch not found")
+    filepath = os.path.join(PATCH_DIR, patch["file"])
+    headers = {"Content-Disposition": f"attachment; filename={patch['file']}"}
+    return serve_file(request, filepath, headers, media_type="application/gzip")
+
+def serve_version(request: Request, dataset, version: int):
+    entry = next((v for v in load_publish_manifest(dataset)["versions"] if v["version"] == version), None)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    filepath = os.path.join(HISTORY_DIR, entry["file"])
+    headers = {"Content-Disposition": f"attachment; filename={dataset['db_file']}"}
+    return serve_file(request, filepath, headers)
+
 @app.get("/download_latest_file")
 async def download_file(request: Request):
-    filepath = os.path.join(BACKUP_DIR, PODCAST_DB_FILE)
-    if not os.path.exists(filepath):
-        raise HTTPException(status_code=404, detail="Database file not found")
-    file_size = os.path.getsize(filepath)
-    headers = {}
-    start_byte = 0
-    end_byte = file_size - 1
-    range_header = request.headers.get("Range")
-    if range_header:
-        try:
-            range_spec = range_header.replace("bytes=", "").split("-")
-            start_byte = int(range_spec[0]) if range_spec[0] else 0
-            end_byte = int(range_spec[1]) if len(range_spec) > 1 and range_spec[1] else file_size - 1
-            if start_byte >= file_size:
-                raise HTTPException(status_code=416, detail="Range not satisfiable")
-            if end_byte >= file_size:
-                end_byte = file_size - 1
-            headers["Content-Range"] = f"bytes {start_byte}-{end_byte}/{file_size}"
-            status_code = 206
-        except ValueError:
-            status_code = 200
-    else:
-        status_code = 200
-    headers["Content-Length"] = str(end_byte - start_byte + 1)
-    headers["Accept-Ranges"] = "bytes"
-    headers["Content-Disposition"] = f"attachment; filename={PODCAST_DB_FILE}"
-    return StreamingResponse(
-        file_streamer(filepath, start_byte, end_byte),
-        media_type="application/octet-stream",
-        headers=headers,
-        status_code=status_code,
-    )
+    return await serve_latest_artifact(request, EXPORT_DATASETS["podcasts"], send_body=True)
 
 @app.head("/download_latest_file")
 async def head_download_file(request: Request):
-    filepath = os.path.join(BACKUP_DIR, PODCAST_DB_FILE)  # Changed to BACKUP_DIR for consistency
-    if not os.path.exists(filepath):
-        raise HTTPException(status_code=404, detail="Database file not found")
-    file_size = os.path.getsize(filepath)
-    headers = {"Content-Length": str(file_size), "Accept-Ranges": "bytes"}
-    return Response(content=b"", status_code=200, headers=headers)
+    return await serve_latest_artifact(request, EXPORT_DATASETS["podcasts"], send_body=False)
 
 @app.get("/database/latest")
 async def get_latest_database():
-    db_path = os.path.join(BACKUP_DIR, PODCAST_DB_FILE)  # Changed to BACKUP_DIR for consistency
-    if not os.path.exists(db_path):
-        raise HTTPException(status_code=404, detail="Database file not found")
-    file_size = os.path.getsize(db_path)
-    return VersionInfo(
-        version="1.0.0",
-        required=True,
-        url=f"/download_latest_file",
-        size=file_size,
-        hash=None,
-        description="Latest podcast database export"
+    return await get_latest_version_info(EXPORT_DATASETS["podcasts"])
+
+@app.get("/database/patches", response_model=PatchPlan)
+async def get_patch_plan(request: Request, version: Optional[int] = None, content_hash: Optional[str] = Query(None, alias="hash")):
+    return await run_in_threadpool(build_patch_plan, EXPORT_DATASETS["podcasts"], version, content_hash, request.headers.get("Accept-Encoding"))
+
+@app.get("/database/patches/{patch_file}")
+async def download_patch(request: Request, patch_file: str):
+    return await run_in_threadpool(serve_patch, request, EXPORT_DATASETS["podcasts"], patch_file)
+
+@app.get("/database/shards", response_model=ShardManifest)
+async def get_shard_manifest():
+    manifest = await run_in_threadpool(load_shard_manifest)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="No shards published")
+    core = ShardInfo(url=f"/database/shards/{manifest['core']['file']}", size=manifest["core"]["size"], hash=manifest["core"]["hash"])
+    channels = [
+        ShardInfo(channel_id=c["channel_id"], episodes=c["episodes"], url=f"/database/shards/{c['file']}", size=c["size"], hash=c["hash"])
+        for c in manifest["channels"]
+    ]
+    return ShardManifest(
+        version=manifest["version"],
+        generated_at=manifest["generated_at"],
+        total_size=core.size + sum(c.size for c in channels),
+        core=core,
+        channels=channels,
     )
 
+def serve_shard(request: Request, shard_file: str):
+    filepath = os.path.join(SHARD_DIR, shard_file)
+    if not SHARD_FILE_PATTERN.match(shard_file) or not os.path.exists(filepath):
+        raise HTTPException(status_code=404, detail="Shard not found")
+    # Names are content hashes, so a shard never changes once published
+    headers = {"Content-Disposition": f"attachment; filename={shard_file}", "Cache-Control": "public, max-age=31536000, immutable"}
+    return serve_file(request, filepath, headers)
+
+@app.get("/database/shards/{shard_file}")
+async def download_shard(request: Request, shard_file: str):
+    return await run_in_threadpool(serve_shard, request, shard_file)
+
+@app.get("/database/versions/{version}")
+async def download_version(request: Request, version: int):
+    return await run_in_threadpool(serve_version, request, EXPORT_DATASETS["podcasts"], version)
+
+@app.get("/database/artifacts/{artifact_file}")
+async def download_artifact(request: Request, artifact_file: str):
+    return await serve_stored_artifact(request, EXPORT_DATASETS["podcasts"], artifact_file, send_body=True)
+
+@app.head("/database/artifacts/{artifact_file}")
+async def head_download_artifact(request: Request, artifact_file: str):
+    return await serve_stored_artifact(request, EXPORT_DATASETS["podcasts"], artifact_file, send_body=False)
+
+@app.get("/sessions/download_latest_file")
+async def download_sessions_file(request: Request):
+    return await serve_latest_artifact(request, EXPORT_DATASETS["sessions"], send_body=True)
+
+@app.head("/sessions/download_latest_file")
+async def head_download_sessions_file(request: Request):
+    return await serve_latest_artifact(request, EXPORT_DATASETS["sessions"], send_body=False)
+
+@app.get("/sessions/database/latest")
+async def get_latest_sessions_database():
+    return await get_latest_version_info(EXPORT_DATASETS["sessions"])
+
+@app.get("/sessions/database/patches", response_model=PatchPlan)
+async def get_sessions_patch_plan(request: Request, version: Optional[int] = None, content_hash: Optional[str] = Query(None, alias="hash")):
+    return await run_in_threadpool(build_patch_plan, EXPORT_DATASETS["sessions"], version, content_hash, request.headers.get("Accept-Encoding"))
+
+@app.get("/sessions/database/patches/{patch_file}")
+async def download_sessions_patch(request: Request, patch_file: str):
+    return await run_in_threadpool(serve_patch, request, EXPORT_DATASETS["sessions"], patch_file)
+
+@app.get("/sessions/database/artifacts/{artifact_file}")
+async def download_sessions_artifact(request: Request, artifact_file: str):
+    return await serve_stored_artifact(request, EXPORT_DATASETS["sessions"], artifact_file, send_body=True)
+
+@app.head("/sessions/database/artifacts/{artifact_file}")
+async def head_download_sessions_artifact(request: Request, artifact_file: str):
+    return await serve_stored_artifact(request, EXPORT_DATASETS["sessions"], artifact_file, send_body=False)
+
+@app.get("/sessions/database/versions/{version}")
+async def download_sessions_version(request: Request, version: int):
+    return await run_in_threadpool(serve_version, request, EXPORT_DATASETS["sessions"], version)
+
+@app.get("/api/channels")
+async def list_channels(request: Request, cursor: Optional[int] = None, limit: int = Query(API_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE)):
+    return await snapshot_query(request, ("channels", cursor, limit), query_channel_page, cursor, limit)
+
+@app.get("/api/channels/{channel_id}")
+async def get_channel(request: Request, channel_id: int):
+    return await snapshot_query(request, ("channel", channel_id), query_channel, channel_id)
+
+@app.get("/api/channels/{channel_id}/episodes")
+async def list_channel_episodes(request: Request, channel_id: int, cursor: Optional[str] = None,
+                                limit: int = Query(API_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE)):
+    position = parse_episode_cursor(cursor)
+    return await snapshot_query(request, ("channel_episodes", channel_id, position, limit), query_channel_episodes, channel_id, position, limit)
+
+@app.get("/api/categories")
+async def list_categories(request: Request):
+    return await snapshot_query(request, ("categories",), query_categories)
+
+@app.get("/api/categories/{category_id}/episodes")
+async def list_category_episodes(request: Request, category_id: int, cursor: Optional[str] = None,
+                                 limit: int = Query(API_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE)):
+    position = parse_episode_cursor(cursor)
+    return await snapshot_query(request, ("category_episodes", category_id, position, limit), query_category_episodes, category_id, position, limit)
+
 # Startup and shutdown events
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting up...")
-    podcast_db_path = os.path.join(STORAGE_DIR, PODCAST_DB_FILE)
-    session_db_path = os.path.join(STORAGE_DIR, SESSION_DB_FILE)
-    while True:
-        if check_backend_availability(BACKEND_URL):
-            try:
-                pg_conn = psycopg2.connect(host=PG_HOST, port=PG_PORT, dbname=PG_DBNAME, user=PG_USER, password=PG_PASSWORD)
-                if not check_if_tables_populated(pg_conn):
-                    logger.info("Tables are not populated, performing import")
-                    perform_import(pg_conn, podcast_db_path, session_db_path)
-                else:
-                    logger.info("Tables are already populated, skipping import")
-                export_postgres_to_sqlite()
-                scheduler.start()
-                pg_conn.close()
-                break
-            except psycopg2.Error as e:
-                logger.error(f"PostgreSQL connection failed: {e}")
-                time.sleep(POLL_INTERVAL)
-        else:
-            logger.info(f"Waiting for backend, retrying in {POLL_INTERVAL} seconds")
-            time.sleep(POLL_INTERVAL)
+    threading.Thread(target=run_bootstrap, name="bootstrap", daemon=True).start()
 
 @app.on_event("shutdown")
 def shutdown_event():
-    scheduler.shutdown()
+    shutdown_requested.set()
+    if scheduler.running:
+        scheduler.shutdown()
+    leader_lock.release()
+    pg_pool.close()
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Extra workers only serve; leader election keeps imports and exports on one of them
+    if HTTP_SERVER == "uvicorn":
+        import uvicorn
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=WEB_WORKERS)
+    else:
+        from granian import Granian
+        from granian.constants import Interfaces
+        Granian("main:app", address="0.0.0.0", port=8000, interface=Interfaces.ASGI, workers=WEB_WORKERS).serve()
\ No newline at end of file
@@ -0,0 +1,195 @@
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+
+logger = logging.getLogger("combined-script")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+class Metric:
+    # One metric family; children are keyed by their label values in labelnames order
+
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.children = {}
+
+    def key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        with self.lock:
+            children = list(self.children.items())
+        for key, value in sorted(children):
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.children[key] = self.children.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.children[key] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            child = self.children.get(key)
+            if child is None:
+                child = self.children[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            child["counts"][bisect_left(self.buckets, value)] += 1
+            child["sum"] += value
+            child["count"] += 1
+
+    def samples(self):
+        with self.lock:
+            children = [(key, dict(child, counts=list(child["counts"]))) for key, child in self.children.items()]
+        for key, child in sorted(children, key=lambda item: item[0]):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, child["counts"]):
+                cumulative += count
+                yield f"{self.name}_bucket", dict(labels, le=format_value(float(bound))), cumulative
+            yield f"{self.name}_sum", labels, child["sum"]
+            yield f"{self.name}_count", labels, child["count"]
+
+
+class Trace:
+    # Structured timing breakdown of one pipeline run, handed to the registry's span hooks when it ends
+
+    def __init__(self, registry, name, **attributes):
+        self.registry = registry
+        self.name = name
+        self.attributes = attributes
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.spans = []
+
+    def add_span(self, name, seconds, **attributes):
+        span = {"name": name, "seconds": round(seconds, 6)}
+        span.update((key, value) for key, value in attributes.items() if value is not None)
+        with self.lock:
+            self.spans.append(span)
+
+    def finish(self, **attributes):
+        self.attributes.update(attributes)
+        record = {
+            "trace": self.name,
+            "started_at": self.started,
+            "seconds": round(time.time() - self.started, 6),
+            "attributes": self.attributes,
+            "spans": list(self.spans),
+        }
+        for hook in list(self.registry.span_hooks):
+            try:
+                hook(record)
+            except Exception as e:
+                logger.warning(f"Span hook {getattr(hook, '__name__', hook)} failed: {e}")
+        return record
+
+
+class MetricsRegistry:
+    # Holds metric families plus collectors that read live stats (pool, caches, downloads) at scrape time
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = []
+        self.collectors = []
+        self.span_hooks = []
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def stats_collector(self, prefix, documentation, get_stats, counters=()):
+        # Every numeric entry of a get_stats() dict becomes the gauge <prefix>_<key>, except the
+        # running totals named in counters, which become the counter <prefix>_<key>_total
+        with self.lock:
+            self.collectors.append((prefix, documentation, get_stats, frozenset(counters)))
+
+    def add_span_hook(self, hook):
+        with self.lock:
+            self.span_hooks.append(hook)
+
+    def trace(self, name, **attributes):
+        return Trace(self, name, **attributes)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            metrics = list(self.metrics)
+            collectors = list(self.collectors)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+        for prefix, documentation, get_stats, counters in collectors:
+            try:
+                stats = get_stats()
+            except Exception as e:
+                logger.warning(f"Metrics collector {prefix} failed: {e}")
+                continue
+            for key, value in sorted(stats.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                kind = "counter" if key in counters else "gauge"
+                name = f"{prefix}_{key}"
+                if kind == "counter" and not name.endswith("_total"):
+                    name += "_total"
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {format_value(value)}")
+        return "\n".join(lines) + "\n"
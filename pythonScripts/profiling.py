@@ -0,0 +1,92 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+logger = logging.getLogger("combined-script")
+
+
+class RunProfiler:
+    # Deterministic CPU profile of one import or export, optionally with tracemalloc. cProfile only sees
+    # the thread that enables it, so threads started during the run whose names carry one of the
+    # pipeline prefixes (the export and import worker pools) get a profiler of their own
+
+    def __init__(self, thread_prefixes, allocations=True, traceback_frames=25):
+        self.thread_prefixes = tuple(thread_prefixes)
+        self.allocations = allocations
+        self.traceback_frames = traceback_frames
+        self.lock = threading.Lock()
+        self.profilers = []
+        self.started_tracemalloc = False
+        self.peak_traced = None
+        self.snapshot = None
+        self.seconds = None
+
+    def start_thread_profiler(self, frame, event, arg):
+        # Installed with threading.setprofile; replaces itself with a real profiler on the new thread
+        if not threading.current_thread().name.startswith(self.thread_prefixes):
+            sys.setprofile(None)
+            return
+        profiler = cProfile.Profile()
+        with self.lock:
+            self.profilers.append(profiler)
+        profiler.enable()
+
+    def __enter__(self):
+        if self.allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(self.traceback_frames)
+            self.started_tracemalloc = True
+        self.started = time.monotonic()
+        threading.setprofile(self.start_thread_profiler)
+        profiler = cProfile.Profile()
+        self.profilers.append(profiler)
+        profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profilers[0].disable()
+        threading.setprofile(None)
+        self.seconds = time.monotonic() - self.started
+        if self.started_tracemalloc:
+            self.snapshot = tracemalloc.take_snapshot()
+            self.peak_traced = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return False
+
+    def stats(self):
+        # Worker pools are joined by the time the run returns, so their profilers are no longer collecting
+        with self.lock:
+            profilers = list(self.profilers)
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        return stats
+
+    def write_reports(self, directory, target, top_functions=60, top_allocations=40):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        stem = os.path.join(directory, f"{target}-{stamp}")
+        stats = self.stats()
+        stats.dump_stats(f"{stem}.pstats")
+        text = io.StringIO()
+        text.write(f"{target} run profiled for {self.seconds:.2f}s across {len(self.profilers)} threads\n\n")
+        stats.stream = text
+        stats.sort_stats("cumulative").print_stats(top_functions)
+        stats.sort_stats("tottime").print_stats(top_functions)
+        if self.snapshot is not None:
+            text.write(f"\nPeak traced memory: {self.peak_traced / (1024 * 1024):.1f} MiB\n")
+            text.write(f"Top {top_allocations} allocation sites still held at the end of the run:\n")
+            snapshot = self.snapshot.filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ])
+            for stat in snapshot.statistics("lineno")[:top_allocations]:
+                text.write(f"{stat}\n")
+        with open(f"{stem}.txt", "w") as f:
+            f.write(text.getvalue())
+        return [f"{os.path.basename(stem)}.txt", f"{os.path.basename(stem)}.pstats"]
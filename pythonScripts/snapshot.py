@@ -0,0 +1,81 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class SnapshotReader:
+    # Read-only connections to the current published artifact. Artifacts are never modified once
+    # published, so connections skip locking and change detection; when the current pointer moves
+    # to a new file the idle connections to the old one are dropped
+
+    def __init__(self, max_idle):
+        self.max_idle = max_idle
+        self.lock = threading.Lock()
+        self.path = None
+        self.idle = []
+        self.stats = {"connections_opened": 0, "queries": 0}
+
+    @contextmanager
+    def connection(self, path):
+        conn = None
+        with self.lock:
+            if path != self.path:
+                stale, self.idle, self.path = self.idle, [], path
+            else:
+                stale = []
+                conn = self.idle.pop() if self.idle else None
+            self.stats["queries"] += 1
+        for old in stale:
+            old.close()
+        if conn is None:
+            conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            with self.lock:
+                self.stats["connections_opened"] += 1
+        try:
+            yield conn
+        finally:
+            with self.lock:
+                keep = self.path == path and len(self.idle) < self.max_idle
+                if keep:
+                    self.idle.append(conn)
+            if not keep:
+                conn.close()
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats, idle=len(self.idle))
+
+
+class LruCache:
+    # Thread-safe LRU for rendered responses; keys carry the artifact hash, so entries for a
+    # superseded artifact are never hit again and simply age out
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,62 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# main reads its configuration at import time: scratch storage, no leader election or LISTEN thread.
+# Postgres-backed tests only run against the database named in TEST_PG_DBNAME
+os.environ["STORAGE_DIR"] = tempfile.mkdtemp(prefix="kotlinapp-tests-")
+os.environ["LEADER_ELECTION"] = "false"
+os.environ["CHANGE_NOTIFICATIONS"] = "false"
+if os.environ.get("TEST_PG_DBNAME"):
+    os.environ["PG_DBNAME"] = os.environ["TEST_PG_DBNAME"]
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Rows in PodcastChannels / PodcastEpisodes column order, shared by the SQLite-backed tests
+def channel(channel_id, title, author="Author"):
+    return (channel_id, title, f"https://example.com/{channel_id}", f"About {title}", None, "en", author,
+            "owner@example.com", "Owner", "https://example.com/image.png", 1700000000000)
+
+
+def episode(episode_id, channel_id, title, pub_date=None):
+    return (episode_id, channel_id, f"guid-{episode_id}", title, f"Notes for {title}", f"https://example.com/e/{episode_id}",
+            pub_date or 1700000000000 + episode_id, 1800, 0, None, f"https://example.com/e/{episode_id}.mp3", "audio/mpeg", 1000)
+
+
+@pytest.fixture
+def storage():
+    # Empties the artifact store, so each test publishes from version 1
+    import main
+    for entry in os.listdir(main.STORAGE_DIR):
+        path = os.path.join(main.STORAGE_DIR, entry)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    for directory in (main.HISTORY_DIR, main.PATCH_DIR, main.SHARD_DIR, main.PROFILE_DIR):
+        os.makedirs(directory)
+    main.artifact_metadata_cache.clear()
+    return main.STORAGE_DIR
+
+
+@pytest.fixture
+def export_db(storage):
+    # Recreates the backend's tables in TEST_PG_DBNAME and installs the export triggers
+    if not os.environ.get("TEST_PG_DBNAME"):
+        pytest.skip("set TEST_PG_DBNAME (and PG_HOST, PG_USER, ...) to a throwaway database to run Postgres tests")
+    import benchmark
+    import main
+    with main.pg_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(benchmark.POSTGRES_SCHEMA)
+        cursor.execute(f"DROP TABLE IF EXISTS {main.DELETE_LOG_TABLE}")
+        conn.commit()
+        cursor.close()
+        main.schema_cache.refresh(conn, "public")
+        main.install_export_support(conn)
+        yield conn
+        conn.rollback()
@@ -0,0 +1,65 @@
+import hashlib
+import os
+import sqlite3
+
+import main
+from conftest import channel
+
+PODCASTS = main.EXPORT_DATASETS["podcasts"]
+
+
+def publish(tmp_path, title):
+    path = str(tmp_path / f"{title}.db")
+    conn = sqlite3.connect(path)
+    main.setup_sqlite_tables(conn, PODCASTS)
+    conn.execute(f"INSERT INTO PodcastChannels VALUES ({','.join('?' * 11)})", channel(1, title))
+    conn.commit()
+    conn.close()
+    return main.publish_artifact_version(PODCASTS, path)
+
+
+def current_title():
+    conn = sqlite3.connect(main.get_served_artifact_path(PODCASTS))
+    try:
+        return conn.execute("SELECT title FROM PodcastChannels").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_publish_swaps_the_pointer_without_touching_open_files(storage, tmp_path):
+    first = publish(tmp_path, "First")
+    pointer = os.path.join(storage, PODCASTS["db_file"])
+    assert os.path.islink(pointer)
+    with open(pointer, "rb") as reader:
+        second = publish(tmp_path, "Second")
+        # A download that resolved the old pointer keeps reading the old, unmodified file
+        assert hashlib.sha256(reader.read()).hexdigest() == first["hash"]
+    assert main.compute_file_hash(os.path.join(main.HISTORY_DIR, first["file"])) == first["hash"]
+    assert os.path.realpath(pointer) == os.path.join(os.path.realpath(main.HISTORY_DIR), second["file"])
+    assert current_title() == "Second"
+
+
+def test_identical_content_is_not_republished(storage, tmp_path):
+    first = publish(tmp_path, "Same")
+    assert publish(tmp_path, "Same") == first
+    assert [v["version"] for v in main.load_publish_manifest(PODCASTS)["versions"]] == [1]
+
+
+def test_retention_drops_old_versions_and_their_patches(storage, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "ARTIFACT_HISTORY_SIZE", 2)
+    monkeypatch.setattr(main, "ARTIFACT_MIN_RETENTION_MINUTES", 0)
+    entries = [publish(tmp_path, title) for title in ("One", "Two", "Three")]
+    manifest = main.load_publish_manifest(PODCASTS)
+    assert [v["version"] for v in manifest["versions"]] == [2, 3]
+    assert [(p["from_version"], p["to_version"]) for p in manifest["patches"]] == [(2, 3)]
+    assert not os.path.exists(os.path.join(main.HISTORY_DIR, entries[0]["file"]))
+    assert sorted(os.listdir(main.PATCH_DIR)) == [manifest["patches"][0]["file"]]
+    assert current_title() == "Three"
+
+
+def test_recent_versions_outlive_the_history_size(storage, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "ARTIFACT_HISTORY_SIZE", 1)
+    entries = [publish(tmp_path, title) for title in ("One", "Two")]
+    # Inside the grace period nothing is removed, so in-flight downloads of version 1 can finish
+    assert [v["version"] for v in main.load_publish_manifest(PODCASTS)["versions"]] == [1, 2]
+    assert os.path.exists(os.path.join(main.HISTORY_DIR, entries[0]["file"]))
@@ -0,0 +1,60 @@
+import pytest
+
+import main
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Debounce windows of 5s, bounded at 60s after the first change, on a clock the test moves by hand
+    now = [1000.0]
+    monkeypatch.setattr(main.time, "monotonic", lambda: now[0])
+    for name in main.EXPORT_DATASETS:
+        monkeypatch.setitem(main.EXPORT_DATASETS[name], "debounce_seconds", 5)
+        monkeypatch.setitem(main.EXPORT_DATASETS[name], "max_staleness_seconds", 60)
+        monkeypatch.setitem(main.change_state["datasets"], name, {"pending": 0, "first_change": None, "last_change": None, "tables": set()})
+    return now
+
+
+def test_changes_wait_for_a_quiet_window(clock):
+    main.note_change("podcast_episodes")
+    clock[0] += 3
+    main.note_change("podcast_episodes")
+    assert main.change_deadline("podcasts") == 1008
+    assert main.due_change_datasets(1007.9) == []
+    assert main.due_change_datasets(1008) == ["podcasts"]
+    assert main.change_deadline("sessions") is None
+
+
+def test_steady_changes_export_by_the_staleness_bound(clock):
+    for _ in range(50):
+        main.note_change("podcast_channels")
+        clock[0] += 2
+    assert main.change_deadline("podcasts") == 1060
+    assert main.due_change_datasets(1060) == ["podcasts"]
+
+
+def test_changes_route_to_the_datasets_exporting_the_table(clock):
+    main.note_change("conference_sessions")
+    assert main.change_state["datasets"]["sessions"]["tables"] == {"conference_sessions"}
+    assert main.change_state["datasets"]["podcasts"]["pending"] == 0
+
+
+def test_wait_timeout_tracks_the_nearest_deadline(clock):
+    assert main.change_wait_timeout(clock[0]) == 1.0
+    main.note_change("podcast_episodes")
+    assert main.change_wait_timeout(clock[0] + 4.5) == 0.5
+    assert main.change_wait_timeout(clock[0] + 10) == 0
+
+
+def test_failed_export_is_retried_after_another_window(clock, monkeypatch):
+    def failing_export(force_full=False, datasets=None):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(main, "run_export_job", failing_export)
+    main.note_change("podcast_episodes")
+    clock[0] += 5
+    main.export_pending_changes(["podcasts"])
+    pending = main.change_state["datasets"]["podcasts"]
+    assert pending["pending"] == 1
+    assert pending["tables"] == {"retry"}
+    assert main.change_deadline("podcasts") == clock[0] + 5
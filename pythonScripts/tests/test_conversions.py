@@ -0,0 +1,67 @@
+import os
+import sqlite3
+
+import pytest
+
+import main
+
+TYPES = {"id": "integer", "title": "character varying", "pub_date": "timestamp without time zone", "explicit": "boolean",
+         "release_date": "text", "starts_at": "timestamp with time zone"}
+
+
+def test_export_columns_convert_in_the_select():
+    expressions, converters = main.compile_export_columns(["id", "title", "pub_date", "explicit", "release_date"], TYPES, {"title": "it's"})
+    assert expressions == [
+        '"id"',
+        "COALESCE(\"title\", 'it''s')",
+        'floor(extract(epoch FROM "pub_date") * 1000)::bigint',
+        '"explicit"::int',
+        '"release_date"',
+    ]
+    # Only dates stored as text are left to Python
+    assert converters == [None, None, None, None, main.timestamp_to_epoch]
+    assert main.timestamp_to_epoch("2023-11-14T22:13:20Z") == 1700000000000
+
+
+def test_import_columns_stage_integers_for_postgres_to_convert():
+    staged, encoders, inserted = main.compile_import_columns(["id", "title", "pub_date", "starts_at", "explicit"], TYPES)
+    assert staged == ['"id"', '"title"', 'NULL::bigint AS "pub_date"', 'NULL::bigint AS "starts_at"', 'NULL::bigint AS "explicit"']
+    assert encoders == [main.encode_copy_numbers, main.encode_copy_texts, main.encode_copy_numbers, main.encode_copy_numbers, main.encode_copy_numbers]
+    assert inserted == [
+        '"id"',
+        '"title"',
+        "to_timestamp(\"pub_date\" / 1000.0) AT TIME ZONE 'UTC'",
+        'to_timestamp("starts_at" / 1000.0)',
+        '"explicit" = 1',
+    ]
+
+
+def test_copy_chunks_escape_text_and_mark_nulls():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE Items (id INTEGER, name TEXT, pubDate INTEGER)")
+    conn.executemany("INSERT INTO Items VALUES (?, ?, ?)", [(1, "tab\there", 1700000000000), (2, "back\\slash\nline\r", None), (3, None, 5)])
+    encoders = [main.encode_copy_numbers, main.encode_copy_texts, main.encode_copy_numbers]
+    chunks = list(main.iter_copy_chunks(conn, "Items", ["id", "name", "pubDate"], encoders, 0, 3, batch_size=2))
+    assert len(chunks) == 2
+    assert b"".join(chunks).decode("utf-8").split("\n") == [
+        "1\ttab\\there\t1700000000000",
+        "2\tback\\\\slash\\nline\\r\t" + main.COPY_NULL,
+        f"3\t{main.COPY_NULL}\t5",
+        "",
+    ]
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_PG_DBNAME"), reason="set TEST_PG_DBNAME to a throwaway database to run Postgres tests")
+def test_postgres_expressions_round_trip_epoch_milliseconds():
+    with main.pg_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT floor(extract(epoch FROM "pub_date") * 1000)::bigint, to_timestamp("ms" / 1000.0) AT TIME ZONE 'UTC', "flag"::int
+            FROM (SELECT timestamp '2023-11-14 22:13:20.5' AS "pub_date", 1700000000500::bigint AS "ms", true AS "flag") AS t
+        """)
+        exported, imported, flag = cursor.fetchone()
+        cursor.close()
+        conn.rollback()
+    assert exported == 1700000000500
+    assert imported.isoformat() == "2023-11-14T22:13:20.500000"
+    assert flag == 1
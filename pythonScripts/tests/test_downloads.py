@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from conftest import channel
+
+PODCASTS = main.EXPORT_DATASETS["podcasts"]
+RAW = {"Accept-Encoding": "identity"}
+
+
+@pytest.fixture
+def client(storage, tmp_path):
+    path = str(tmp_path / "build.db")
+    conn = sqlite3.connect(path)
+    main.setup_sqlite_tables(conn, PODCASTS)
+    conn.executemany(f"INSERT INTO PodcastChannels VALUES ({','.join('?' * 11)})", [channel(id, f"Channel {id}") for id in range(1, 200)])
+    conn.commit()
+    conn.close()
+    main.publish_artifact_version(PODCASTS, path)
+    # Not used as a context manager, so the startup bootstrap never runs
+    return TestClient(main.app)
+
+
+def test_matching_etag_is_not_modified(client):
+    first = client.get("/download_latest_file", headers=RAW)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "no-cache"
+    for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get("/download_latest_file", headers=dict(RAW, **{"If-None-Match": header}))
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+    assert client.get("/download_latest_file", headers=dict(RAW, **{"If-None-Match": '"other"'})).status_code == 200
+    since = client.get("/download_latest_file", headers=dict(RAW, **{"If-Modified-Since": first.headers["Last-Modified"]}))
+    assert since.status_code == 304
+
+
+def test_each_encoding_has_its_own_etag(client):
+    raw = client.get("/download_latest_file", headers=RAW)
+    gzipped = client.get("/download_latest_file", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.headers["ETag"] == raw.headers["ETag"][:-1] + '-gzip"'
+    response = client.get("/download_latest_file", headers={"Accept-Encoding": "gzip", "If-None-Match": raw.headers["ETag"]})
+    assert response.status_code == 200
+
+
+def test_if_range_only_resumes_the_same_file(client):
+    full = client.get("/download_latest_file", headers=RAW)
+    range_headers = dict(RAW, Range="bytes=100-199")
+    resumed = client.get("/download_latest_file", headers=dict(range_headers, **{"If-Range": full.headers["ETag"]}))
+    assert resumed.status_code == 206
+    assert resumed.content == full.content[100:200]
+    by_date = client.get("/download_latest_file", headers=dict(range_headers, **{"If-Range": full.headers["Last-Modified"]}))
+    assert by_date.status_code == 206
+    # A validator from another file, or a weak one, means the client's partial copy is stale: send it all
+    for validator in ('"stale"', f"W/{full.headers['ETag']}"):
+        restarted = client.get("/download_latest_file", headers=dict(range_headers, **{"If-Range": validator}))
+        assert restarted.status_code == 200
+        assert restarted.content == full.content
+
+
+def test_version_info_reports_the_published_artifact(client):
+    info = client.get("/database/latest").json()
+    assert info["version"] == "1"
+    assert info["url"].startswith("/database/artifacts/")
+    stored = client.get(info["url"], headers=RAW)
+    assert stored.status_code == 200
+    assert stored.headers["Cache-Control"] == main.IMMUTABLE_CACHE_CONTROL
+    assert len(stored.content) == info["size"]
@@ -0,0 +1,155 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+import main
+
+
+def fake_worker(batches_per_table):
+    # Stands in for export_table_worker: no Postgres, just a stream of batches and the final report
+    def worker(snapshot_id, plan, batch_size, batches, cancelled):
+        try:
+            for batch in range(batches_per_table):
+                if cancelled.is_set():
+                    break
+                batches.put((plan, [(batch * 10 + offset, None if plan["pg_table"] == "broken" and batch == 1 else "x") for offset in range(10)]))
+        finally:
+            batches.put((plan, None))
+    return worker
+
+
+def export_plan(pg_table):
+    return {"dataset": "podcasts", "pg_table": pg_table, "sqlite_insert": f"INSERT INTO {pg_table} VALUES (?, ?)",
+            "timings": {"insert": 0.0}, "rows": 0, "changed": 0}
+
+
+def test_parallel_export_fails_fast_when_an_insert_fails(monkeypatch):
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.execute("CREATE TABLE ok (id INTEGER PRIMARY KEY, value TEXT NOT NULL)")
+    conn.execute("CREATE TABLE broken (id INTEGER PRIMARY KEY, value TEXT NOT NULL)")
+    # Far more batches than the queue holds, so workers block on put() unless the writer keeps draining
+    monkeypatch.setattr(main, "export_table_worker", fake_worker(200))
+    monkeypatch.setattr(main, "EXPORT_WORKERS", 2)
+    outcome = {}
+
+    def run():
+        try:
+            main.export_tables_in_parallel({"podcasts": conn}, "snapshot", [export_plan("ok"), export_plan("broken")])
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive(), "export hung after a failed insert"
+    assert isinstance(outcome.get("error"), sqlite3.IntegrityError)
+
+
+def test_parallel_export_writes_every_batch(monkeypatch):
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.execute("CREATE TABLE first (id INTEGER PRIMARY KEY, value TEXT NOT NULL)")
+    conn.execute("CREATE TABLE second (id INTEGER PRIMARY KEY, value TEXT NOT NULL)")
+    monkeypatch.setattr(main, "export_table_worker", fake_worker(20))
+    plans = [export_plan("first"), export_plan("second")]
+    assert main.export_tables_in_parallel({"podcasts": conn}, "snapshot", plans) == 400
+    assert [plan["rows"] for plan in plans] == [200, 200]
+    assert conn.execute("SELECT COUNT(*) FROM second").fetchone()[0] == 200
+
+
+def test_parallel_export_reports_worker_errors(monkeypatch):
+    def failing_worker(snapshot_id, plan, batch_size, batches, cancelled):
+        batches.put((plan, RuntimeError(f"{plan['pg_table']} unreadable")))
+
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    monkeypatch.setattr(main, "export_table_worker", failing_worker)
+    with pytest.raises(RuntimeError, match="unreadable"):
+        main.export_tables_in_parallel({"podcasts": conn}, "snapshot", [export_plan("first")])
+
+
+def execute(conn, query, params=None):
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    cursor.close()
+    conn.commit()
+
+
+def add_episode(conn, episode_id, title, updated_at="now()"):
+    execute(conn, f"""
+        INSERT INTO podcast_episodes (id, channel_id, guid, title, description, link, pub_date, duration, explicit,
+            media_url, media_type, media_length, updated_at)
+        VALUES (%s, 1, %s, %s, 'Notes', 'https://example.com', now(), 60, false, 'https://example.com/e.mp3', 'audio/mpeg', 1, {updated_at})
+    """, (episode_id, f"guid-{episode_id}", title))
+
+
+def exported_titles():
+    conn = sqlite3.connect(os.path.join(main.STORAGE_DIR, main.EXPORT_DATASETS["podcasts"]["db_file"]))
+    try:
+        return dict(conn.execute("SELECT id, title FROM PodcastEpisodes"))
+    finally:
+        conn.close()
+
+
+def published_versions():
+    return [entry["version"] for entry in main.load_publish_manifest(main.EXPORT_DATASETS["podcasts"])["versions"]]
+
+
+def test_incremental_export_picks_up_late_commits_and_updates(export_db):
+    execute(export_db, """
+        INSERT INTO podcast_channels (id, title, link, description, language, author, owner_email, owner_name, image_url, last_build_date)
+        VALUES (1, 'Kotlin Weekly', 'https://example.com', 'About', 'en', 'Author', 'owner@example.com', 'Owner', 'https://example.com/i.png', now())
+    """)
+    add_episode(export_db, 1, "First")
+    add_episode(export_db, 2, "Second")
+    main.export_postgres_to_sqlite(force_full=True, datasets=["podcasts"])
+    assert exported_titles() == {1: "First", 2: "Second"}
+
+    # A transaction that started before that export commits afterwards: its updated_at is older than the
+    # stored high-water mark, which therefore does not move
+    add_episode(export_db, 3, "Late", updated_at="(SELECT max(updated_at) FROM podcast_episodes) - interval '5 seconds'")
+    main.export_postgres_to_sqlite(datasets=["podcasts"])
+    assert exported_titles() == {1: "First", 2: "Second", 3: "Late"}
+
+    # The backend never sets updated_at on update; the trigger does
+    execute(export_db, "UPDATE podcast_episodes SET title = 'Renamed' WHERE id = 1")
+    main.export_postgres_to_sqlite(datasets=["podcasts"])
+    assert exported_titles() == {1: "Renamed", 2: "Second", 3: "Late"}
+    assert published_versions() == [1, 2, 3]
+
+    # Rows re-read from the overlap window are unchanged, so nothing new is published
+    main.export_postgres_to_sqlite(datasets=["podcasts"])
+    assert published_versions() == [1, 2, 3]
+
+
+def add_session(conn, session_id, description):
+    execute(conn, "INSERT INTO conference_sessions (id, title, description, starts_at, ends_at) VALUES (%s, 'Keynote', %s, now(), now())",
+            (session_id, description))
+
+
+def test_session_export_fills_missing_descriptions(export_db):
+    add_session(export_db, "s1", None)
+    add_session(export_db, "s2", "Opening")
+    main.export_postgres_to_sqlite(force_full=True, datasets=["sessions"])
+    conn = sqlite3.connect(os.path.join(main.STORAGE_DIR, main.EXPORT_DATASETS["sessions"]["db_file"]))
+    try:
+        assert dict(conn.execute("SELECT id, description FROM SessionTable")) == {"s1": "", "s2": "Opening"}
+    finally:
+        conn.close()
+
+
+def test_failed_dataset_does_not_block_the_others(export_db, monkeypatch):
+    add_session(export_db, "s1", "Opening")
+    publish = main.publish_artifact_version
+
+    def failing_publish(dataset, db_path):
+        if dataset["name"] == "sessions":
+            raise OSError("disk full")
+        return publish(dataset, db_path)
+
+    monkeypatch.setattr(main, "publish_artifact_version", failing_publish)
+    with pytest.raises(RuntimeError, match="Publishing failed for sessions"):
+        main.export_postgres_to_sqlite(force_full=True)
+    assert published_versions() == [1]
+    assert main.load_publish_manifest(main.EXPORT_DATASETS["sessions"])["versions"] == []
+    assert not os.path.exists(os.path.join(main.STORAGE_DIR, f"{main.EXPORT_DATASETS['sessions']['db_file']}.tmp"))
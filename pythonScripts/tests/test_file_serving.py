@@ -0,0 +1,182 @@
+import asyncio
+
+import pytest
+
+from file_serving import (MAX_RANGES, DownloadAdmission, DownloadRejected, FileRangeResponse, RangeNotSatisfiable, coalesce_ranges,
+                          parse_range_header)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("items=0-10", None),
+    ("bytes=0-99", [(0, 99)]),
+    ("bytes=900-", [(900, 999)]),
+    ("bytes=-100", [(900, 999)]),
+    ("bytes=-5000", [(0, 999)]),
+    ("bytes=990-2000", [(990, 999)]),
+    ("bytes=0-9, 10-19, 50-59", [(0, 19), (50, 59)]),
+    ("bytes=50-59,0-9,5-20", [(0, 20), (50, 59)]),
+    ("bytes=0-9,2000-3000", [(0, 9)]),
+])
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5-2", "bytes=abc-10", "bytes=10", "bytes=-0", "bytes=-1-5"])
+def test_parse_range_header_rejects_unsatisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header(header, 1000)
+
+
+def test_parse_range_header_limits_parts():
+    spaced = ",".join(f"{start}-{start}" for start in range(0, (MAX_RANGES + 1) * 10, 10))
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header(f"bytes={spaced}", 1000)
+    # Adjacent ranges merge first, so they never count against the limit
+    adjacent = ",".join(f"{start}-{start}" for start in range(MAX_RANGES * 4))
+    assert parse_range_header(f"bytes={adjacent}", 1000) == [(0, MAX_RANGES * 4 - 1)]
+
+
+def test_coalesce_ranges():
+    assert coalesce_ranges([(10, 19), (0, 9), (30, 40), (35, 50)]) == [(0, 19), (30, 50)]
+    assert coalesce_ranges([(0, 100), (10, 20)]) == [(0, 100)]
+
+
+
+def serve(response, extensions):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(response({"type": "http", "method": "GET", "extensions": extensions}, None, send))
+    return messages
+
+
+def test_whole_file_uses_pathsend_without_admission(tmp_path):
+    path = tmp_path / "artifact.db"
+    path.write_bytes(bytes(range(256)) * 16)
+    messages = serve(FileRangeResponse(str(path), 4096), {"http.response.pathsend": {}})
+    assert [message["type"] for message in messages] == ["http.response.start", "http.response.pathsend"]
+    assert messages[1]["path"] == str(path)
+
+
+def test_ranges_are_read_from_the_file(tmp_path):
+    path = tmp_path / "artifact.db"
+    path.write_bytes(bytes(range(256)) * 16)
+    messages = serve(FileRangeResponse(str(path), 4096, [(10, 19)]), {"http.response.pathsend": {}})
+    assert messages[0]["status"] == 206
+    assert b"".join(message.get("body", b"") for message in messages[1:]) == bytes(range(10, 20))
+    boundary_messages = serve(FileRangeResponse(str(path), 4096, [(0, 1), (100, 101)]), {})
+    body = b"".join(message.get("body", b"") for message in boundary_messages[1:])
+    assert bytes([0, 1]) in body and bytes([100, 101]) in body
+    assert body.endswith(b"--\r\n")
+
+def admission(**kwargs):
+    options = dict(max_streams=1, max_queued=2, queue_timeout=1.0, retry_after=10)
+    options.update(kwargs)
+    return DownloadAdmission(**options)
+
+
+def test_admission_queues_in_arrival_order():
+    async def scenario():
+        gate = admission()
+        await gate.acquire()
+        order = []
+
+        async def download(name):
+            await gate.acquire()
+            order.append(name)
+
+        waiters = [asyncio.create_task(download(name)) for name in ("first", "second")]
+        await asyncio.sleep(0)
+        assert gate.get_stats()["waiting"] == 2
+        gate.release()
+        await asyncio.sleep(0)
+        gate.release()
+        await asyncio.gather(*waiters)
+        return order, gate.get_stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["first", "second"]
+    assert stats["admitted"] == 3
+    assert stats["queued"] == 2
+    assert stats["active"] == 1
+    assert stats["active_max"] == 1
+
+
+def test_admission_rejects_when_queue_is_full():
+    async def scenario():
+        gate = admission(max_queued=0, retry_after=10)
+        await gate.acquire()
+        with pytest.raises(DownloadRejected) as rejected:
+            await gate.acquire()
+        return rejected.value, gate.get_stats()
+
+    rejected, stats = asyncio.run(scenario())
+    # Retry-After is jittered between half and one and a half times the configured value
+    assert 5 <= rejected.retry_after <= 15
+    assert stats["rejected"] == 1
+
+
+def test_admission_times_out_queued_requests():
+    async def scenario():
+        gate = admission(queue_timeout=0.05)
+        await gate.acquire()
+        with pytest.raises(DownloadRejected):
+            await gate.acquire()
+        return gate.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["timed_out"] == 1
+    assert stats["waiting"] == 0
+    assert stats["active"] == 1
+
+
+def test_admission_skips_cancelled_waiters():
+    async def scenario():
+        gate = admission()
+        await gate.acquire()
+        cancelled = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        waiting = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+        gate.release()
+        await waiting
+        return gate.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 1
+    assert stats["waiting"] == 0
+
+
+def test_full_download_holds_its_slot_until_the_body_is_sent(tmp_path):
+    path = tmp_path / "artifact.db"
+    path.write_bytes(b"x" * (3 * 1024 * 1024))
+
+    async def scenario():
+        gate = admission()
+        finished = []
+        response = FileRangeResponse(str(path), path.stat().st_size, admission=gate, on_finish=lambda kind, sent: finished.append(sent))
+        messages = []
+
+        async def slow_client(message):
+            # Every chunk is still in flight when the next one is read, so the slot must stay taken throughout
+            messages.append(message["type"])
+            assert gate.get_stats()["active"] == 1
+            await asyncio.sleep(0.01)
+
+        # Even when the server offers pathsend, an admitted download streams so the slot covers the transfer
+        scope = {"type": "http", "method": "GET", "extensions": {"http.response.pathsend": {}}}
+        await response(scope, None, slow_client)
+        return messages, finished, gate.get_stats()
+
+    messages, finished, stats = asyncio.run(scenario())
+    assert "http.response.pathsend" not in messages
+    assert messages.count("http.response.body") > 1
+    assert finished == [3 * 1024 * 1024]
+    assert stats["active"] == 0
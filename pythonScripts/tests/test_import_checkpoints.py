@@ -0,0 +1,100 @@
+import os
+import sqlite3
+
+import pytest
+
+import main
+
+TABLE = "kotlinapp_test_import_items"
+
+
+@pytest.fixture
+def pg_conn(monkeypatch):
+    if not os.environ.get("TEST_PG_DBNAME"):
+        pytest.skip("set TEST_PG_DBNAME (and PG_HOST, PG_USER, ...) to a throwaway database to run Postgres tests")
+    monkeypatch.setattr(main, "IMPORT_CHECKPOINT_TABLE", "kotlinapp_test_import_checkpoints")
+    with main.pg_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}, {main.IMPORT_CHECKPOINT_TABLE}")
+        # pub_date is one of the import's TIMESTAMP_COLUMNS, so it travels as epoch milliseconds
+        cursor.execute(f"CREATE TABLE {TABLE} (id integer PRIMARY KEY, name varchar(50) NOT NULL, pub_date timestamp)")
+        main.ensure_import_checkpoint_table(conn)
+        conn.commit()
+        main.schema_cache.refresh(conn, "public")
+        yield conn
+        conn.rollback()
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}, {main.IMPORT_CHECKPOINT_TABLE}")
+        conn.commit()
+        cursor.close()
+
+
+@pytest.fixture
+def source(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "source.db"))
+    conn.execute("CREATE TABLE Items (id INTEGER PRIMARY KEY, name TEXT NOT NULL, pubDate INTEGER)")
+    conn.executemany("INSERT INTO Items VALUES (?, ?, ?)", [(id, f"item\t{id}\n", 1700000000000 + id) for id in range(1, 26)])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+TABLE_INFO = {"pg_table": TABLE, "sqlite_table": "Items"}
+COLUMN_MAPPING = {"Items": {"id": "id", "name": "name", "pubDate": "pub_date"}}
+
+
+def saved_checkpoint(pg_conn):
+    cursor = pg_conn.cursor()
+    cursor.execute(f"SELECT last_rowid, rows_imported, completed FROM {main.IMPORT_CHECKPOINT_TABLE} WHERE pg_table = %s", (TABLE,))
+    row = cursor.fetchone()
+    cursor.close()
+    pg_conn.rollback()
+    return {"source": "source.db", "last_rowid": row[0], "rows_imported": row[1], "completed": row[2]}
+
+
+def pg_rows(pg_conn):
+    cursor = pg_conn.cursor()
+    cursor.execute(f"SELECT id, name, floor(extract(epoch FROM pub_date) * 1000)::bigint FROM {TABLE} ORDER BY id")
+    rows = cursor.fetchall()
+    cursor.close()
+    pg_conn.rollback()
+    return rows
+
+
+def test_resume_after_failed_chunk(pg_conn, source, monkeypatch):
+    monkeypatch.setattr(main, "IMPORT_CHUNK_ROWS", 10)
+    copy_chunks = main.iter_copy_chunks
+
+    def failing_chunks(sqlite_conn, sqlite_table, columns, encoders, after_rowid, through_rowid, *args, **kwargs):
+        if after_rowid >= 20:
+            raise RuntimeError("connection lost")
+        return copy_chunks(sqlite_conn, sqlite_table, columns, encoders, after_rowid, through_rowid, *args, **kwargs)
+
+    monkeypatch.setattr(main, "iter_copy_chunks", failing_chunks)
+    checkpoint = {"source": "source.db", "last_rowid": 0, "rows_imported": 0, "completed": False}
+    with pytest.raises(RuntimeError):
+        main.copy_table_to_postgres(pg_conn, source, dict(TABLE_INFO), COLUMN_MAPPING, checkpoint)
+    # The two committed chunks survive together with their checkpoint; the failed one left nothing behind
+    assert saved_checkpoint(pg_conn) == {"source": "source.db", "last_rowid": 20, "rows_imported": 20, "completed": False}
+    assert [row[0] for row in pg_rows(pg_conn)] == list(range(1, 21))
+
+    monkeypatch.setattr(main, "iter_copy_chunks", copy_chunks)
+    inserted = main.copy_table_to_postgres(pg_conn, source, dict(TABLE_INFO), COLUMN_MAPPING, saved_checkpoint(pg_conn))
+    assert inserted == 5
+    assert saved_checkpoint(pg_conn) == {"source": "source.db", "last_rowid": 25, "rows_imported": 25, "completed": True}
+    assert pg_rows(pg_conn) == [(id, f"item\t{id}\n", 1700000000000 + id) for id in range(1, 26)]
+
+
+def test_completed_checkpoint_skips_table(pg_conn, source):
+    checkpoint = {"source": "source.db", "last_rowid": 25, "rows_imported": 25, "completed": True}
+    assert main.copy_table_to_postgres(pg_conn, source, dict(TABLE_INFO), COLUMN_MAPPING, checkpoint) == 0
+    assert pg_rows(pg_conn) == []
+
+
+def test_existing_rows_are_kept(pg_conn, source):
+    cursor = pg_conn.cursor()
+    cursor.execute(f"INSERT INTO {TABLE} (id, name) VALUES (3, 'edited in Postgres')")
+    pg_conn.commit()
+    cursor.close()
+    checkpoint = {"source": "source.db", "last_rowid": 0, "rows_imported": 0, "completed": False}
+    assert main.copy_table_to_postgres(pg_conn, source, dict(TABLE_INFO), COLUMN_MAPPING, checkpoint) == 24
+    assert pg_rows(pg_conn)[2] == (3, "edited in Postgres", None)
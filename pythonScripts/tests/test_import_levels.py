@@ -0,0 +1,41 @@
+import pytest
+
+import main
+
+
+def table(name, *depends_on):
+    return {"sqlite_table": name, "pg_table": name.lower(), "depends_on": list(depends_on)}
+
+
+def names(levels):
+    return [[t["sqlite_table"] for t in level] for level in levels]
+
+
+def test_independent_tables_share_a_level():
+    plan = [table("Episodes", "Channels"), table("Channels"), table("Categories"), table("Map", "Episodes", "Categories")]
+    assert names(main.build_import_levels(plan)) == [["Channels", "Categories"], ["Episodes"], ["Map"]]
+
+
+@pytest.mark.parametrize("tables", [main.PODCAST_TABLES, main.SESSION_TABLES])
+def test_shipped_plans_order_parents_first(tables):
+    placed = set()
+    for level in main.build_import_levels(tables):
+        for t in level:
+            assert set(t.get("depends_on", [])) <= placed
+        placed.update(t["sqlite_table"] for t in level)
+    assert placed == {t["sqlite_table"] for t in tables}
+
+
+def test_cycle_is_rejected():
+    with pytest.raises(ValueError, match=r"cycle between \['A', 'B'\]"):
+        main.build_import_levels([table("Root"), table("A", "B"), table("B", "A", "Root")])
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError, match="Episodes depends on unknown tables"):
+        main.build_import_levels([table("Episodes", "Channels")])
+
+
+def test_duplicate_table_is_rejected():
+    with pytest.raises(ValueError, match="listed twice"):
+        main.build_import_levels([table("Channels"), table("Channels")])
@@ -0,0 +1,92 @@
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+from metrics import MetricsRegistry
+
+# A sample line of the Prometheus text format: name, optional {labels}, value
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*"(,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*")*\})? (-?[0-9.e+-]+|\+Inf)$')
+
+
+def parse(text):
+    # Checks every line and returns {sample: value}, plus the TYPE of every family
+    assert text.endswith("\n")
+    samples, types = {}, {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            types[name] = kind
+        elif not line.startswith("# HELP "):
+            assert SAMPLE.match(line), line
+            sample, value = line.rsplit(" ", 1)
+            samples[sample] = value
+    return samples, types
+
+
+def test_counters_and_histograms_render_in_text_format():
+    registry = MetricsRegistry()
+    runs = registry.counter("app_runs_total", "Runs", ("pipeline", "result"))
+    runs.inc(pipeline="export", result="success")
+    runs.inc(2, pipeline="export", result="success")
+    runs.inc(pipeline='quo"te\\', result="error")
+    duration = registry.histogram("app_duration_seconds", "Duration", ("pipeline",), buckets=(1, 10))
+    for seconds in (0.5, 1, 5, 50):
+        duration.observe(seconds, pipeline="export")
+    samples, types = parse(registry.render())
+    assert types == {"app_runs_total": "counter", "app_duration_seconds": "histogram"}
+    assert samples['app_runs_total{pipeline="export",result="success"}'] == "3"
+    assert samples['app_runs_total{pipeline="quo\\"te\\\\",result="error"}'] == "1"
+    # Buckets are cumulative and end at +Inf; le=1 includes the observation of exactly 1
+    assert samples['app_duration_seconds_bucket{pipeline="export",le="1"}'] == "2"
+    assert samples['app_duration_seconds_bucket{pipeline="export",le="10"}'] == "3"
+    assert samples['app_duration_seconds_bucket{pipeline="export",le="+Inf"}'] == "4"
+    assert samples['app_duration_seconds_sum{pipeline="export"}'] == "56.5"
+    assert samples['app_duration_seconds_count{pipeline="export"}'] == "4"
+
+
+def test_labels_must_match_the_family():
+    counter = MetricsRegistry().counter("app_runs_total", "Runs", ("pipeline",))
+    with pytest.raises(ValueError):
+        counter.inc(table="x")
+
+
+def test_collectors_map_stats_to_gauges_and_counters():
+    registry = MetricsRegistry()
+    registry.stats_collector("app_pool", "Pool", lambda: {"in_use": 2, "opened": 7, "queries_total": 9, "healthy": True, "name": "pg"},
+                             counters=("opened", "queries_total"))
+
+    def broken():
+        raise RuntimeError("unavailable")
+
+    registry.stats_collector("app_broken", "Broken", broken)
+    samples, types = parse(registry.render())
+    assert samples == {"app_pool_in_use": "2", "app_pool_opened_total": "7", "app_pool_queries_total": "9"}
+    assert types == {"app_pool_in_use": "gauge", "app_pool_opened_total": "counter", "app_pool_queries_total": "counter"}
+
+
+def test_traces_reach_span_hooks_even_if_one_fails():
+    registry = MetricsRegistry()
+    records = []
+
+    def broken_hook(record):
+        raise RuntimeError("sink down")
+
+    registry.add_span_hook(broken_hook)
+    registry.add_span_hook(records.append)
+    trace = registry.trace("export", datasets=["podcasts"])
+    trace.add_span("query", 0.25, table="podcast_episodes", dataset=None)
+    record = trace.finish(result="success")
+    assert records == [record]
+    assert record["attributes"] == {"datasets": ["podcasts"], "result": "success"}
+    assert record["spans"] == [{"name": "query", "seconds": 0.25, "table": "podcast_episodes"}]
+
+
+def test_metrics_endpoint_serves_the_registry():
+    import main
+    response = TestClient(main.app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples, types = parse(response.text)
+    assert types["kotlinapp_pipeline_runs_total"] == "counter"
+    assert types["kotlinapp_downloads_admitted_total"] == "counter"
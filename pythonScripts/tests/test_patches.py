@@ -0,0 +1,128 @@
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+
+import main
+from conftest import channel, episode
+
+PODCASTS = main.EXPORT_DATASETS["podcasts"]
+TABLES = list(PODCASTS["schemas"])
+
+
+def write_rows(conn, channels=(), episodes=()):
+    conn.executemany(f"INSERT OR REPLACE INTO PodcastChannels VALUES ({','.join('?' * 11)})", channels)
+    conn.executemany(f"INSERT OR REPLACE INTO PodcastEpisodes VALUES ({','.join('?' * 13)})", episodes)
+    conn.commit()
+
+
+def build_version(path, channels, episodes):
+    conn = sqlite3.connect(path)
+    main.setup_sqlite_tables(conn, PODCASTS)
+    write_rows(conn, channels, episodes)
+    main.build_search_indexes(conn, PODCASTS)
+    conn.close()
+
+
+def table_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {table: sorted(conn.execute(f"SELECT * FROM {table}").fetchall(), key=repr) for table in TABLES}
+    finally:
+        conn.close()
+
+
+def search(path, fts_table, term):
+    conn = sqlite3.connect(path)
+    try:
+        # Raises if the index no longer matches its external content table
+        conn.execute(f"INSERT INTO {fts_table}({fts_table}, rank) VALUES('integrity-check', 1)")
+        return [row[0] for row in conn.execute(f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ? ORDER BY rowid", (term,))]
+    finally:
+        conn.close()
+
+
+def make_versions(tmp_path):
+    old_path, new_path = str(tmp_path / "v1.db"), str(tmp_path / "v2.db")
+    build_version(old_path, [channel(1, "Kotlin Weekly"), channel(2, "Compose Talk")],
+                  [episode(id, 1 + id % 2, f"Episode {id} coroutines") for id in range(1, 11)])
+    # v2 follows the incremental export path: copy, upsert and delete rows, then sync the indexes
+    shutil.copyfile(old_path, new_path)
+    conn = sqlite3.connect(new_path)
+    write_rows(conn, [channel(2, "Compose Talk", author="Multiplatform Crew")],
+               [episode(3, 2, "Episode 3 flows"), episode(11, 1, "Episode 11 flows")])
+    conn.execute("DELETE FROM PodcastEpisodes WHERE id = 7")
+    conn.execute("UPDATE PodcastEpisodes SET link = 'https://example.com/moved' WHERE id = 8")
+    conn.commit()
+    main.build_search_indexes(conn, PODCASTS, ["PodcastChannels", "PodcastEpisodes"], old_path)
+    conn.close()
+    return old_path, new_path
+
+
+def test_incremental_index_sync_matches_content(tmp_path):
+    _, new_path = make_versions(tmp_path)
+    assert search(new_path, "PodcastEpisodesFts", "flows") == [3, 11]
+    assert search(new_path, "PodcastEpisodesFts", "coroutines") == [1, 2, 4, 5, 6, 8, 9, 10]
+    assert search(new_path, "PodcastChannelsFts", "multiplatform") == [2]
+
+
+def test_patch_round_trip(tmp_path):
+    old_path, new_path = make_versions(tmp_path)
+    patch_path = str(tmp_path / "v1-v2.sql.gz")
+    statements = main.build_sqlite_patch(old_path, new_path, patch_path, TABLES, PODCASTS["indexes"], PODCASTS["fts_tables"])
+    client_path = str(tmp_path / "client.db")
+    shutil.copyfile(old_path, client_path)
+    with gzip.open(patch_path, "rt") as f:
+        script = f.read()
+    conn = sqlite3.connect(client_path)
+    conn.executescript(script)
+    conn.close()
+    assert statements > 0
+    assert "'rebuild'" not in script
+    assert table_rows(client_path) == table_rows(new_path)
+    for fts_table, term in [("PodcastEpisodesFts", "flows"), ("PodcastEpisodesFts", "coroutines"), ("PodcastChannelsFts", "multiplatform")]:
+        assert search(client_path, fts_table, term) == search(new_path, fts_table, term)
+
+
+def test_patch_builds_missing_fts_tables(tmp_path):
+    old_path, new_path = make_versions(tmp_path)
+    conn = sqlite3.connect(old_path)
+    for fts_table in PODCASTS["fts_tables"]:
+        conn.execute(f"DROP TABLE {fts_table}")
+    conn.close()
+    patch_path = str(tmp_path / "v1-v2.sql.gz")
+    main.build_sqlite_patch(old_path, new_path, patch_path, TABLES, PODCASTS["indexes"], PODCASTS["fts_tables"])
+    conn = sqlite3.connect(old_path)
+    with gzip.open(patch_path, "rt") as f:
+        conn.executescript(f.read())
+    conn.close()
+    assert search(old_path, "PodcastEpisodesFts", "flows") == [3, 11]
+
+
+def test_patch_skipped_when_schema_changes(tmp_path):
+    old_path, new_path = make_versions(tmp_path)
+    conn = sqlite3.connect(new_path)
+    conn.execute("ALTER TABLE PodcastEpisodes ADD COLUMN season INTEGER")
+    conn.close()
+    assert main.build_sqlite_patch(old_path, new_path, str(tmp_path / "patch.sql.gz"), TABLES) is None
+
+
+def test_patch_plan_weighs_patches_against_the_negotiated_variant(tmp_path):
+    dataset = dict(PODCASTS, manifest_file=str(tmp_path / "manifest.json"))
+    latest_path = os.path.join(main.HISTORY_DIR, "plan-test-v2.db")
+    with open(latest_path, "wb") as f:
+        f.write(os.urandom(10000))
+    with open(latest_path + main.ENCODING_SUFFIXES["gzip"], "wb") as f:
+        f.write(os.urandom(300))
+    with open(dataset["manifest_file"], "w") as f:
+        json.dump({
+            "versions": [{"version": 1, "hash": "a", "size": 9000, "file": "plan-test-v1.db"},
+                         {"version": 2, "hash": "b", "size": 10000, "file": "plan-test-v2.db"}],
+            "patches": [{"from_version": 1, "to_version": 2, "file": "plan-test.sql.gz", "size": 500, "hash": "c"}],
+        }, f)
+    # 500 bytes of patch beat the 10000-byte raw file, but not the 300-byte gzip variant
+    assert not main.build_patch_plan(dataset, 1, None).full_download
+    plan = main.build_patch_plan(dataset, 1, None, "gzip, br")
+    assert plan.full_download
+    assert plan.size == 300
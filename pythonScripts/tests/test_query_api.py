@@ -0,0 +1,56 @@
+import sqlite3
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from conftest import channel, episode
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    main.setup_sqlite_tables(conn, main.EXPORT_DATASETS["podcasts"])
+    conn.executemany(f"INSERT INTO PodcastChannels VALUES ({','.join('?' * 11)})", [channel(1, "Kotlin Weekly"), channel(2, "Compose Talk")])
+    # Several episodes share a pubDate, so only the id keeps the order total
+    episodes = [episode(id, 1, f"Episode {id}", pub_date=1700000000000 + id // 3) for id in range(1, 26)]
+    episodes.append(episode(26, 2, "Other channel"))
+    conn.executemany(f"INSERT INTO PodcastEpisodes VALUES ({','.join('?' * 13)})", episodes)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("cursor, expected", [(None, None), ("1700000000008:25", (1700000000008, 25)), ("-5:-1", (-5, -1))])
+def test_parse_episode_cursor(cursor, expected):
+    assert main.parse_episode_cursor(cursor) == expected
+
+
+@pytest.mark.parametrize("cursor", ["", "abc", "1:2:3", "1700000000000", "1.5:2"])
+def test_parse_episode_cursor_rejects_garbage(cursor):
+    with pytest.raises(HTTPException) as error:
+        main.parse_episode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_keyset_pages_cover_every_episode_once(conn):
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = main.query_channel_episodes(conn, 1, cursor, 4)
+        seen.extend((item["pubDate"], item["id"]) for item in page["items"])
+        pages += 1
+        if page["next_cursor"] is None:
+            break
+        cursor = main.parse_episode_cursor(page["next_cursor"])
+    assert pages == 7
+    assert [id for _, id in seen] == sorted(range(1, 26), key=lambda id: (1700000000000 + id // 3, id), reverse=True)
+
+
+def test_last_full_page_has_no_cursor(conn):
+    page = main.query_channel_episodes(conn, 2, None, 1)
+    assert [item["id"] for item in page["items"]] == [26]
+    assert page["next_cursor"] is None
+
+
+def test_unknown_channel(conn):
+    assert main.query_channel_episodes(conn, 99, None, 10) is None
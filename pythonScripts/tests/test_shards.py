@@ -0,0 +1,75 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from conftest import channel, episode
+
+PODCASTS = main.EXPORT_DATASETS["podcasts"]
+
+
+def build_catalogue(path, episodes):
+    conn = sqlite3.connect(path)
+    main.setup_sqlite_tables(conn, PODCASTS)
+    conn.executemany(f"INSERT INTO PodcastChannels VALUES ({','.join('?' * 11)})", [channel(1, "Kotlin Weekly"), channel(2, "Compose Talk")])
+    conn.executemany(f"INSERT INTO PodcastEpisodes VALUES ({','.join('?' * 13)})", episodes)
+    conn.execute("INSERT INTO PodcastEpisodeCategories (id, name) VALUES (1, 'Tech')")
+    conn.executemany("INSERT INTO EpisodeCategoryMap (episodeId, categoryId) VALUES (?, 1)", [(e[0],) for e in episodes])
+    conn.commit()
+    conn.close()
+
+
+def shard_rows(filename, query):
+    conn = sqlite3.connect(os.path.join(main.SHARD_DIR, filename))
+    try:
+        return [row[0] for row in conn.execute(query)]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def catalogue(storage, tmp_path):
+    path = str(tmp_path / "v1.db")
+    build_catalogue(path, [episode(id, 1 if id <= 3 else 2, f"Episode {id}") for id in range(1, 6)])
+    return path
+
+
+def test_each_channel_shard_holds_only_its_episodes(catalogue):
+    manifest = main.build_sharded_bundles(catalogue, 1)
+    channels = {c["channel_id"]: c for c in manifest["channels"]}
+    assert {id: c["episodes"] for id, c in channels.items()} == {1: 3, 2: 2}
+    assert shard_rows(channels[1]["file"], "SELECT id FROM PodcastEpisodes ORDER BY id") == [1, 2, 3]
+    assert shard_rows(channels[2]["file"], "SELECT episodeId FROM EpisodeCategoryMap ORDER BY episodeId") == [4, 5]
+    assert shard_rows(manifest["core"]["file"], "SELECT id FROM PodcastChannels ORDER BY id") == [1, 2]
+
+
+def test_unchanged_channels_keep_their_shard(catalogue, tmp_path):
+    first = {c["channel_id"]: c["file"] for c in main.build_sharded_bundles(catalogue, 1)["channels"]}
+    changed = str(tmp_path / "v2.db")
+    shutil.copyfile(catalogue, changed)
+    conn = sqlite3.connect(changed)
+    conn.execute("UPDATE PodcastEpisodes SET title = 'Renamed' WHERE id = 4")
+    conn.commit()
+    conn.close()
+    second = {c["channel_id"]: c["file"] for c in main.build_sharded_bundles(changed, 2)["channels"]}
+    assert second[1] == first[1]
+    assert second[2] != first[2]
+    # The previous generation stays downloadable for clients still holding the old manifest
+    assert os.path.exists(os.path.join(main.SHARD_DIR, first[2]))
+
+
+def test_shards_are_served_by_name(catalogue):
+    main.build_sharded_bundles(catalogue, 1)
+    client = TestClient(main.app)
+    manifest = client.get("/database/shards").json()
+    assert manifest["version"] == 1
+    assert manifest["total_size"] == manifest["core"]["size"] + sum(c["size"] for c in manifest["channels"])
+    response = client.get(manifest["channels"][0]["url"], headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert len(response.content) == manifest["channels"][0]["size"]
+    assert client.get("/database/shards/..%2Fpublish_manifest.json").status_code == 404
+    assert client.get("/database/shards/channel-9-0000000000000000.db").status_code == 404